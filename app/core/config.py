@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -18,6 +19,62 @@ class Settings(BaseSettings):
     VERIFICATION_TOKEN_EXPIRE_HOURS: int
     PAPERTRAIL_URL: str
     PAPERTRAIL_PORT: int
+    MAX_PAGE_SIZE: int = 100
+    COMMENT_REPLY_PREVIEW_SIZE: int = 3
+    MOVIE_SOFT_DELETE: bool = False
+    MOVIE_PURGE_BATCH_SIZE: int = 500
+    MOVIE_PURGE_POLL_INTERVAL_SECONDS: float = 30
+    CACHE_BACKEND: str = "memory"
+    CACHE_REDIS_URL: Optional[str] = None
+    MOVIE_CACHE_TTL_SECONDS: int = 300
+    MOVIE_CACHE_MAX_SIZE: int = 10000
+    AUTH_USER_CACHE_ENABLED: bool = False
+    AUTH_USER_CACHE_TTL_SECONDS: int = 30
+    AUTH_USER_CACHE_MAX_SIZE: int = 10000
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_EXECUTOR: str = "thread"
+    PASSWORD_HASH_WORKERS: int = 4
+    SMTP_USE_TLS: bool = True
+    SMTP_IDLE_TIMEOUT_SECONDS: float = 60
+    EMAIL_QUEUE_ENABLED: bool = True
+    EMAIL_BATCH_SIZE: int = 50
+    EMAIL_POLL_INTERVAL_SECONDS: float = 5
+    EMAIL_MAX_ATTEMPTS: int = 5
+    EMAIL_RETRY_BASE_SECONDS: float = 30
+    EMAIL_RETRY_MAX_SECONDS: float = 3600
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "text"
+    LOG_SAMPLE_RATE: float = 1.0
+    CORE_READ_PATH: list[str] = ["movies", "ratings", "comments"]
+    QUERY_STATS_ENABLED: bool = False
+    QUERY_STATS_N_PLUS_ONE_THRESHOLD: int = 10
+    RESPONSE_CACHE_ENABLED: bool = False
+    RESPONSE_CACHE_DEFAULT_TTL_SECONDS: int = 30
+    RESPONSE_CACHE_TTL_SECONDS: dict[str, int] = {"movies": 30, "movie": 60, "ratings": 30, "comments": 15}
+    RESPONSE_CACHE_MAX_SIZE: int = 10000
+    SINGLE_FLIGHT_ENABLED: bool = True
+    SINGLE_FLIGHT_TIMEOUT_SECONDS: float = 5
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_REDIS_URL: Optional[str] = None
+    RATE_LIMIT_TRUSTED_PROXIES: list[str] = []
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 30
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = False
+    DB_STATEMENT_TIMEOUT_MS: int = 0
+    METRICS_ENABLED: bool = True
+    METRICS_MULTIPROC_DIR: Optional[str] = None
+    METRICS_FLUSH_INTERVAL_SECONDS: float = 5
+    METRICS_LATENCY_BUCKETS: list[float] = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+    PROFILING_ENABLED: bool = False
+    PROFILING_TOKEN: Optional[str] = None
+    PROFILING_SAMPLE_EVERY_N: int = 0
+    PROFILING_MODE: str = "sampling"
+    PROFILING_INTERVAL_MS: float = 1
+    PROFILING_DIR: str = "profiles"
+    PROFILING_MAX_FILES: int = 100
 
     
     class Config:
@@ -1,69 +1,245 @@
+import uuid
+from datetime import datetime
+from typing import Optional
 from uuid import UUID
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.exc import NoResultFound
-from app.db.models.comment import Comment
+from app.core.config import settings
+from app.db.models.comment import PATH_SEGMENT_LENGTH, Comment, subtree_condition
 from app.db.models.movie import Movie
 from app.db.schemas.comment import CommentCreate, NestedCommentCreate
-from app.db.models.user import User
 from app.utils.logger import logger
-from sqlalchemy import desc, asc
-
-
-def create_comment(db: Session, comment: CommentCreate, user_id: UUID):
-    movie = db.query(Movie).filter(Movie.id == comment.movie_id).first()
-    if not movie:
-        logger.error(f"Movie with id {comment.movie_id} not found")
-        raise NoResultFound(f"Movie with id {comment.movie_id} not found")   
-    logger.debug(f"Creating comment: {comment} for user_id: {user_id}")
-    db_comment = Comment(**comment.dict(), user_id=user_id)
-    db.add(db_comment)
-    db.commit()
-    db.refresh(db_comment)
-    logger.info(f"Comment created with ID: {db_comment.id}")
+from app.utils.pagination import decode_cursor, keyset_condition, paginate_rows
+from sqlalchemy import desc, asc, func, insert, literal, select
+
+
+async def create_comment(db: AsyncSession, comment: CommentCreate, user_id: UUID):
+    """
+    Insert the comment with INSERT ... SELECT from its movie, which checks that
+    the movie exists and has not been deleted, and return it via RETURNING.
+    """
+    logger.debug("Creating comment: %s for user_id: %s", comment, user_id)
+    comment_id = uuid.uuid4()
+    now = datetime.utcnow()
+    movie = select(
+        literal(comment_id, Comment.id.type),
+        literal(comment.content, Comment.content.type),
+        Movie.id,
+        literal(comment_id.hex, Comment.path.type),
+        literal(user_id, Comment.user_id.type),
+        literal(now, Comment.created_at.type),
+        literal(now, Comment.updated_at.type),
+    ).where(Movie.id == comment.movie_id, Movie.deleted_at == None)
+    result = await db.execute(
+        insert(Comment)
+        .from_select(["id", "content", "movie_id", "path", "user_id", "created_at", "updated_at"], movie)
+        .returning(Comment)
+    )
+    db_comment = result.scalars().first()
+    if not db_comment:
+        await db.rollback()
+        logger.error("Movie with id %s not found", comment.movie_id)
+        raise NoResultFound(f"Movie with id {comment.movie_id} not found")
+    await db.commit()
+    set_committed_value(db_comment, "replies", [])
+    logger.info("Comment created with ID: %s", db_comment.id)
     return db_comment
 
 
 
-def get_comments(db: Session, movie_id: UUID, skip: int = 0, limit: int = 10, sort_order: str = "desc"):
-    movie = db.query(Movie).filter(Movie.id == movie_id).first()
-    if not movie:
-        logger.error(f"Movie with id {movie_id} not found")
+# Columns backing CommentResponse, selected by the Core read path instead of full Comment entities.
+COMMENT_RESPONSE_COLUMNS = [
+    Comment.id, Comment.content, Comment.movie_id, Comment.user_id,
+    Comment.parent_comment_id, Comment.created_at, Comment.updated_at,
+]
+
+
+def reply_count_column():
+    """Number of direct replies to each selected comment, answered from the parent index."""
+    replies = aliased(Comment)
+    return select(func.count()).select_from(replies)\
+        .where(replies.parent_comment_id == Comment.id)\
+        .scalar_subquery().label("reply_count")
+
+
+def comments_query(use_core: bool):
+    entities = COMMENT_RESPONSE_COLUMNS if use_core else [Comment]
+    return select(*entities, reply_count_column())
+
+
+def to_node(row, use_core: bool):
+    """
+    A comment ready for CommentResponse with no replies attached yet: a dict on
+    the Core path, otherwise the Comment entity with `reply_count` set on it.
+    """
+    if use_core:
+        return {**row._mapping, "replies": []}
+    comment = row[0]
+    set_committed_value(comment, "replies", [])
+    comment.reply_count = row.reply_count
+    return comment
+
+
+def _node_value(node, key: str):
+    return node[key] if isinstance(node, dict) else getattr(node, key)
+
+
+def attach_replies(nodes: list, replies: list):
+    """
+    Link `replies` to their parents among `nodes` and `replies` in a single pass,
+    keeping the order of `replies` within each parent.
+    """
+    by_id = {_node_value(node, "id"): node for node in nodes}
+    by_id.update((_node_value(reply, "id"), reply) for reply in replies)
+    children = {}
+    for reply in replies:
+        children.setdefault(_node_value(reply, "parent_comment_id"), []).append(reply)
+    for parent_id, parent_replies in children.items():
+        parent = by_id.get(parent_id)
+        if parent is None:
+            continue
+        if isinstance(parent, dict):
+            parent["replies"] = parent_replies
+        else:
+            set_committed_value(parent, "replies", parent_replies)
+
+
+def recent_replies_query(parent_ids: list, per_parent: int, use_core: bool):
+    """
+    The `per_parent` most recent replies of each parent in `parent_ids`, in one
+    statement. A window function ranks the replies per parent so no parent's
+    full reply set is sent to the app.
+    """
+    ranked = select(
+        Comment.id,
+        func.row_number().over(
+            partition_by=Comment.parent_comment_id,
+            order_by=[Comment.created_at.desc(), Comment.id.desc()],
+        ).label("position"),
+    ).filter(Comment.parent_comment_id.in_(parent_ids)).subquery()
+    return comments_query(use_core)\
+        .join(ranked, Comment.id == ranked.c.id)\
+        .filter(ranked.c.position <= per_parent)\
+        .order_by(Comment.parent_comment_id, Comment.created_at, Comment.id)
+
+
+async def get_comments(db: AsyncSession, movie_id: UUID, skip: int = 0, limit: int = 10, sort_order: str = "desc", cursor: str = None, use_core: bool = False):
+    """
+    Return a page of top-level comments, each with its most recent replies and
+    total reply count, and the cursor for the next page. With `use_core` the
+    comments are plain dicts built from the CommentResponse columns instead of
+    Comment entities.
+    """
+    movie = await db.get(Movie, movie_id)
+    if not movie or movie.deleted_at:
+        logger.error("Movie with id %s not found", movie_id)
         raise NoResultFound(f"Movie with id {movie_id} not found")
-    logger.debug(f"Fetching comments for movie_id: {movie_id}, skip: {skip}, limit: {limit}, sort_order: {sort_order}")
-   
-    order_func = desc if sort_order == "desc" else asc
-    
-    comments = db.query(Comment)\
-        .filter(Comment.movie_id == movie_id, Comment.parent_comment_id == None)\
-        .options(joinedload(Comment.replies))\
-        .order_by(order_func(Comment.created_at))\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
-    
-    logger.info(f"Fetched {len(comments)} comments for movie_id: {movie_id}")
-    return comments
-
-
-def create_nested_comment(db: Session, nested_comment: NestedCommentCreate, user_id: UUID):
-    parent_comment = db.query(Comment).filter(Comment.id == nested_comment.parent_comment_id).first()
+    logger.debug("Fetching comments for movie_id: %s, skip: %s, limit: %s, sort_order: %s", movie_id, skip, limit, sort_order)
+
+    query = comments_query(use_core).filter(Comment.movie_id == movie_id, Comment.parent_comment_id == None)
+    comments, next_cursor = await _fetch_page(db, query, skip, limit, sort_order, cursor, use_core)
+    per_parent = settings.COMMENT_REPLY_PREVIEW_SIZE
+    if comments and per_parent > 0:
+        result = await db.execute(recent_replies_query([_node_value(comment, "id") for comment in comments], per_parent, use_core))
+        attach_replies(comments, [to_node(row, use_core) for row in result])
+
+    logger.info("Fetched %s comments for movie_id: %s", len(comments), movie_id)
+    return comments, next_cursor
+
+
+async def get_replies(db: AsyncSession, comment_id: UUID, skip: int = 0, limit: int = 10, sort_order: str = "desc", cursor: str = None, use_core: bool = False):
+    """Return a page of direct replies to a comment and the cursor for the next page."""
+    parent_comment = await db.get(Comment, comment_id)
     if not parent_comment:
-        logger.error(f"Parent comment with id {nested_comment.parent_comment_id} not found")
+        logger.error("Comment with id %s not found", comment_id)
+        raise NoResultFound(f"Comment with id {comment_id} not found")
+    logger.debug("Fetching replies for comment_id: %s, skip: %s, limit: %s, sort_order: %s", comment_id, skip, limit, sort_order)
+
+    query = comments_query(use_core).filter(Comment.parent_comment_id == comment_id)
+    replies, next_cursor = await _fetch_page(db, query, skip, limit, sort_order, cursor, use_core)
+
+    logger.info("Fetched %s replies for comment_id: %s", len(replies), comment_id)
+    return replies, next_cursor
+
+
+async def get_comment_thread(db: AsyncSession, comment_id: UUID, max_depth: Optional[int] = None, use_core: bool = False):
+    """
+    Return a comment with its replies assembled into a tree, down to `max_depth`
+    levels below it (the whole subtree when None). The subtree is one range scan
+    over the materialized path index, ordered oldest first within each parent.
+    """
+    root = aliased(Comment)
+    query = comments_query(use_core)\
+        .join(root, subtree_condition(root.path, Comment.path))\
+        .filter(root.id == comment_id)\
+        .order_by(Comment.created_at, Comment.id)
+    if max_depth is not None:
+        query = query.filter(func.length(Comment.path) <= func.length(root.path) + max_depth * PATH_SEGMENT_LENGTH)
+    result = await db.execute(query)
+    nodes = [to_node(row, use_core) for row in result]
+    thread = next((node for node in nodes if _node_value(node, "id") == comment_id), None)
+    if thread is None:
+        logger.error("Comment with id %s not found", comment_id)
+        raise NoResultFound(f"Comment with id {comment_id} not found")
+    attach_replies([], nodes)
+
+    logger.info("Fetched thread of %s comments for comment_id: %s", len(nodes), comment_id)
+    return thread
+
+
+async def _fetch_page(db: AsyncSession, query, skip: int, limit: int, sort_order: str, cursor: str, use_core: bool):
+    order_func = desc if sort_order == "desc" else asc
+    keys = [Comment.created_at, Comment.id]
+    query = query.order_by(*[order_func(key) for key in keys])
+    if cursor:
+        values = decode_cursor(cursor, sort_order, len(keys))
+        query = query.filter(keyset_condition(keys, values, descending=sort_order == "desc"))
+    else:
+        query = query.offset(skip)
+
+    result = await db.execute(query.limit(limit + 1))
+    nodes = [to_node(row, use_core) for row in result]
+    return paginate_rows(nodes, limit, sort_order, lambda node: [_node_value(node, "created_at"), _node_value(node, "id")])
+
+
+async def create_nested_comment(db: AsyncSession, nested_comment: NestedCommentCreate, user_id: UUID):
+    """
+    Insert the reply with INSERT ... SELECT from its parent, which both checks
+    that the parent exists and extends its path, and return it via RETURNING.
+    """
+    logger.debug("Creating nested comment: %s for user_id: %s", nested_comment, user_id)
+    comment_id = uuid.uuid4()
+    now = datetime.utcnow()
+    parent = select(
+        literal(comment_id, Comment.id.type),
+        literal(nested_comment.content, Comment.content.type),
+        Comment.id,
+        Comment.path + comment_id.hex,
+        literal(user_id, Comment.user_id.type),
+        literal(now, Comment.created_at.type),
+        literal(now, Comment.updated_at.type),
+    ).where(Comment.id == nested_comment.parent_comment_id)
+    result = await db.execute(
+        insert(Comment)
+        .from_select(["id", "content", "parent_comment_id", "path", "user_id", "created_at", "updated_at"], parent)
+        .returning(Comment)
+    )
+    db_comment = result.scalars().first()
+    if not db_comment:
+        await db.rollback()
+        logger.error("Parent comment with id %s not found", nested_comment.parent_comment_id)
         raise NoResultFound(f"Parent comment with id {nested_comment.parent_comment_id} not found")
-        
-    if parent_comment.parent_comment_id is not None:
-        logger.error(f"Cannot reply to a reply. Comment ID: {parent_comment.id}")
-        raise ValueError("Replies to replies are not allowed.")
-
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        logger.error(f"User with id {user_id} not found")
-        raise NoResultFound(f"User with id {user_id} not found")
-    
-    logger.debug(f"Creating nested comment: {nested_comment} for user_id: {user_id}")
-    db_comment = Comment(**nested_comment.dict(), user_id=user_id)
-    db.add(db_comment)
-    db.commit()
-    db.refresh(db_comment)
-    logger.info(f"Nested comment created with ID: {db_comment.id}")
+    await db.commit()
+    set_committed_value(db_comment, "replies", [])
+    logger.info("Nested comment created with ID: %s", db_comment.id)
     return db_comment
+
+
+async def get_thread_movie_id(db: AsyncSession, comment: Comment) -> Optional[UUID]:
+    """The movie of the thread `comment` belongs to. Replies leave movie_id empty; the root, named by the first path segment, has it."""
+    if comment.movie_id is not None:
+        return comment.movie_id
+    root_id = UUID(hex=comment.path[:PATH_SEGMENT_LENGTH])
+    return (await db.execute(select(Comment.movie_id).where(Comment.id == root_id))).scalar_one_or_none()
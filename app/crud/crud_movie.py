@@ -1,35 +1,30 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from app.db.models.comment import Comment
 from app.db.models.movie import Movie
 from app.db.models.rating import Rating
+from app.db.search import apply_movie_search
 from app.db.schemas.movie import MovieCreate, MovieUpdate, SortByEnum
 from app.utils.logger import logger
+from app.utils.pagination import decode_cursor, keyset_condition, paginate_rows
 from uuid import UUID
-from sqlalchemy import desc, func
-
-
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from app.db.models.movie import Movie
-from app.db.schemas.movie import MovieCreate
-from uuid import UUID
+from sqlalchemy import delete, desc
 from fastapi import HTTPException, status
 
-def create_movie(db: Session, movie: MovieCreate, user_id: str):
 
-    logger.info("Checking if a movie with the same title and release date already exists.")
-    existing_movie = db.query(Movie).filter(
-        Movie.title == movie.title,
-        Movie.release_date == movie.release_date
-    ).first()
+def is_duplicate_movie_error(error: IntegrityError) -> bool:
+    """Whether `error` is a violation of _title_release_date_uc rather than of some other constraint."""
+    orig = error.orig
+    # psycopg2 names the constraint in `diag`, asyncpg on the driver error SQLAlchemy wraps; SQLite only lists the columns.
+    constraint = getattr(getattr(orig, "diag", None), "constraint_name", None) or getattr(orig.__cause__, "constraint_name", None)
+    if constraint is not None:
+        return constraint == "_title_release_date_uc"
+    return "UNIQUE constraint failed: movies.title, movies.release_date" in str(orig)
 
-    if existing_movie:
-        logger.error("A movie with this title and release date already exists.")
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="A movie with this title and release date already exists."
-        )
-    logger.info("No existing movie found. Proceeding to create a new movie.")
+
+async def create_movie(db: AsyncSession, movie: MovieCreate, user_id: str):
     db_movie = Movie(
         title=movie.title,
         description=movie.description,
@@ -39,77 +34,159 @@ def create_movie(db: Session, movie: MovieCreate, user_id: str):
         owner_id=user_id
     )
     db.add(db_movie)
-    db.commit()
-    db.refresh(db_movie)
-    logger.info(f"Movie created with title: {movie.title}")
+    try:
+        await db.commit()
+    except IntegrityError as e:
+        # _title_release_date_uc does the duplicate check as part of the INSERT.
+        await db.rollback()
+        if not is_duplicate_movie_error(e):
+            raise
+        logger.error("A movie with this title and release date already exists.")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A movie with this title and release date already exists."
+        )
+    logger.info("Movie created with title: %s", movie.title)
 
     return db_movie
 
 
 
 
-def get_movie(db: Session, movie_id: UUID):
-    logger.info(f"Fetching movie by ID: {movie_id}")
-    movie = db.query(Movie).filter(Movie.id == movie_id).first()
-    if movie:
-        logger.info(f"Movie found with ID: {movie_id}")
-    else:
-        logger.warning(f"Movie not found with ID: {movie_id}")
-    return movie
+async def get_movie(db: AsyncSession, movie_id: UUID):
+    logger.info("Fetching movie by ID: %s", movie_id)
+    movie = await db.get(Movie, movie_id)
+    if movie and movie.deleted_at is None:
+        logger.info("Movie found with ID: %s", movie_id)
+        return movie
+    logger.warning("Movie not found with ID: %s", movie_id)
+    return None
+
 
 
+# Columns backing MovieResponse, selected by the Core read path instead of full Movie entities.
+MOVIE_RESPONSE_COLUMNS = [
+    Movie.id, Movie.title, Movie.description, Movie.duration, Movie.release_date,
+    Movie.poster_url, Movie.owner_id, Movie.created_at, Movie.updated_at,
+]
 
-def get_movies(db: Session, skip: int = 0, limit: int = 10, search: str = None, sort_by: SortByEnum = None):
+
+async def get_movies(db: AsyncSession, skip: int = 0, limit: int = 10, search: str = None, sort_by: SortByEnum = None, cursor: str = None, use_core: bool = False):
+    """
+    Return a page of movies and the cursor for the next page. With `use_core`
+    the page holds lightweight rows carrying only the MovieResponse columns
+    instead of Movie entities.
+    """
     logger.info("Fetching movies list.")
-    query = db.query(Movie)
-    
+    entities = MOVIE_RESPONSE_COLUMNS if use_core else [Movie]
+    query = select(*entities).filter(Movie.deleted_at == None)
+    sort_keys = []
+
     if sort_by == SortByEnum.most_rated:
-        query = query.outerjoin(Rating).group_by(Movie.id).order_by(
-            desc(func.avg(Rating.score))
-        )
+        sort_keys = [Movie.average_rating]
     elif sort_by == SortByEnum.most_recent:
-        query = query.order_by(desc(Movie.release_date))
+        sort_keys = [Movie.release_date]
     elif sort_by == SortByEnum.most_rated_and_recent:
-        query = query.outerjoin(Rating).group_by(Movie.id).order_by(
-            desc(func.avg(Rating.score)), desc(Movie.release_date)
-        )
-    
-    if search:
-        logger.info(f"Applying search filter: {search}")
-        query = query.filter(or_(Movie.title.contains(search), Movie.description.contains(search)))
-    
-    movies = query.offset(skip).limit(limit).all()
-    logger.info(f"Movies retrieved: {len(movies)}")
-    return movies
-
+        sort_keys = [Movie.average_rating, Movie.release_date]
 
+    if search:
+        logger.info("Applying search filter: %s", search)
+        query, relevance = apply_movie_search(query, Movie, search, db.bind.dialect.name)
+        if relevance is not None:
+            sort_keys.append(relevance)
+
+    if not sort_keys:
+        sort_keys = [Movie.created_at]
+    keys = sort_keys + [Movie.id]
+    sort_mode = sort_by.value if sort_by else "default"
+    if search:
+        sort_mode = f"{sort_mode}:search"
 
-def update_movie(db: Session, movie_id: UUID, movie: MovieUpdate):
-    logger.info(f"Updating movie with ID: {movie_id}")
-    db_movie = db.query(Movie).filter(Movie.id == movie_id).first()    
+    query = query.add_columns(*sort_keys).order_by(*[desc(key) for key in keys])
+    if cursor:
+        query = query.filter(keyset_condition(keys, decode_cursor(cursor, sort_mode, len(keys))))
+    else:
+        query = query.offset(skip)
+
+    result = await db.execute(query.limit(limit + 1))
+    rows, next_cursor = paginate_rows(result.all(), limit, sort_mode, lambda row: [*row[len(entities):], row[0] if use_core else row[0].id])
+    movies = rows if use_core else [row[0] for row in rows]
+    logger.info("Movies retrieved: %s", len(movies))
+    return movies, next_cursor
+
+
+
+async def update_movie(db: AsyncSession, movie_id: UUID, movie: MovieUpdate, user_id: UUID):
+    """Apply the changes if the movie exists and belongs to `user_id`; returns the updated movie or None."""
+    logger.info("Updating movie with ID: %s", movie_id)
+    values = movie.dict(exclude_unset=True)
+    if "poster_url" in values:
+        values["poster_url"] = str(values["poster_url"])
+    result = await db.execute(
+        update(Movie)
+        .where(Movie.id == movie_id, Movie.owner_id == user_id, Movie.deleted_at == None)
+        .values(**values)
+        .returning(Movie)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+    db_movie = result.scalars().first()
+    await db.commit()
     if db_movie:
-        for key, value in movie.dict(exclude_unset=True).items():
-            if key == "poster_url":
-                value = str(value)
-            setattr(db_movie, key, value)
-        
-        db.commit()
-        db.refresh(db_movie)
-        logger.info(f"Movie updated with ID: {movie_id}")
+        logger.info("Movie updated with ID: %s", movie_id)
     else:
-        logger.warning(f"Movie not found with ID: {movie_id}")    
+        logger.warning("Movie not found with ID: %s for owner: %s", movie_id, user_id)
     return db_movie
 
 
-def delete_movie(db: Session, movie_id: UUID):
-    logger.info(f"Deleting movie with ID: {movie_id}")
-    db_movie = db.query(Movie).filter(Movie.id == movie_id).first()
-    if db_movie:
-        logger.info(f"Deleting related ratings for movie ID: {movie_id}")
-        db.query(Rating).filter(Rating.movie_id == movie_id).delete(synchronize_session=False)
-        db.delete(db_movie)
-        db.commit()
-        logger.info(f"Movie deleted with ID: {movie_id}")
-        return db_movie
-    logger.warning(f"Movie not found with ID: {movie_id}")
-    return None
+async def delete_movie(db: AsyncSession, movie_id: UUID, user_id: UUID, soft: bool = False) -> bool:
+    """
+    Delete the movie if it belongs to `user_id`. The database removes its
+    ratings and comment threads through ON DELETE CASCADE. With `soft` the
+    movie is only marked deleted, which hides it at once; `purge_deleted_movies`
+    removes it and its children later.
+    """
+    logger.info("Deleting movie with ID: %s", movie_id)
+    owned = (Movie.id == movie_id, Movie.owner_id == user_id, Movie.deleted_at == None)
+    if soft:
+        statement = update(Movie).where(*owned).values(deleted_at=datetime.utcnow(), updated_at=Movie.updated_at)
+    else:
+        statement = delete(Movie).where(*owned)
+    result = await db.execute(statement.returning(Movie.id).execution_options(synchronize_session=False))
+    deleted = result.scalar_one_or_none() is not None
+    await db.commit()
+    if deleted:
+        logger.info("Movie %s with ID: %s", "soft-deleted" if soft else "deleted", movie_id)
+    else:
+        logger.warning("Movie not found with ID: %s for owner: %s", movie_id, user_id)
+    return deleted
+
+
+async def purge_deleted_movies(db: AsyncSession, batch_size: int) -> int:
+    """
+    Remove up to `batch_size` children of the oldest soft-deleted movie, or the
+    movie itself once it has none left, in one short transaction. Returns the
+    number of rows removed (comment replies cascade and are not counted), so
+    0 means there is nothing left to purge.
+    """
+    movie_id = (await db.execute(
+        select(Movie.id).where(Movie.deleted_at != None).order_by(Movie.deleted_at).limit(1)
+    )).scalar_one_or_none()
+    if movie_id is None:
+        return 0
+    batches = [
+        delete(Rating).where(Rating.id.in_(
+            select(Rating.id).where(Rating.movie_id == movie_id).limit(batch_size)
+        )),
+        delete(Comment).where(Comment.id.in_(
+            select(Comment.id).where(Comment.movie_id == movie_id, Comment.parent_comment_id == None).limit(batch_size)
+        )),
+        delete(Movie).where(Movie.id == movie_id),
+    ]
+    for statement in batches:
+        result = await db.execute(statement.execution_options(synchronize_session=False))
+        if result.rowcount:
+            await db.commit()
+            logger.info("Purged %s rows of soft-deleted movie %s", result.rowcount, movie_id)
+            return result.rowcount
+    await db.commit()
+    return 0
@@ -1,64 +1,113 @@
-from sqlalchemy.orm import Session
+from datetime import datetime
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.models.movie import Movie
 from app.db.models.rating import Rating
 from app.db.schemas.rating import RatingCreate, RatingScore
-from typing import List, Optional
-from sqlalchemy import func
+from typing import List
+from sqlalchemy import Float, case, cast, desc, select, update
 from app.utils.logger import logger
+from app.utils.pagination import decode_cursor, keyset_condition, paginate_rows
 from sqlalchemy.orm.exc import NoResultFound
 from uuid import UUID
 
+RATINGS_SORT_MODE = "most_recent"
 
-def get_user_rating_for_movie(db: Session, user_id: UUID, movie_id: UUID) -> Optional[Rating]:
-    return db.query(Rating).filter(Rating.user_id == user_id, Rating.movie_id == movie_id).first()
 
+def rating_upsert(dialect_name: str, rating: RatingCreate, user_id: UUID):
+    """
+    INSERT ... ON CONFLICT (user_id, movie_id) DO UPDATE ... RETURNING the rating.
+    On conflict `previous_score` takes the score being replaced, so it is NULL
+    exactly when the statement inserted a new rating.
+    """
+    insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    statement = insert(Rating).values(**rating.dict(), user_id=user_id)
+    return statement.on_conflict_do_update(
+        index_elements=[Rating.user_id, Rating.movie_id],
+        set_={
+            "previous_score": Rating.score,
+            "score": statement.excluded.score,
+            "review": statement.excluded.review,
+            "updated_at": datetime.utcnow(),
+        },
+    ).returning(Rating)
 
-def create_or_update_rating(db: Session, rating: RatingCreate, user_id: UUID) -> Rating:
-    logger.debug(f"Checking for existing rating for user_id: {user_id} and movie_id: {rating.movie_id}")
-    movie = db.query(Movie).filter(Movie.id == rating.movie_id).first()
-    if not movie:
-        logger.error(f"Movie with id {rating.movie_id} not found")
+
+async def create_or_update_rating(db: AsyncSession, rating: RatingCreate, user_id: UUID) -> Rating:
+    logger.debug("Upserting rating for user_id: %s and movie_id: %s", user_id, rating.movie_id)
+    try:
+        result = await db.execute(
+            rating_upsert(db.bind.dialect.name, rating, user_id),
+            execution_options={"populate_existing": True},
+        )
+    except IntegrityError:
+        # The movie_id foreign key is the existence check.
+        await db.rollback()
+        logger.error("Movie with id %s not found", rating.movie_id)
         raise NoResultFound(f"Movie with id {rating.movie_id} not found")
-    
-    db_rating = get_user_rating_for_movie(db, user_id, rating.movie_id)
-    
-    if db_rating:
-        logger.debug(f"Existing rating found with ID: {db_rating.id}. Updating rating.")
-        db_rating.score = rating.score
-        db_rating.review = rating.review
-        db.commit()
-        db.refresh(db_rating)
-        logger.info(f"Rating updated with ID: {db_rating.id}")
-    else:
-        logger.debug(f"No existing rating found. Creating new rating.")
-        db_rating = Rating(**rating.dict(), user_id=user_id)
-        db.add(db_rating)
-        db.commit()
-        db.refresh(db_rating)
-        logger.info(f"Rating created with ID: {db_rating.id}")
+    db_rating = result.scalar_one()
 
+    if db_rating.previous_score is None:
+        aggregates_update = rating_aggregates_update(rating.movie_id, db_rating.score, 1)
+    else:
+        aggregates_update = rating_aggregates_update(rating.movie_id, db_rating.score - db_rating.previous_score, 0)
+    result = await db.execute(aggregates_update.where(Movie.deleted_at == None))
+    if not result.rowcount:
+        # The movie has been soft-deleted.
+        await db.rollback()
+        logger.error("Movie with id %s not found", rating.movie_id)
+        raise NoResultFound(f"Movie with id {rating.movie_id} not found")
+    await db.commit()
+    logger.info("Rating %s with ID: %s", "created" if db_rating.previous_score is None else "updated", db_rating.id)
     return db_rating
 
 
-def get_aggregated_rating(db: Session, movie_id: UUID) -> float:
-    avg_rating = db.query(func.avg(Rating.score)).filter(Rating.movie_id == movie_id).scalar()
-    return round(avg_rating, 2) if avg_rating is not None else None
+def rating_aggregates_update(movie_id: UUID, score_delta: int, count_delta: int):
+    """Apply a rating change to the movie's running aggregates in a single atomic UPDATE."""
+    new_sum = Movie.rating_sum + score_delta
+    new_count = Movie.rating_count + count_delta
+    return update(Movie).where(Movie.id == movie_id).values(
+        rating_sum=new_sum,
+        rating_count=new_count,
+        average_rating=case((new_count > 0, cast(new_sum, Float) / new_count), else_=0.0),
+        updated_at=Movie.updated_at,
+    ).execution_options(synchronize_session=False)
+
+
+def get_aggregated_rating(movie: Movie) -> float:
+    if not movie.rating_count:
+        return None
+    return round(movie.rating_sum / movie.rating_count, 2)
 
 
 
-def get_ratings(db: Session, movie_id: UUID, skip: int = 0, limit: int = 10, rating_score: RatingScore = None):
-    logger.debug(f"Fetching ratings for movie_id: {movie_id} with filter rating_score: {rating_score}") 
-    movie = db.query(Movie).filter(Movie.id == movie_id).first()
-    if not movie:
-        logger.error(f"Movie with id {movie_id} not found")
+# Columns backing RatingResponse, selected by the Core read path instead of full Rating entities.
+RATING_RESPONSE_COLUMNS = [Rating.id, Rating.score, Rating.review, Rating.user_id, Rating.created_at, Rating.updated_at]
+
+
+async def get_ratings(db: AsyncSession, movie_id: UUID, skip: int = 0, limit: int = 10, rating_score: RatingScore = None, cursor: str = None, use_core: bool = False):
+    logger.debug("Fetching ratings for movie_id: %s with filter rating_score: %s", movie_id, rating_score)
+    movie = await db.get(Movie, movie_id)
+    if not movie or movie.deleted_at:
+        logger.error("Movie with id %s not found", movie_id)
         raise NoResultFound(f"Movie with id {movie_id} not found")
 
-    query = db.query(Rating).filter(Rating.movie_id == movie_id)
-    
+    query = select(*RATING_RESPONSE_COLUMNS) if use_core else select(Rating)
+    query = query.filter(Rating.movie_id == movie_id)
+
     if rating_score:
         query = query.filter(Rating.score == rating_score)
-    
-    ratings = query.offset(skip).limit(limit).all()
-    aggregated_rating = get_aggregated_rating(db, movie_id)
-    logger.info(f"Fetched {len(ratings)} ratings and aggregated rating for movie_id: {movie_id}")
-    return ratings, aggregated_rating
+
+    keys = [Rating.created_at, Rating.id]
+    query = query.order_by(*[desc(key) for key in keys])
+    if cursor:
+        query = query.filter(keyset_condition(keys, decode_cursor(cursor, RATINGS_SORT_MODE, len(keys))))
+    else:
+        query = query.offset(skip)
+
+    result = await db.execute(query.limit(limit + 1))
+    ratings, next_cursor = paginate_rows(result.all() if use_core else result.scalars().all(), limit, RATINGS_SORT_MODE, lambda rating: [rating.created_at, rating.id])
+    aggregated_rating = get_aggregated_rating(movie)
+    logger.info("Fetched %s ratings and aggregated rating for movie_id: %s", len(ratings), movie_id)
+    return ratings, aggregated_rating, next_cursor
@@ -1,11 +1,13 @@
 from datetime import datetime, timedelta
 from uuid import UUID
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.db.models.user import User
 from app.db.schemas.user import UserCreate
 from app.core.security import get_password_hash
 from app.utils.logger import logger
-from app.utils.email import send_verification_email
+from app.utils.email import email_worker, queue_verification_email
 from uuid import uuid4
 from app.core.config import settings
 
@@ -24,38 +26,71 @@ def create_user(db: Session, user: UserCreate):
         verification_token_expiry=verification_token_expiry
     )
     db.add(db_user)
+    queue_verification_email(db, user.email, verification_token)
     db.commit()
     db.refresh(db_user)
-    logger.info(f"User created with email: {user.email}")
-    send_verification_email(user.email, verification_token)
+    email_worker.notify()
+    logger.info("User created with email: %s", user.email)
     return db_user
 
 
 
 def get_user_by_email(db: Session, email: str):
-    logger.info(f"Fetching user by email: {email}")
+    logger.info("Fetching user by email: %s", email)
     user = db.query(User).filter(User.email == email).first()
     if user:
-        logger.info(f"User found: {email}")
+        logger.info("User found: %s", email)
     else:
-        logger.info(f"User not found: {email}")
+        logger.info("User not found: %s", email)
     return user
 
 def get_user_by_verification_token(db: Session, token: str) -> User:
-    logger.info(f"Fetching user by verification token: {token}")
+    logger.info("Fetching user by verification token: %s", token)
     token = db.query(User).filter(User.verification_token == token).first()
     if token:
-        logger.info(f"User found with verification token: {token}")
+        logger.info("User found with verification token: %s", token)
     else:
-        logger.info(f"User not found with verification token: {token}")
+        logger.info("User not found with verification token: %s", token)
     return token
 
 
 def get_user(db: Session, user_id: UUID):
-    logger.info(f"Fetching user by ID: {user_id}")
+    logger.info("Fetching user by ID: %s", user_id)
     user = db.query(User).filter(User.id == user_id).first()
     if user:
-        logger.info(f"User found with ID: {user_id}")
+        logger.info("User found with ID: %s", user_id)
     else:
-        logger.info(f"User not found with ID: {user_id}")
+        logger.info("User not found with ID: %s", user_id)
+    return user
+
+
+async def get_user_by_email_async(db: AsyncSession, email: str):
+    logger.info("Fetching user by email: %s", email)
+    result = await db.execute(select(User).filter(User.email == email))
+    user = result.scalars().first()
+    if user:
+        logger.info("User found: %s", email)
+    else:
+        logger.info("User not found: %s", email)
+    return user
+
+
+async def get_user_by_verification_token_async(db: AsyncSession, token: str) -> User:
+    logger.info("Fetching user by verification token: %s", token)
+    result = await db.execute(select(User).filter(User.verification_token == token))
+    user = result.scalars().first()
+    if user:
+        logger.info("User found with verification token: %s", token)
+    else:
+        logger.info("User not found with verification token: %s", token)
+    return user
+
+
+async def get_user_async(db: AsyncSession, user_id: UUID):
+    logger.info("Fetching user by ID: %s", user_id)
+    user = await db.get(User, user_id)
+    if user:
+        logger.info("User found with ID: %s", user_id)
+    else:
+        logger.info("User not found with ID: %s", user_id)
     return user
@@ -1,23 +1,55 @@
-from sqlalchemy import Column, String, ForeignKey
+from sqlalchemy import Column, Index, String, ForeignKey, and_, event, select
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import uuid
 from app.db.session import Base
 from app.db.timestamp import Timestamp
 
+# A comment's path is the hex ids of its ancestors followed by its own, so every
+# comment in a thread shares the root's path as a prefix and depth is
+# len(path) / PATH_SEGMENT_LENGTH - 1.
+PATH_SEGMENT_LENGTH = 32
+
+
 class Comment(Base, Timestamp):
     __tablename__ = "comments"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
     content = Column(String(1000), index=True)
-    movie_id = Column(UUID(as_uuid=True), ForeignKey("movies.id"), nullable=True)
-    parent_comment_id = Column(UUID(as_uuid=True), ForeignKey("comments.id"), nullable=True)
+    movie_id = Column(UUID(as_uuid=True), ForeignKey("movies.id", ondelete="CASCADE"), nullable=True)
+    parent_comment_id = Column(UUID(as_uuid=True), ForeignKey("comments.id", ondelete="CASCADE"), nullable=True)
+    path = Column(String, nullable=False)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
 
     user = relationship("User", back_populates="comments")
     movie = relationship("Movie", back_populates="comments")
     parent_comment = relationship("Comment", remote_side=[id], back_populates="replies")
-    replies = relationship("Comment", back_populates="parent_comment", cascade="all, delete-orphan", lazy="selectin")
+    replies = relationship("Comment", back_populates="parent_comment", cascade="all, delete-orphan", lazy="raise_on_sql",
+                           passive_deletes=True, order_by="[Comment.created_at, Comment.id]")
+
+    __table_args__ = (
+        Index('ix_comments_movie_id_parent_created_at_id', 'movie_id', 'parent_comment_id', 'created_at', 'id'),
+        Index('ix_comments_parent_created_at_id', 'parent_comment_id', 'created_at', 'id'),
+        Index('ix_comments_path', 'path'),
+    )
+
+
+def subtree_condition(root_path, path):
+    """
+    Matches the paths in the subtree rooted at `root_path`, itself included, as a
+    range over the path index. Paths are lowercase hex, which sorts below "g".
+    """
+    return and_(path >= root_path, path < root_path + "g")
 
 
-    
\ No newline at end of file
+@event.listens_for(Comment, "before_insert")
+def assign_path(mapper, connection, comment):
+    """Fill in the path of comments created without one, looking up the parent's path if needed."""
+    if comment.path is not None:
+        return
+    if comment.id is None:
+        comment.id = uuid.uuid4()
+    parent_path = ""
+    if comment.parent_comment_id is not None:
+        parent_path = connection.execute(select(Comment.path).where(Comment.id == comment.parent_comment_id)).scalar_one()
+    comment.path = parent_path + comment.id.hex
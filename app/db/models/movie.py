@@ -1,11 +1,12 @@
-from sqlalchemy import Column, String, ForeignKey, Date, Integer
+from sqlalchemy import Column, String, ForeignKey, Date, DateTime, Float, Integer, event
 from sqlalchemy.orm import relationship
+from app.db.search import create_search_index
 from app.db.session import Base
 from app.db.timestamp import Timestamp
 import uuid
 from sqlalchemy.dialects.postgresql import UUID
 
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import Index, UniqueConstraint
 
 class Movie(Base, Timestamp):
     __tablename__ = "movies"
@@ -17,11 +18,24 @@ class Movie(Base, Timestamp):
     release_date = Column(Date, nullable=False)
     poster_url = Column(String)
     owner_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
+    rating_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_sum = Column(Integer, nullable=False, default=0, server_default="0")
+    average_rating = Column(Float, nullable=False, default=0, server_default="0")
+    # Set when the movie is soft-deleted; the row is hidden and purged in the background.
+    deleted_at = Column(DateTime, nullable=True)
 
     owner = relationship("User", back_populates="movies")
-    ratings = relationship("Rating", back_populates="movie", cascade="all, delete-orphan")
-    comments = relationship("Comment", back_populates="movie", cascade="all, delete-orphan")
+    # The database deletes ratings and comments along with the movie (ON DELETE CASCADE).
+    ratings = relationship("Rating", back_populates="movie", cascade="all, delete-orphan", passive_deletes=True)
+    comments = relationship("Comment", back_populates="movie", cascade="all, delete-orphan", passive_deletes=True)
 
-    __table_args__ = (UniqueConstraint('title', 'release_date', name='_title_release_date_uc'),)
+    __table_args__ = (
+        UniqueConstraint('title', 'release_date', name='_title_release_date_uc'),
+        Index('ix_movies_created_at_id', 'created_at', 'id'),
+        Index('ix_movies_release_date_id', 'release_date', 'id'),
+        Index('ix_movies_average_rating_id', 'average_rating', 'id'),
+        Index('ix_movies_average_rating_release_date_id', 'average_rating', 'release_date', 'id'),
+    )
 
 
+event.listen(Base.metadata, "after_create", create_search_index)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Index, Integer, String, ForeignKey, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from app.db.session import Base
@@ -9,9 +9,16 @@ class Rating(Base, Timestamp):
     __tablename__ = "ratings"
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
     score = Column(Integer, nullable=False)
+    # The score replaced by the latest update; NULL until the rating is first changed.
+    previous_score = Column(Integer, nullable=True)
     review = Column(String(length=2000), nullable=True)
-    movie_id = Column(UUID(as_uuid=True), ForeignKey("movies.id"), nullable=False)
+    movie_id = Column(UUID(as_uuid=True), ForeignKey("movies.id", ondelete="CASCADE"), nullable=False)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     
     movie = relationship("Movie", back_populates="ratings")
     user = relationship("User", back_populates="ratings")
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'movie_id', name='_user_movie_rating_uc'),
+        Index('ix_ratings_movie_id_created_at_id', 'movie_id', 'created_at', 'id'),
+    )
@@ -0,0 +1,77 @@
+"""
+Connection pools that count how often a checkout had to wait for a connection.
+
+`InstrumentedQueuePool` and `InstrumentedAsyncQueuePool` behave like the
+SQLAlchemy pools they extend. On top of that, every checkout is recorded in a
+`PoolTelemetry` looked up by the pool's logging name, so the counts survive
+`engine.dispose()` recreating the pool. A checkout is *exhausted* when every
+connection the pool may open is already checked out; its time until a
+connection is returned is counted as wait time, and one that gives up after
+`pool_timeout` is counted as a timeout and logged.
+"""
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.utils.logger import logger
+
+
+class PoolTelemetry:
+    def __init__(self):
+        self.checkouts = 0
+        self.exhausted = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        # The sync pool is used from the thread pool, so updates are serialised.
+        self._lock = threading.Lock()
+
+    def record(self, exhausted: bool, waited: float, timed_out: bool = False):
+        with self._lock:
+            if not timed_out:
+                self.checkouts += 1
+            if exhausted:
+                self.exhausted += 1
+                self.wait_seconds += waited
+            if timed_out:
+                self.timeouts += 1
+
+    def stats(self) -> dict:
+        return {"checkouts": self.checkouts, "exhausted": self.exhausted, "timeouts": self.timeouts, "wait_seconds": round(self.wait_seconds, 6)}
+
+
+pool_telemetry: dict = {}
+
+
+def get_pool_telemetry(name: str) -> PoolTelemetry:
+    telemetry = pool_telemetry.get(name)
+    if telemetry is None:
+        telemetry = pool_telemetry.setdefault(name, PoolTelemetry())
+    return telemetry
+
+
+class TelemetryMixin:
+    def _do_get(self):
+        telemetry = get_pool_telemetry(self._orig_logging_name or "default")
+        exhausted = self._pool.empty() and -1 < self._max_overflow <= self._overflow
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            telemetry.record(True, time.perf_counter() - started, timed_out=True)
+            logger.warning(
+                "Connection pool %s exhausted: no connection within %ss (size %s, overflow %s)",
+                self._orig_logging_name, self._timeout, self.size(), self._max_overflow,
+            )
+            raise
+        telemetry.record(exhausted, time.perf_counter() - started)
+        return connection
+
+
+class InstrumentedQueuePool(TelemetryMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(TelemetryMixin, AsyncAdaptedQueuePool):
+    pass
@@ -0,0 +1,55 @@
+"""
+Consistency repair for the materialized comment paths.
+
+Recomputes `path` for every comment from the `parent_comment_id` links, walking
+each thread from its root, and fixes the rows that have drifted. Migration
+`0003` fills in the paths of comments created before the column existed.
+
+Usage:
+    python -m app.db.rebuild_comment_paths
+"""
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm import Session
+
+from app.db.models.comment import Comment
+from app.db.models.movie import Movie  # noqa: F401  (needed to configure the Comment mapper)
+from app.db.models.rating import Rating  # noqa: F401
+from app.db.models.user import User  # noqa: F401
+from app.db.session import SessionLocal
+from app.utils.logger import logger
+
+
+def rebuild_comment_paths(db: Session) -> int:
+    rows = db.execute(select(Comment.id, Comment.parent_comment_id, Comment.path)).all()
+    children = {}
+    for row in rows:
+        children.setdefault(row.parent_comment_id, []).append(row)
+
+    repairs = []
+    level = [(row, "") for row in children.get(None, [])]
+    while level:
+        next_level = []
+        for row, parent_path in level:
+            path = parent_path + row.id.hex
+            if row.path != path:
+                repairs.append({"comment_id": row.id, "path": path})
+            next_level.extend((child, path) for child in children.get(row.id, []))
+        level = next_level
+
+    if repairs:
+        db.execute(
+            update(Comment.__table__).where(Comment.__table__.c.id == bindparam("comment_id")).values(path=bindparam("path")),
+            repairs,
+        )
+    db.commit()
+    logger.info("Rebuilt paths for %s comments", len(repairs))
+    return len(repairs)
+
+
+if __name__ == "__main__":
+    session = SessionLocal()
+    try:
+        repaired = rebuild_comment_paths(session)
+    finally:
+        session.close()
+    print(f"Repaired paths for {repaired} comments.")
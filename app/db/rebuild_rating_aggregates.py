@@ -0,0 +1,47 @@
+"""
+Consistency repair for the per-movie rating aggregates.
+
+Recomputes `rating_count`, `rating_sum` and `average_rating` on every movie
+from the `ratings` table and fixes the rows that have drifted.
+
+Usage:
+    python -m app.db.rebuild_rating_aggregates
+"""
+from sqlalchemy import Float, case, cast, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.db.models.comment import Comment  # noqa: F401  (needed to configure the Movie mapper)
+from app.db.models.movie import Movie
+from app.db.models.rating import Rating
+from app.db.models.user import User  # noqa: F401
+from app.db.session import SessionLocal
+from app.utils.logger import logger
+
+
+def rebuild_rating_aggregates(db: Session) -> int:
+    count = select(func.count(Rating.id)).where(Rating.movie_id == Movie.id).scalar_subquery()
+    total = select(func.coalesce(func.sum(Rating.score), 0)).where(Rating.movie_id == Movie.id).scalar_subquery()
+    average = case((count > 0, cast(total, Float) / count), else_=0.0)
+    result = db.execute(
+        update(Movie)
+        .where(or_(Movie.rating_count != count, Movie.rating_sum != total, Movie.average_rating != average))
+        .values(
+            rating_count=count,
+            rating_sum=total,
+            average_rating=average,
+            updated_at=Movie.updated_at,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    logger.info("Rebuilt rating aggregates for %s movies", result.rowcount)
+    return result.rowcount
+
+
+if __name__ == "__main__":
+    session = SessionLocal()
+    try:
+        repaired = rebuild_rating_aggregates(session)
+    finally:
+        session.close()
+    print(f"Repaired rating aggregates for {repaired} movies.")
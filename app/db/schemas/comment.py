@@ -1,5 +1,5 @@
 from enum import Enum
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 from uuid import UUID
 from typing import Optional, List
 from datetime import datetime
@@ -23,6 +23,7 @@ class CommentResponse(CommentBase):
     parent_comment_id: Optional[UUID] = Field(None, description="ID of the parent comment if this is a reply")
     created_at: datetime = Field(..., description="Timestamp when the comment was created")
     updated_at: datetime = Field(..., description="Timestamp when the comment was last updated")
+    reply_count: int = Field(0, description="Total number of direct replies to this comment")
     replies: Optional[List["CommentResponse"]] = Field(default=None, description="List of replies to this comment", exclude_unset=True)
 
 
@@ -37,6 +38,8 @@ class CommentResponse(CommentBase):
 
 CommentResponse.update_forward_refs()
 
+comment_list_adapter = TypeAdapter(List[CommentResponse])
+
 
 class NestedCommentCreate(BaseModel):
     content: str = Field(..., max_length=1000, description="The content of the nested comment")
@@ -51,3 +54,6 @@ class BaseResponse(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+
+class PaginatedResponse(BaseResponse):
+    next_cursor: Optional[str] = Field(None, description="Cursor for fetching the next page of comments, if there is one")
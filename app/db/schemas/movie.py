@@ -1,6 +1,6 @@
 from enum import Enum
 from typing import Any, Optional
-from pydantic import AnyUrl, BaseModel, ConfigDict, Field, validator
+from pydantic import AnyUrl, BaseModel, ConfigDict, Field, TypeAdapter, validator
 from datetime import datetime, date
 from uuid import UUID
 
@@ -39,6 +39,8 @@ class MovieResponse(MovieBase):
 
     model_config = ConfigDict(from_attributes=True)
 
+movie_list_adapter = TypeAdapter(list[MovieResponse])
+
 class BaseResponse(BaseModel):
     success: bool = Field(..., description="Indicates whether the request was successful")
     status_code: int = Field(..., description="HTTP status code of the response")
@@ -47,3 +49,6 @@ class BaseResponse(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+
+class PaginatedResponse(BaseResponse):
+    next_cursor: Optional[str] = Field(None, description="Cursor for fetching the next page of movies, if there is one")
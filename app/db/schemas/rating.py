@@ -1,6 +1,6 @@
 from datetime import datetime
 from enum import IntEnum
-from pydantic import BaseModel, ConfigDict, Field, validator
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, validator
 from typing import Annotated, Optional, Any
 from uuid import UUID
 
@@ -36,6 +36,9 @@ class RatingResponse(RatingBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+rating_list_adapter = TypeAdapter(list[RatingResponse])
+
+
 class AggregatedRating(BaseModel):
     average_score: Optional[float] = Field(None, description="The average rating score for the movie")
 
@@ -54,3 +57,6 @@ class BaseResponse(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+
+class PaginatedResponse(BaseResponse):
+    next_cursor: Optional[str] = Field(None, description="Cursor for fetching the next page of ratings, if there is one")
@@ -0,0 +1,137 @@
+"""
+Full-text search support for movies.
+
+PostgreSQL keeps a generated `search_vector` tsvector column on `movies` with a
+GIN index over it. SQLite keeps an FTS5 table, `movies_fts`, keyed by movie id
+and kept in sync by triggers on `movies`. Any other backend falls back to LIKE
+filtering without ranking.
+"""
+import re
+
+from sqlalchemy import func, literal_column, or_, select, table, column
+
+SEARCH_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+POSTGRES_SEARCH_DDL = [
+    """
+    ALTER TABLE movies ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_movies_search_vector ON movies USING GIN (search_vector)",
+]
+
+# movies has a UUID key, and its implicit rowid can change (VACUUM may renumber
+# it), so the index stores the movie id itself. movies_fts_rowids gives every
+# movie a stable row in movies_fts, which the triggers look up to update or
+# delete a single entry instead of scanning the index for the id.
+SQLITE_SEARCH_TABLES_DDL = [
+    """
+    CREATE VIRTUAL TABLE movies_fts USING fts5(
+        movie_id UNINDEXED, title, description, tokenize='porter unicode61'
+    )
+    """,
+    "CREATE TABLE movies_fts_rowids (fts_rowid INTEGER PRIMARY KEY, movie_id UUID NOT NULL UNIQUE)",
+    "INSERT INTO movies_fts_rowids(movie_id) SELECT id FROM movies",
+    """
+    INSERT INTO movies_fts(rowid, movie_id, title, description)
+    SELECT movies_fts_rowids.fts_rowid, movies.id, movies.title, movies.description
+    FROM movies JOIN movies_fts_rowids ON movies_fts_rowids.movie_id = movies.id
+    """,
+]
+
+SQLITE_FTS_ROWID = "(SELECT fts_rowid FROM movies_fts_rowids WHERE movie_id = {}.id)"
+
+SQLITE_SEARCH_TRIGGERS_DDL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS movies_fts_after_insert AFTER INSERT ON movies BEGIN
+        INSERT INTO movies_fts_rowids(movie_id) VALUES (new.id);
+        INSERT INTO movies_fts(rowid, movie_id, title, description) VALUES ({SQLITE_FTS_ROWID.format("new")}, new.id, new.title, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS movies_fts_after_delete AFTER DELETE ON movies BEGIN
+        DELETE FROM movies_fts WHERE rowid = {SQLITE_FTS_ROWID.format("old")};
+        DELETE FROM movies_fts_rowids WHERE movie_id = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS movies_fts_after_update AFTER UPDATE OF title, description ON movies BEGIN
+        UPDATE movies_fts SET title = new.title, description = new.description WHERE rowid = {SQLITE_FTS_ROWID.format("new")};
+    END
+    """,
+]
+
+# An index from before movies_fts stored the movie id points at movies.rowid; it is dropped and rebuilt.
+SQLITE_LEGACY_SEARCH_DROP_DDL = [
+    "DROP TRIGGER IF EXISTS movies_fts_after_insert",
+    "DROP TRIGGER IF EXISTS movies_fts_after_delete",
+    "DROP TRIGGER IF EXISTS movies_fts_after_update",
+    "DROP TABLE movies_fts",
+]
+
+# Title matches weigh more than description matches, mirroring the 'A'/'B' weights used on PostgreSQL.
+SQLITE_TITLE_WEIGHT = 10.0
+SQLITE_DESCRIPTION_WEIGHT = 1.0
+
+movies_fts = table("movies_fts", column("movie_id"))
+
+
+def create_search_index(target, connection, **kw):
+    """Create the full-text index objects; safe to run on every `create_all`."""
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        for statement in POSTGRES_SEARCH_DDL:
+            connection.exec_driver_sql(statement)
+    elif dialect == "sqlite":
+        existing = connection.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'movies_fts'"
+        ).scalar()
+        if existing is not None and "movie_id" not in existing:
+            for statement in SQLITE_LEGACY_SEARCH_DROP_DDL:
+                connection.exec_driver_sql(statement)
+            existing = None
+        if existing is None:
+            for statement in SQLITE_SEARCH_TABLES_DDL:
+                connection.exec_driver_sql(statement)
+        for statement in SQLITE_SEARCH_TRIGGERS_DDL:
+            connection.exec_driver_sql(statement)
+
+
+def get_search_tokens(search: str) -> list[str]:
+    return SEARCH_TOKEN_PATTERN.findall(search.lower())
+
+
+def apply_movie_search(query, movie_model, search: str, dialect: str):
+    """
+    Restrict `query` to movies matching `search` and return it together with a
+    relevance score where higher means more relevant (or None when the backend
+    cannot rank).
+
+    Every search term is matched as a prefix and all terms must match.
+    """
+    tokens = get_search_tokens(search)
+    if tokens and dialect == "postgresql":
+        ts_query = func.to_tsquery("english", " & ".join(f"{token}:*" for token in tokens))
+        search_vector = literal_column("movies.search_vector")
+        query = query.filter(search_vector.op("@@")(ts_query))
+        return query, func.ts_rank_cd(search_vector, ts_query)
+    if tokens and dialect == "sqlite":
+        match = " ".join(f'"{token}"*' for token in tokens)
+        ranked = (
+            select(
+                movies_fts.c.movie_id.label("movie_id"),
+                # bm25() is negative and lower is better; negate it so higher means more relevant.
+                (-func.bm25(literal_column("movies_fts"), SQLITE_TITLE_WEIGHT, SQLITE_DESCRIPTION_WEIGHT)).label("rank"),
+            )
+            .where(literal_column("movies_fts").op("MATCH")(match))
+            # Materialized so SQLite never flattens bm25() into an outer aggregate query.
+            .cte("ranked_movies")
+            .prefix_with("MATERIALIZED")
+        )
+        query = query.join(ranked, ranked.c.movie_id == movie_model.id)
+        return query, ranked.c.rank
+    query = query.filter(or_(movie_model.title.contains(search), movie_model.description.contains(search)))
+    return query, None
@@ -1,7 +1,11 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.db.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool
+from app.utils.request_stats import install_query_listeners
 
 
 if settings.TESTING:
@@ -9,9 +13,80 @@ if settings.TESTING:
 else:
     SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def get_async_database_url(url: str) -> str:
+    db_url = make_url(url)
+    backend = db_url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for database backend: {backend}")
+    return db_url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def statement_timeout_connect_args(url: str) -> dict:
+    """Driver-specific connect arguments that cap statement time at `DB_STATEMENT_TIMEOUT_MS` on PostgreSQL."""
+    db_url = make_url(url)
+    if not settings.DB_STATEMENT_TIMEOUT_MS or db_url.get_backend_name() != "postgresql":
+        return {}
+    if db_url.get_driver_name() == "asyncpg":
+        return {"server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}}
+    return {"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"}
+
+
+def is_sqlite_memory_url(url: str) -> bool:
+    db_url = make_url(url)
+    if db_url.get_backend_name() != "sqlite":
+        return False
+    return db_url.database in (None, "", ":memory:") or db_url.query.get("mode") == "memory"
+
+
+def engine_options(url: str, pool_name: str, poolclass) -> dict:
+    """
+    Pool settings for `url`. In-memory SQLite keeps the dialect's default pool,
+    which shares the one connection that holds the database; with a queue pool
+    every connection would open its own empty database.
+    """
+    if is_sqlite_memory_url(url):
+        return {"pool_logging_name": pool_name, "connect_args": statement_timeout_connect_args(url)}
+    return {
+        "poolclass": poolclass,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_logging_name": pool_name,
+        "connect_args": statement_timeout_connect_args(url),
+    }
+
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL, "sync", InstrumentedQueuePool))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+ASYNC_DATABASE_URL = get_async_database_url(SQLALCHEMY_DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, "async", InstrumentedAsyncQueuePool))
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+
+def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite only enforces foreign keys when asked to, per connection.
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+if make_url(SQLALCHEMY_DATABASE_URL).get_backend_name() == "sqlite":
+    event.listen(engine, "connect", enable_sqlite_foreign_keys)
+    event.listen(async_engine.sync_engine, "connect", enable_sqlite_foreign_keys)
+
+install_query_listeners(engine)
+install_query_listeners(async_engine.sync_engine)
+
 Base = declarative_base()
 
 
@@ -20,4 +95,9 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
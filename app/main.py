@@ -1,25 +1,42 @@
 from fastapi import FastAPI
+from app.core.config import settings
+from app.core.security import shutdown_password_executor
 from app.db.init_db import init_db
-from app.db.session import SessionLocal
+from app.db.session import SessionLocal, async_engine
 from app.middlewares.middleware_setup import setup_middlewares
 from app.routers import api_version
+from app.services.auth import token_cache, user_cache
+from app.services.movie_service import movie_flight, movie_list_flight
+from app.services.rating_service import rating_list_flight
+from app.utils.cache import movie_cache
+from app.utils.email import email_worker
 from app.utils.logger import logger
-from slowapi.errors import RateLimitExceeded
-from slowapi import _rate_limit_exceeded_handler
-from app.utils.rate_limiter import limiter
+from app.utils.metrics import metrics_flush_worker, register_cache, register_single_flight
+from app.utils.movie_purge import movie_purge_worker
+from app.utils.response_cache import response_cache
+from app.utils.responses import TimedORJSONResponse
+from app.utils.rate_limiter import RateLimitExceeded, rate_limit_exceeded_handler
 
 
 app = FastAPI(
     title="Movie Listing API",
     description="Welcome to the Movie Listing API! This API allows you to manage movies, including adding, viewing, updating, and deleting movies. Enjoy a seamless experience with our authentication, user management, and rating systems.",
     version="1.0.0",
+    default_response_class=TimedORJSONResponse,
 )
 
 app.include_router(api_version)
 setup_middlewares(app)
 
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
+
+register_cache("movie", movie_cache.entries)
+register_cache("token", token_cache)
+register_cache("user", user_cache)
+register_cache("response", response_cache.entries)
+register_single_flight("movie", movie_flight)
+register_single_flight("movie_list", movie_list_flight)
+register_single_flight("rating_list", rating_list_flight)
 
 
 
@@ -31,7 +48,24 @@ async def startup_event():
         init_db(db)
     finally:
         db.close()
+    if settings.EMAIL_QUEUE_ENABLED:
+        email_worker.start()
+    if settings.MOVIE_SOFT_DELETE:
+        movie_purge_worker.start()
+    if settings.METRICS_MULTIPROC_DIR:
+        metrics_flush_worker.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Shutting down...")
+    await email_worker.stop()
+    await movie_purge_worker.stop()
+    await metrics_flush_worker.stop()
+    logger.info("Movie cache stats: %s", movie_cache.entries.stats())
+    if settings.AUTH_USER_CACHE_ENABLED:
+        logger.info("Token cache stats: %s", token_cache.stats())
+        logger.info("User cache stats (hits are saved user lookups): %s", user_cache.stats())
+    if settings.RESPONSE_CACHE_ENABLED:
+        logger.info("Response cache stats: %s", response_cache.entries.stats())
+    await async_engine.dispose()
+    shutdown_password_executor()
@@ -1,19 +1,19 @@
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
-from fastapi import Request, HTTPException
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+from fastapi import HTTPException
 
-class AuthMiddleware(BaseHTTPMiddleware):
+class AuthMiddleware:
     def __init__(self, app: ASGIApp, excluded_paths: list = None):
-        super().__init__(app)
-        self.excluded_paths = excluded_paths if excluded_paths else []
+        self.app = app
+        self.excluded_paths = tuple(excluded_paths) if excluded_paths else ()
 
-    async def dispatch(self, request: Request, call_next):
-        if any(request.url.path.startswith(path) for path in self.excluded_paths):
-            return await call_next(request)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"].startswith(self.excluded_paths):
+            await self.app(scope, receive, send)
+            return
 
-        access_token = request.headers.get("Authorization")
+        access_token = Headers(scope=scope).get("Authorization")
         if not access_token:
             raise HTTPException(status_code=401, detail="Authorization required")
-        
-        response = await call_next(request)
-        return response
+
+        await self.app(scope, receive, send)
@@ -1,17 +1,39 @@
-from fastapi import Request, HTTPException
+from fastapi import HTTPException
 from fastapi.responses import JSONResponse
 from pydantic import ValidationError
 from sqlalchemy.exc import IntegrityError
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.middleware.base import RequestResponseEndpoint
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from app.utils.logger import logger
 
-class ErrorHandlingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint):
+class ErrorHandlingMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def send_wrapper(message: Message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
         try:
-            response = await call_next(request)
-            return response
-        except HTTPException as exc:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as exc:
+            if response_started:
+                # Part of the response is already on the wire; nothing can replace it.
+                raise
+            response = self.error_response(exc)
+            await response(scope, receive, send)
+
+    @staticmethod
+    def error_response(exc: Exception) -> JSONResponse:
+        if isinstance(exc, HTTPException):
             return JSONResponse(
                 status_code=exc.status_code,
                 content={
@@ -20,13 +42,13 @@ class ErrorHandlingMiddleware(BaseHTTPMiddleware):
                     "message": exc.detail,
                 },
             )
-        except ValidationError as exc:
+        if isinstance(exc, ValidationError):
             errors = []
             for error in exc.errors():
                 loc = ' -> '.join([str(l) for l in error['loc']])
                 msg = error['msg']
                 errors.append(f"{loc}: {msg}")
-            logger.error(f"Validation error: {errors}")
+            logger.error("Validation error: %s", errors)
             return JSONResponse(
                 status_code=422,
                 content={
@@ -36,8 +58,8 @@ class ErrorHandlingMiddleware(BaseHTTPMiddleware):
                     "errors": errors,
                 },
             )
-        except IntegrityError as exc:
-            logger.exception(f"Exception occurred: {exc}")
+        if isinstance(exc, IntegrityError):
+            logger.exception("Exception occurred: %s", exc)
             return JSONResponse(
                 status_code=400,
                 content={
@@ -46,13 +68,12 @@ class ErrorHandlingMiddleware(BaseHTTPMiddleware):
                     "message": "An unexpected error occurred: Integrity Error",
                 },
             )
-        except Exception as exc:
-            logger.exception(f"Exception occurred: {exc}")
-            return JSONResponse(
-                status_code=500,
-                content={
-                    "status": False,
-                    "status_code": 500,
-                    "message": "An unexpected error occurred: Internal Server Error",
-                },
-            )
+        logger.exception("Exception occurred: %s", exc)
+        return JSONResponse(
+            status_code=500,
+            content={
+                "status": False,
+                "status_code": 500,
+                "message": "An unexpected error occurred: Internal Server Error",
+            },
+        )
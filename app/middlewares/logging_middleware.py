@@ -1,22 +1,25 @@
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
-from starlette.types import ASGIApp
+import logging
+from starlette.datastructures import URL
+from starlette.types import ASGIApp, Receive, Scope, Send
 from datetime import datetime
 from app.utils.logger import logger
 
-class LoggingMiddleware(BaseHTTPMiddleware):
+class LoggingMiddleware:
     def __init__(self, app: ASGIApp):
-        super().__init__(app)
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
         start_time = datetime.now()
-        logger.info(f"{start_time} - Starting request: {request.method} {request.url}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("%s - Starting request: %s %s", start_time, scope['method'], URL(scope=scope))
         try:
-            response = await call_next(request)
+            await self.app(scope, receive, send)
             process_time = datetime.now() - start_time
-            logger.info(f"{start_time} - Request processed successfully in {process_time.total_seconds()} seconds")
-            return response
+            logger.info("%s - Request processed successfully in %s seconds", start_time, process_time.total_seconds())
         except Exception as e:
-            logger.exception(f"{start_time} - An error occurred while processing the request: {e}")
+            logger.exception("%s - An error occurred while processing the request: %s", start_time, e)
             raise
-
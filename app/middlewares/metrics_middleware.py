@@ -0,0 +1,39 @@
+import time
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+from app.middlewares.query_stats_middleware import route_template
+from app.utils.metrics import request_duration, requests_in_flight, responses_total
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class MetricsMiddleware:
+    """Records request latency, in-flight requests and response status codes for `/metrics`."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not settings.METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        requests_in_flight.inc((method,))
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            requests_in_flight.dec((method,))
+            # Unmatched paths share one label so that scanners cannot create unbounded series.
+            route = route_template(scope, UNMATCHED_ROUTE)
+            request_duration.observe(time.perf_counter() - started, (method, route))
+            responses_total.inc((method, route, str(status_code)))
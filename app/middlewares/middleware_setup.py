@@ -3,12 +3,16 @@ from app.middlewares.auth_middleware import AuthMiddleware
 from app.middlewares.cors_middleware import add_cors_middleware
 from app.middlewares.error_handling_middleware import ErrorHandlingMiddleware
 from app.middlewares.logging_middleware import LoggingMiddleware
-from slowapi.middleware import SlowAPIMiddleware
+from app.middlewares.metrics_middleware import MetricsMiddleware
+from app.middlewares.profiling_middleware import ProfilingMiddleware
+from app.middlewares.query_stats_middleware import QueryStatsMiddleware
 
 
 def setup_middlewares(app: FastAPI):
     app.add_middleware(ErrorHandlingMiddleware)
+    app.add_middleware(ProfilingMiddleware)
+    app.add_middleware(QueryStatsMiddleware)
     app.add_middleware(LoggingMiddleware)
-    app.add_middleware(AuthMiddleware, excluded_paths=["/", "/docs", "/openapi.json", "/auth/login", "/auth/register/"])
-    app.add_middleware(SlowAPIMiddleware)
+    app.add_middleware(AuthMiddleware, excluded_paths=["/", "/docs", "/openapi.json", "/auth/login", "/auth/register/", "/metrics"])
     add_cors_middleware(app)
+    app.add_middleware(MetricsMiddleware)
@@ -0,0 +1,108 @@
+import hmac
+import random
+import threading
+import time
+from typing import Optional
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+from app.middlewares.query_stats_middleware import route_template
+from app.utils.logger import logger
+from app.utils.profiling import create_profiler, profile_name, sql_timeline, store_profile
+from app.utils.request_stats import RequestStats, current_request_stats
+
+PROFILE_TOKEN_HEADER = "x-profile-token"
+
+
+class ProfilingMiddleware:
+    """
+    Runs selected requests under a profiler while `PROFILING_ENABLED` is on. A
+    request is profiled when its `X-Profile-Token` header matches
+    `PROFILING_TOKEN`, or at random for one request in
+    `PROFILING_SAMPLE_EVERY_N`. The profile and the request's SQL timeline are
+    stored in `PROFILING_DIR`, and a requested profile's name is returned in
+    an `X-Profile` header. One request per process is profiled at a time;
+    requests that arrive meanwhile run normally.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._busy = threading.Lock()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not settings.PROFILING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        reason = self._reason(scope)
+        if reason is None or not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self._profile(scope, receive, send, reason)
+        finally:
+            self._busy.release()
+
+    @staticmethod
+    def _reason(scope: Scope) -> Optional[str]:
+        token = Headers(scope=scope).get(PROFILE_TOKEN_HEADER)
+        if token is not None:
+            if settings.PROFILING_TOKEN and hmac.compare_digest(token.encode(), settings.PROFILING_TOKEN.encode()):
+                return "requested"
+            logger.warning("Ignoring %s header with an invalid token on %s", PROFILE_TOKEN_HEADER, scope["path"])
+        sample_every = settings.PROFILING_SAMPLE_EVERY_N
+        if sample_every > 0 and random.randrange(sample_every) == 0:
+            return "sampled"
+        return None
+
+    async def _profile(self, scope: Scope, receive: Receive, send: Send, reason: str):
+        name = profile_name(scope["method"], scope["path"])
+        stats = current_request_stats.get()
+        token = None
+        if stats is None:
+            stats = RequestStats()
+            token = current_request_stats.set(stats)
+        # Shares QueryStatsMiddleware's collector when there is one, so both see the statements.
+        stats.timeline = []
+        status_code = 500
+
+        async def send_with_profile(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if reason == "requested":
+                    MutableHeaders(scope=message).append("X-Profile", name)
+            await send(message)
+
+        profiler = create_profiler(settings.PROFILING_MODE, settings.PROFILING_INTERVAL_MS / 1000)
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            profiler.stop()
+            total = time.perf_counter() - started
+            timeline, stats.timeline = stats.timeline, None
+            if token is not None:
+                current_request_stats.reset(token)
+
+            route = route_template(scope)
+            metadata = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": route,
+                "status": status_code,
+                "reason": reason,
+                "mode": settings.PROFILING_MODE,
+                "duration_ms": round(total * 1000, 3),
+                **profiler.summary(),
+                "queries": len(timeline),
+                "db_ms": round(sum(elapsed for _, elapsed, _ in timeline) * 1000, 3),
+                "sql": sql_timeline(timeline, started),
+            }
+            try:
+                await run_in_threadpool(store_profile, settings.PROFILING_DIR, name, profiler, metadata, settings.PROFILING_MAX_FILES)
+                logger.info("Stored %s profile %s for %s %s (%.2f ms)", reason, name, scope["method"], route, total * 1000)
+            except OSError:
+                logger.exception("Could not store profile %s", name)
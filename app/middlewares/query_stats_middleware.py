@@ -0,0 +1,74 @@
+import time
+from typing import Optional
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+from app.utils.logger import logger
+from app.utils.request_stats import RequestStats, current_request_stats
+
+
+_route_paths: dict = {}
+
+
+def route_template(scope: Scope, default: Optional[str] = None) -> str:
+    """
+    The path template of the matched route, so that summaries group by endpoint
+    rather than by URL. Unmatched requests get `default`, or their raw path.
+    """
+    endpoint = scope.get("endpoint")
+    path = _route_paths.get(endpoint)
+    if path is None and endpoint is not None and scope.get("app") is not None:
+        for route in scope["app"].router.routes:
+            if getattr(route, "endpoint", None) is endpoint:
+                path = _route_paths[endpoint] = route.path
+                break
+    if path is None:
+        return scope["path"] if default is None else default
+    return path
+
+
+class QueryStatsMiddleware:
+    """
+    Collects the SQL statements, database time and serialisation time of each
+    request while `QUERY_STATS_ENABLED` is on. The totals go out in a
+    `Server-Timing` header and a per-route log summary, and statement shapes
+    repeated more than `QUERY_STATS_N_PLUS_ONE_THRESHOLD` times are logged as
+    likely N+1 queries.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not settings.QUERY_STATS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", stats.server_timing(time.perf_counter() - started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_request_stats.reset(token)
+            self._report(scope, stats, status_code, time.perf_counter() - started)
+
+    @staticmethod
+    def _report(scope: Scope, stats: RequestStats, status_code: int, total: float):
+        route = route_template(scope)
+        logger.info(
+            "Request stats: method=%s route=%s status=%s queries=%s db_ms=%.2f serialization_ms=%.2f total_ms=%.2f",
+            scope["method"], route, status_code, stats.queries, stats.db_time * 1000, stats.serialization_time * 1000, total * 1000,
+        )
+        for shape, count in stats.repeated_statements(settings.QUERY_STATS_N_PLUS_ONE_THRESHOLD):
+            logger.warning("Possible N+1 query on %s %s: statement ran %s times: %s", scope["method"], route, count, shape)
@@ -1,5 +1,6 @@
 from fastapi import APIRouter
 from app.routers import auth, movie, rating, comment, user
+from app.utils.metrics import metrics_router
 from app.utils.welcome_page import welcome_router
 
 
@@ -11,3 +12,4 @@ api_version.include_router(movie.router, prefix="/movies", tags=["movie-catalog"
 api_version.include_router(rating.router, prefix="/ratings", tags=["rating-system"])
 api_version.include_router(comment.router, prefix="/comments", tags=["commentary"])
 api_version.include_router(welcome_router)
+api_version.include_router(metrics_router)
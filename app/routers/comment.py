@@ -4,53 +4,101 @@ It supports rate limiting and logs all significant actions.
 """
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from app.db.schemas.comment import CommentCreate, CommentSortOrder, NestedCommentCreate, BaseResponse
+from app.core.config import settings
+from app.db.schemas.comment import CommentCreate, CommentSortOrder, NestedCommentCreate, BaseResponse, PaginatedResponse, comment_list_adapter
 from app.services.auth import get_current_user
-from app.db.session import get_db
+from app.db.session import get_async_db
 from app.services.comment_service import (
     create_comment_service,
     get_comments_service,
+    get_replies_service,
+    get_comment_thread_service,
     create_nested_comment_service
 )
 from app.db.models.user import User
 from app.utils.logger import logger
 from app.utils.rate_limiter import limiter
+from app.utils.response_cache import response_cache
+from app.utils.responses import envelope_response
 
 
 router = APIRouter()
 
 @router.post("/", response_model=BaseResponse, status_code=status.HTTP_201_CREATED)
 @limiter.limit("10/minute")
-async def add_comment_to_movie(request: Request, comment: CommentCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def add_comment_to_movie(request: Request, comment: CommentCreate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
     try:
-        logger.debug(f"Request to add comment: {comment} from user_id: {current_user.id}")
+        logger.debug("Request to add comment: %s from user_id: %s", comment, current_user.id)
         comment_data = await create_comment_service(db, comment, current_user.id)
-        logger.info(f"Comment added successfully for user_id: {current_user.id}")
+        logger.info("Comment added successfully for user_id: %s", current_user.id)
         return BaseResponse(success=True, status_code=status.HTTP_201_CREATED, message="Comment added successfully", data=[comment_data])  # Wrap in list if needed
     except HTTPException as e:
-        logger.error(f"Error in add_comment_to_movie: {e.detail}")
+        logger.error("Error in add_comment_to_movie: %s", e.detail)
         raise e
 
 
-@router.get("/{movie_id}", response_model=BaseResponse, status_code=status.HTTP_200_OK)
+@router.get("/{movie_id}", response_model=PaginatedResponse, status_code=status.HTTP_200_OK)
 @limiter.limit("20/minute")
+@response_cache.cached("comments", tags=["comments:{movie_id}"])
 async def view_comments_for_movie(
     request: Request, 
     movie_id: UUID, 
-    skip: int = Query(0, ge=0, description="Number of items to skip"), 
-    limit: int = Query(10, ge=1, description="Maximum number of items to return"), 
+    skip: int = Query(0, ge=0, description="Number of items to skip (ignored when a cursor is given)"), 
+    limit: int = Query(10, ge=1, le=settings.MAX_PAGE_SIZE, description="Maximum number of items to return"), 
     sort_order: CommentSortOrder = Query(CommentSortOrder.MOST_RECENT, description="Sort order for comments"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Cursor returned as next_cursor by the previous page"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    logger.debug(f"Request to view comments for movie_id: {movie_id}, skip: {skip}, limit: {limit}, sort_order: {sort_order}")
+    logger.debug("Request to view comments for movie_id: %s, skip: %s, limit: %s, sort_order: %s", movie_id, skip, limit, sort_order)
     try:
-        comments = await get_comments_service(db, movie_id, skip=skip, limit=limit, sort_order=sort_order)
-        logger.info(f"Comments retrieved successfully for movie_id: {movie_id}")
-        return BaseResponse(success=True, status_code=status.HTTP_200_OK, message="Comments retrieved successfully", data=comments)
+        comments, next_cursor = await get_comments_service(db, movie_id, skip=skip, limit=limit, sort_order=sort_order, cursor=cursor)
+        logger.info("Comments retrieved successfully for movie_id: %s", movie_id)
+        return envelope_response(status.HTTP_200_OK, "Comments retrieved successfully", comments, comment_list_adapter, next_cursor=next_cursor)
     except HTTPException as e:
-        logger.error(f"Error in view_comments_for_movie: {e.detail}")
+        logger.error("Error in view_comments_for_movie: %s", e.detail)
+        raise e
+
+
+
+@router.get("/{comment_id}/replies", response_model=PaginatedResponse, status_code=status.HTTP_200_OK)
+@limiter.limit("20/minute")
+async def view_replies_to_comment(
+    request: Request,
+    comment_id: UUID,
+    skip: int = Query(0, ge=0, description="Number of items to skip (ignored when a cursor is given)"),
+    limit: int = Query(10, ge=1, le=settings.MAX_PAGE_SIZE, description="Maximum number of items to return"),
+    sort_order: CommentSortOrder = Query(CommentSortOrder.MOST_RECENT, description="Sort order for replies"),
+    cursor: Optional[str] = Query(None, description="Cursor returned as next_cursor by the previous page"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    logger.debug("Request to view replies for comment_id: %s, skip: %s, limit: %s, sort_order: %s", comment_id, skip, limit, sort_order)
+    try:
+        replies, next_cursor = await get_replies_service(db, comment_id, skip=skip, limit=limit, sort_order=sort_order, cursor=cursor)
+        logger.info("Replies retrieved successfully for comment_id: %s", comment_id)
+        return envelope_response(status.HTTP_200_OK, "Replies retrieved successfully", replies, comment_list_adapter, next_cursor=next_cursor)
+    except HTTPException as e:
+        logger.error("Error in view_replies_to_comment: %s", e.detail)
+        raise e
+
+
+
+@router.get("/{comment_id}/thread", response_model=BaseResponse, status_code=status.HTTP_200_OK)
+@limiter.limit("20/minute")
+async def view_comment_thread(
+    request: Request,
+    comment_id: UUID,
+    max_depth: Optional[int] = Query(None, ge=0, description="Levels of replies to include below the comment (all when omitted)"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    logger.debug("Request to view thread for comment_id: %s, max_depth: %s", comment_id, max_depth)
+    try:
+        thread = await get_comment_thread_service(db, comment_id, max_depth=max_depth)
+        logger.info("Comment thread retrieved successfully for comment_id: %s", comment_id)
+        return envelope_response(status.HTTP_200_OK, "Comment thread retrieved successfully", [thread], comment_list_adapter)
+    except HTTPException as e:
+        logger.error("Error in view_comment_thread: %s", e.detail)
         raise e
 
 
@@ -58,13 +106,13 @@ async def view_comments_for_movie(
 
 @router.post("/nested", response_model=BaseResponse, status_code=status.HTTP_201_CREATED)
 @limiter.limit("10/minute")
-async def add_nested_comment(request: Request, nested_comment: NestedCommentCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def add_nested_comment(request: Request, nested_comment: NestedCommentCreate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
     try:
-        logger.debug(f"Request to add nested comment: {nested_comment} from user_id: {current_user.id}")
+        logger.debug("Request to add nested comment: %s from user_id: %s", nested_comment, current_user.id)
         comment_data = await create_nested_comment_service(db, nested_comment, current_user.id)
-        logger.info(f"Nested comment added successfully for user_id: {current_user.id}")
+        logger.info("Nested comment added successfully for user_id: %s", current_user.id)
         return BaseResponse(success=True, status_code=status.HTTP_201_CREATED, message="Nested comment added successfully", data=[comment_data])
     except HTTPException as e:
-        logger.error(f"Error in add_nested_comment: {e.detail}")
+        logger.error("Error in add_nested_comment: %s", e.detail)
         raise e
 
@@ -3,54 +3,54 @@ This module manages movie ratings, including creating or updating ratings and re
 It supports rate limiting and logs rating-related actions.
 """
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
-from sqlalchemy.orm import Session
-from app.db.schemas.rating import RatingCreate, RatingScore, BaseResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.db.schemas.rating import RatingCreate, RatingScore, BaseResponse, PaginatedResponse
 from app.services.auth import get_current_user
-from app.db.session import get_db
+from app.db.session import get_async_db
 from app.services.rating_service import create_or_update_rating_service, get_ratings_service
 from app.db.models.user import User
 from app.utils.logger import logger
 from uuid import UUID
 from app.utils.rate_limiter import limiter
+from app.utils.response_cache import response_cache
+from app.utils.responses import envelope_response
 
 
 router = APIRouter()
 
 @router.post("/", response_model=BaseResponse, status_code=status.HTTP_201_CREATED)
 @limiter.limit("5/minute")
-async def rate_movie(request: Request, rating: RatingCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    logger.debug(f"Rate movie request: {rating} from user_id: {current_user.id}")
+async def rate_movie(request: Request, rating: RatingCreate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
+    logger.debug("Rate movie request: %s from user_id: %s", rating, current_user.id)
     try:
         rating_data = await create_or_update_rating_service(db, rating, current_user.id)
-        logger.info(f"Rating created or updated successfully for user_id: {current_user.id}")
+        logger.info("Rating created or updated successfully for user_id: %s", current_user.id)
         return BaseResponse(success=True, status_code=status.HTTP_201_CREATED, message="Movie rated successfully", data=rating_data)
     except HTTPException as e:
-        logger.error(f"Error in rate_movie: {e.detail}")
+        logger.error("Error in rate_movie: %s", e.detail)
         raise e
     
 
-@router.get("/{movie_id}", response_model=BaseResponse, status_code=status.HTTP_200_OK)
+@router.get("/{movie_id}", response_model=PaginatedResponse, status_code=status.HTTP_200_OK)
 @limiter.limit("10/minute")
+@response_cache.cached("ratings", tags=["ratings:{movie_id}"])
 async def get_ratings_for_movie(
     request: Request, 
     movie_id: UUID, 
-    skip: int = Query(0, ge=0, description="Number of items to skip"), 
-    limit: int = Query(10, ge=1, description="Maximum number of items to return"), 
+    skip: int = Query(0, ge=0, description="Number of items to skip (ignored when a cursor is given)"), 
+    limit: int = Query(10, ge=1, le=settings.MAX_PAGE_SIZE, description="Maximum number of items to return"), 
     rating_score: RatingScore = Query(None, description="Filter ratings by specific score"),
-    db: Session = Depends(get_db)
+    cursor: str = Query(None, description="Cursor returned as next_cursor by the previous page"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    logger.debug(f"Get ratings request for movie_id: {movie_id}, skip: {skip}, limit: {limit}, rating_score: {rating_score}")
+    logger.debug("Get ratings request for movie_id: %s, skip: %s, limit: %s, rating_score: %s", movie_id, skip, limit, rating_score)
     try:
-        ratings_with_aggregation = await get_ratings_service(db, movie_id, skip=skip, limit=limit, rating_score=rating_score)
-        logger.info(f"Ratings and aggregated rating retrieved successfully for movie_id: {movie_id}")
-        return BaseResponse(
-            success=True,
-            status_code=status.HTTP_200_OK,
-            message="Ratings retrieved successfully",
-            data=ratings_with_aggregation
-        )
+        ratings_with_aggregation, next_cursor = await get_ratings_service(db, movie_id, skip=skip, limit=limit, rating_score=rating_score, cursor=cursor)
+        logger.info("Ratings and aggregated rating retrieved successfully for movie_id: %s", movie_id)
+        return envelope_response(status.HTTP_200_OK, "Ratings retrieved successfully", ratings_with_aggregation, next_cursor=next_cursor)
     except HTTPException as e:
-        logger.error(f"Error in get_ratings_for_movie: {e.detail}")
+        logger.error("Error in get_ratings_for_movie: %s", e.detail)
         raise e
 
 
@@ -1,78 +1,148 @@
+import hashlib
+import json
+import time
 from datetime import datetime, timedelta
 from uuid import uuid4
-from fastapi import Depends, HTTPException, status
+import anyio
+from fastapi import Depends, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from app.core.config import settings
-from app.core.security import create_access_token, verify_password
-from app.db.schemas.user import UserCreate, Token
-from app.crud.crud_user import create_user, get_user_by_email, get_user_by_verification_token
+from app.core.security import create_access_token, verify_password_async
+from app.db.schemas.user import UserCreate, Token, UserResponse
+from app.crud.crud_user import create_user, get_user_by_email, get_user_by_email_async, get_user_by_verification_token
 from fastapi.security import OAuth2PasswordBearer
 from app.db.models.user import User as DBUser
-from app.db.session import get_db
+from app.db.session import get_async_db
+from app.utils.cache import MemoryCache, create_cache
 from app.utils.logger import logger
-from app.utils.email import send_verification_email
+from app.utils.email import email_worker, queue_verification_email
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login/token")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> DBUser:
+# Used only when AUTH_USER_CACHE_ENABLED is set. `user_cache` hits are database lookups saved.
+token_cache = MemoryCache("token", settings.AUTH_USER_CACHE_TTL_SECONDS, settings.AUTH_USER_CACHE_MAX_SIZE)
+user_cache = create_cache("user", settings.AUTH_USER_CACHE_TTL_SECONDS, settings.AUTH_USER_CACHE_MAX_SIZE)
+
+
+async def decode_token_subject(token: str) -> str:
+    """Return the token's subject, reusing an earlier decode of the same token until the token expires."""
+    if not settings.AUTH_USER_CACHE_ENABLED:
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]).get("sub")
+    key = hashlib.sha256(token.encode()).hexdigest()
+    cached = await token_cache.get(key)
+    if cached is not None:
+        subject, expires_at = json.loads(cached)
+        if expires_at > time.time():
+            return subject
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    subject = payload.get("sub")
+    if subject:
+        await token_cache.set(key, json.dumps([subject, payload.get("exp", 0)]))
+    return subject
+
+
+async def get_user_for_subject(db: AsyncSession, email: str) -> DBUser:
+    """
+    Resolve the token subject to a user. With the cache enabled, a hit returns a
+    detached `User` built from the cached `UserResponse` fields; it carries no
+    password hash or relationships.
+    """
+    if settings.AUTH_USER_CACHE_ENABLED:
+        cached = await user_cache.get(email)
+        if cached is not None:
+            return DBUser(**UserResponse.model_validate_json(cached).model_dump())
+    user = await get_user_by_email_async(db, email)
+    if user and settings.AUTH_USER_CACHE_ENABLED:
+        await user_cache.set(email, UserResponse.from_orm(user).model_dump_json())
+    return user
+
+
+def invalidate_cached_user(email: str):
+    """
+    Drop a user's cached principal. Called from the sync auth services after
+    they change the user, which run on a request worker thread; the delete is
+    handed to the app's event loop, which owns the cache's Redis client.
+    """
+    if not settings.AUTH_USER_CACHE_ENABLED:
+        return
+    try:
+        anyio.from_thread.run(user_cache.delete, email)
+    except RuntimeError:
+        # Not on a request worker thread (e.g. a script calling the service directly).
+        if isinstance(user_cache, MemoryCache):
+            user_cache.discard(email)
+        else:
+            logger.warning("Cached user %s could not be invalidated outside a request; it expires within %ss", email, user_cache.ttl)
+
+
+async def get_current_user(request: Request, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> DBUser:
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
+        email = await decode_token_subject(token)
         if not email:
             logger.warning("Email not found in token payload.")
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials")
-        user = db.query(DBUser).filter(DBUser.email == email).first()
+        user = await get_user_for_subject(db, email)
         if not user:
-            logger.warning(f"User not found: {email}")
+            logger.warning("User not found: %s", email)
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-        logger.info(f"Authenticated user: {email}")
+        logger.info("Authenticated user: %s", email)
+        # Lets the rate limiter key this request by user rather than by address.
+        request.state.user = user
         return user
     except JWTError:
         logger.exception("JWT decoding error.")
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials")
 
 def register_user(user: UserCreate, db: Session):
-    logger.info(f"Registering user: {user.email}")
+    logger.info("Registering user: %s", user.email)
     db_user = get_user_by_email(db, user.email)
     if db_user:
-        logger.warning(f"Email already registered: {user.email}")
+        logger.warning("Email already registered: %s", user.email)
         raise HTTPException(status_code=400, detail="Email already registered")
     new_user = create_user(db, user)
-    logger.info(f"User registered successfully: {user.email}")
+    logger.info("User registered successfully: %s", user.email)
     return new_user
 
 
 
-def authenticate_user(email: str, password: str, db: Session):
-    logger.info(f"Authenticating user: {email}")
-    user = get_user_by_email(db, email)
+async def authenticate_user(email: str, password: str, db: AsyncSession):
+    logger.info("Authenticating user: %s", email)
+    user = await get_user_by_email_async(db, email)
     if not user:
-        logger.warning(f"User not found: {email}")
+        logger.warning("User not found: %s", email)
         return False
-    if not verify_password(password, user.hashed_password):
-        logger.warning(f"Invalid password for user: {email}")
+    valid, new_hash = await verify_password_async(password, user.hashed_password)
+    if not valid:
+        logger.warning("Invalid password for user: %s", email)
         return False
-    logger.info(f"User authenticated successfully: {email}")
+    if new_hash:
+        logger.info("Rehashing password with the configured bcrypt cost for user: %s", email)
+        user.hashed_password = new_hash
+        await db.commit()
+        await db.refresh(user)
+    logger.info("User authenticated successfully: %s", email)
     return user
 
-def login_for_access_token(email: str, password: str, db: Session):
-    logger.info(f"Login attempt for user: {email}")
-    user = authenticate_user(email, password, db)
-    if not user:
-        logger.warning(f"Failed login attempt for user: {email}")
-        raise HTTPException(status_code=401, detail="Incorrect email or password")
+def create_token_for_user(user: DBUser) -> Token:
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(data={"sub": user.email}, expires_delta=access_token_expires)
-    logger.info(f"Access token generated for user: {email}")
+    logger.info("Access token generated for user: %s", user.email)
     return Token(access_token=access_token, token_type="bearer")
 
+async def login_for_access_token(email: str, password: str, db: AsyncSession):
+    logger.info("Login attempt for user: %s", email)
+    user = await authenticate_user(email, password, db)
+    if not user:
+        logger.warning("Failed login attempt for user: %s", email)
+        raise HTTPException(status_code=401, detail="Incorrect email or password")
+    return create_token_for_user(user)
+
 
 
 def verify_user_email(token: str, db: Session):
-    logger.info(f"Verifying user email with token: {token}")
+    logger.info("Verifying user email with token: %s", token)
     user = get_user_by_verification_token(db, token)
     
     if not user:
@@ -84,7 +154,7 @@ def verify_user_email(token: str, db: Session):
         raise HTTPException(status_code=400, detail="User email already verified")
 
     current_time = datetime.utcnow()
-    logger.info(f"Current time: {current_time}, Token expiry: {user.verification_token_expiry}")
+    logger.info("Current time: %s, Token expiry: %s", current_time, user.verification_token_expiry)
     
     if current_time > user.verification_token_expiry:
         logger.warning("Expired verification token")
@@ -98,9 +168,10 @@ def verify_user_email(token: str, db: Session):
         user.verification_token = None
         user.verification_token_expiry = None
         db.commit()
-        logger.info(f"User verified successfully: {user.email}")
+        invalidate_cached_user(user.email)
+        logger.info("User verified successfully: %s", user.email)
     except Exception as e:
-        logger.error(f"Error during user verification: {str(e)}")
+        logger.error("Error during user verification: %s", str(e))
         db.rollback()
         raise HTTPException(status_code=500, detail="An error occurred while verifying the email. Please try again.")
     
@@ -109,7 +180,7 @@ def verify_user_email(token: str, db: Session):
 
 
 def resend_verification_email(email: str, db: Session):
-    logger.info(f"Resending verification email for user: {email}")
+    logger.info("Resending verification email for user: %s", email)
     user = get_user_by_email(db, email)
     if not user:
         logger.warning("User not found")
@@ -128,8 +199,10 @@ def resend_verification_email(email: str, db: Session):
 
     user.verification_token = verification_token
     user.verification_token_expiry = verification_token_expiry
+    queue_verification_email(db, user.email, verification_token)
     db.commit()
-    send_verification_email(user.email, verification_token)
-    logger.info(f"Verification email sent to user: {email}")
+    invalidate_cached_user(user.email)
+    email_worker.notify()
+    logger.info("Verification email sent to user: %s", email)
     return user
 
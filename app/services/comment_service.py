@@ -3,16 +3,21 @@ from datetime import datetime
 from typing import List, Optional
 from uuid import UUID
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
 from sqlalchemy.exc import NoResultFound
 from app.crud.crud_comment import (
     create_comment as crud_create_comment, 
     get_comments as crud_get_comments, 
-    create_nested_comment as crud_create_nested_comment
+    get_replies as crud_get_replies,
+    get_comment_thread as crud_get_comment_thread,
+    create_nested_comment as crud_create_nested_comment,
+    get_thread_movie_id
 )
 from app.db.models.comment import Comment
-from app.db.schemas.comment import CommentCreate, CommentSortOrder, NestedCommentCreate, CommentResponse
+from app.db.schemas.comment import CommentCreate, CommentSortOrder, NestedCommentCreate, CommentResponse, comment_list_adapter
 from app.utils.logger import logger
+from app.utils.response_cache import response_cache
 
 
 class CustomJSONEncoder(json.JSONEncoder):
@@ -24,43 +29,80 @@ class CustomJSONEncoder(json.JSONEncoder):
         return super().default(obj) 
 
 
-async def create_comment_service(db: Session, comment: CommentCreate, user_id: UUID) -> CommentResponse:
+async def create_comment_service(db: AsyncSession, comment: CommentCreate, user_id: UUID) -> CommentResponse:
     try:
-        logger.debug(f"Service call to create comment: {comment} for user_id: {user_id}")
-        db_comment = crud_create_comment(db, comment, user_id)
-        logger.info(f"Comment created successfully with ID: {db_comment.id}")
+        logger.debug("Service call to create comment: %s for user_id: %s", comment, user_id)
+        db_comment = await crud_create_comment(db, comment, user_id)
+        await response_cache.invalidate(f"comments:{db_comment.movie_id}")
+        logger.info("Comment created successfully with ID: %s", db_comment.id)
         return CommentResponse.from_orm(db_comment)
     except NoResultFound as e:
-        logger.error(f"Error in create_comment_service: {str(e)}")
+        logger.error("Error in create_comment_service: %s", str(e))
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     
 
 async def get_comments_service(
-    db: Session, 
+    db: AsyncSession, 
     movie_id: UUID, 
     skip: int = 0, 
     limit: int = 10, 
-    sort_order: CommentSortOrder = CommentSortOrder.MOST_RECENT
-) -> List[CommentResponse]:
+    sort_order: CommentSortOrder = CommentSortOrder.MOST_RECENT,
+    cursor: Optional[str] = None
+) -> tuple[List[CommentResponse], Optional[str]]:
     try:
-        logger.debug(f"Service call to get comments for movie_id: {movie_id}, skip: {skip}, limit: {limit}, sort_order: {sort_order}")
+        logger.debug("Service call to get comments for movie_id: %s, skip: %s, limit: %s, sort_order: %s", movie_id, skip, limit, sort_order)
         sort_order_str = "desc" if sort_order == CommentSortOrder.MOST_RECENT else "asc"       
-        comments = crud_get_comments(db, movie_id, skip=skip, limit=limit, sort_order=sort_order_str)      
-        logger.info(f"Fetched {len(comments)} comments for movie_id: {movie_id}")
-        return [CommentResponse.from_orm(comment) for comment in comments]
+        comments, next_cursor = await crud_get_comments(db, movie_id, skip=skip, limit=limit, sort_order=sort_order_str, cursor=cursor, use_core="comments" in settings.CORE_READ_PATH)
+        logger.info("Fetched %s comments for movie_id: %s", len(comments), movie_id)
+        return comment_list_adapter.validate_python(comments, from_attributes=True), next_cursor
     except NoResultFound as e:
-        logger.error(f"Error in get_comments_service: {str(e)}")
+        logger.error("Error in get_comments_service: %s", str(e))
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
 
 
 
-async def create_nested_comment_service(db: Session, nested_comment: NestedCommentCreate, user_id: UUID) -> CommentResponse:
+async def get_replies_service(
+    db: AsyncSession,
+    comment_id: UUID,
+    skip: int = 0,
+    limit: int = 10,
+    sort_order: CommentSortOrder = CommentSortOrder.MOST_RECENT,
+    cursor: Optional[str] = None
+) -> tuple[List[CommentResponse], Optional[str]]:
     try:
-        logger.debug(f"Service call to create nested comment: {nested_comment} for user_id: {user_id}")
-        db_comment = crud_create_nested_comment(db, nested_comment, user_id)
-        logger.info(f"Nested comment created successfully with ID: {db_comment.id}")
+        logger.debug("Service call to get replies for comment_id: %s, skip: %s, limit: %s, sort_order: %s", comment_id, skip, limit, sort_order)
+        sort_order_str = "desc" if sort_order == CommentSortOrder.MOST_RECENT else "asc"
+        replies, next_cursor = await crud_get_replies(db, comment_id, skip=skip, limit=limit, sort_order=sort_order_str, cursor=cursor, use_core="comments" in settings.CORE_READ_PATH)
+        logger.info("Fetched %s replies for comment_id: %s", len(replies), comment_id)
+        return comment_list_adapter.validate_python(replies, from_attributes=True), next_cursor
+    except NoResultFound as e:
+        logger.error("Error in get_replies_service: %s", str(e))
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+
+
+async def get_comment_thread_service(db: AsyncSession, comment_id: UUID, max_depth: Optional[int] = None) -> CommentResponse:
+    try:
+        logger.debug("Service call to get thread for comment_id: %s, max_depth: %s", comment_id, max_depth)
+        thread = await crud_get_comment_thread(db, comment_id, max_depth=max_depth, use_core="comments" in settings.CORE_READ_PATH)
+        logger.info("Fetched thread for comment_id: %s", comment_id)
+        return CommentResponse.model_validate(thread, from_attributes=True)
+    except NoResultFound as e:
+        logger.error("Error in get_comment_thread_service: %s", str(e))
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+
+
+async def create_nested_comment_service(db: AsyncSession, nested_comment: NestedCommentCreate, user_id: UUID) -> CommentResponse:
+    try:
+        logger.debug("Service call to create nested comment: %s for user_id: %s", nested_comment, user_id)
+        db_comment = await crud_create_nested_comment(db, nested_comment, user_id)
+        if settings.RESPONSE_CACHE_ENABLED:
+            # The reply changes its thread root's reply count and preview in the movie's comment list.
+            await response_cache.invalidate(f"comments:{await get_thread_movie_id(db, db_comment)}")
+        logger.info("Nested comment created successfully with ID: %s", db_comment.id)
         return CommentResponse.from_orm(db_comment)
     except (NoResultFound, ValueError) as e:
-        logger.error(f"Error in create_nested_comment_service: {str(e)}")
+        logger.error("Error in create_nested_comment_service: %s", str(e))
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
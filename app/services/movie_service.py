@@ -1,55 +1,76 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
 from app.crud.crud_movie import create_movie, get_movie, get_movies, update_movie, delete_movie
-from app.db.schemas.movie import MovieCreate, MovieUpdate, MovieResponse
+from app.db.schemas.movie import MovieCreate, MovieUpdate, MovieResponse, movie_list_adapter
+from app.utils.cache import movie_cache
 from app.utils.logger import logger
+from app.utils.movie_purge import movie_purge_worker
+from app.utils.response_cache import response_cache
+from app.utils.single_flight import SingleFlight, single_flight
 from uuid import UUID
 
-async def create_movie_service(db: Session, movie: MovieCreate, user_id: UUID) -> MovieResponse:
+movie_flight = SingleFlight("Movie lookups")
+movie_list_flight = SingleFlight("Movie lists")
+
+async def create_movie_service(db: AsyncSession, movie: MovieCreate, user_id: UUID) -> MovieResponse:
     logger.info("Service: Creating movie.")
-    db_movie = create_movie(db, movie, user_id)
+    db_movie = await create_movie(db, movie, user_id)
+    await response_cache.invalidate("movies")
     logger.info("Service: Movie created successfully.")
     return MovieResponse.from_orm(db_movie)
 
-async def get_movie_service(db: Session, movie_id: UUID) -> MovieResponse:
-    logger.info(f"Service: Fetching movie with ID: {movie_id}")
-    movie = get_movie(db, movie_id)
+async def get_movie_service(db: AsyncSession, movie_id: UUID) -> MovieResponse:
+    logger.info("Service: Fetching movie with ID: %s", movie_id)
+    # Taken before the lookup, so a write that commits meanwhile keeps this result out of the cache.
+    # It is also part of the flight key: once a write has bumped it, new requests start their own lookup.
+    version = await movie_cache.version(str(movie_id))
+    return await _load_movie(db, movie_id, version)
+
+
+@single_flight(movie_flight)
+async def _load_movie(db: AsyncSession, movie_id: UUID, version: str) -> MovieResponse:
+    cached = await movie_cache.get(str(movie_id), version)
+    if cached is not None:
+        logger.info("Service: Movie found in cache.")
+        return MovieResponse.model_validate_json(cached)
+    movie = await get_movie(db, movie_id)
     if not movie:
         logger.warning("Service: Movie not found.")
         return None
     logger.info("Service: Movie found.")
-    return MovieResponse.from_orm(movie)
+    movie_data = MovieResponse.from_orm(movie)
+    await movie_cache.set(str(movie_id), version, movie_data.model_dump_json())
+    return movie_data
 
 
-async def get_movies_service(db: Session, skip: int = 0, limit: int = 10, search: str = None, sort_by: str = None) -> list[MovieResponse]:
+@single_flight(movie_list_flight)
+async def get_movies_service(db: AsyncSession, skip: int = 0, limit: int = 10, search: str = None, sort_by: str = None, cursor: str = None) -> tuple[list[MovieResponse], str]:
     logger.info("Service: Fetching movies list.")
-    movies = get_movies(db, skip, limit, search, sort_by)
-    logger.info(f"Service: Retrieved {len(movies)} movies.")
-    return [MovieResponse.from_orm(movie) for movie in movies]
+    movies, next_cursor = await get_movies(db, skip, limit, search, sort_by, cursor, use_core="movies" in settings.CORE_READ_PATH)
+    logger.info("Service: Retrieved %s movies.", len(movies))
+    return movie_list_adapter.validate_python(movies, from_attributes=True), next_cursor
 
 
 
-async def update_movie_service(db: Session, movie_id: UUID, movie: MovieUpdate, user_id: UUID) -> MovieResponse:
-    logger.info(f"Service: Updating movie with ID: {movie_id}")
-    db_movie = get_movie(db, movie_id)
-    if not db_movie:
-        logger.warning(f"Movie not found with ID: {movie_id}")
+async def update_movie_service(db: AsyncSession, movie_id: UUID, movie: MovieUpdate, user_id: UUID) -> MovieResponse:
+    logger.info("Service: Updating movie with ID: %s", movie_id)
+    updated_movie = await update_movie(db, movie_id, movie, user_id)
+    if not updated_movie:
+        logger.warning("Movie not found or unauthorized update attempt for movie ID: %s by user ID: %s", movie_id, user_id)
         return None
-    if db_movie.owner_id != user_id:
-        logger.warning(f"Unauthorized update attempt for movie ID: {movie_id} by user ID: {user_id}")
-        return None
-    updated_movie = update_movie(db, movie_id, movie)
+    await movie_cache.invalidate(str(movie_id))
+    await response_cache.invalidate("movies", f"movie:{movie_id}")
     logger.info("Service: Movie updated successfully.")
     return MovieResponse.from_orm(updated_movie)
 
-async def delete_movie_service(db: Session, movie_id: UUID, user_id: UUID) -> bool:
-    logger.info(f"Service: Deleting movie with ID: {movie_id}")
-    db_movie = get_movie(db, movie_id)
-    if not db_movie:
-        logger.warning(f"Movie not found with ID: {movie_id}")
-        return False
-    if db_movie.owner_id != user_id:
-        logger.warning(f"Unauthorized delete attempt for movie ID: {movie_id} by user ID: {user_id}")
+async def delete_movie_service(db: AsyncSession, movie_id: UUID, user_id: UUID) -> bool:
+    logger.info("Service: Deleting movie with ID: %s", movie_id)
+    if not await delete_movie(db, movie_id, user_id, soft=settings.MOVIE_SOFT_DELETE):
+        logger.warning("Movie not found or unauthorized delete attempt for movie ID: %s by user ID: %s", movie_id, user_id)
         return False
-    delete_movie(db, movie_id)
+    await movie_cache.invalidate(str(movie_id))
+    await response_cache.invalidate("movies", f"movie:{movie_id}", f"ratings:{movie_id}", f"comments:{movie_id}")
+    if settings.MOVIE_SOFT_DELETE:
+        movie_purge_worker.notify()
     logger.info("Service: Movie deleted successfully.")
     return True
@@ -1,13 +1,18 @@
 import json
 from datetime import datetime
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
 from app.crud.crud_rating import create_or_update_rating as crud_create_or_update_rating, get_ratings as crud_get_ratings
-from app.db.schemas.rating import RatingCreate, RatingScore, RatingResponse, RatingsWithAggregation, AggregatedRating
+from app.db.schemas.rating import RatingCreate, RatingScore, RatingResponse, RatingsWithAggregation, AggregatedRating, rating_list_adapter
 from app.utils.logger import logger
+from app.utils.response_cache import response_cache
+from app.utils.single_flight import SingleFlight, single_flight
 from sqlalchemy.orm.exc import NoResultFound
 from fastapi import HTTPException, status
 from uuid import UUID
 
+rating_list_flight = SingleFlight("Rating lists")
+
 class CustomJSONEncoder(json.JSONEncoder):
     def default(self, obj):
         if isinstance(obj, UUID):
@@ -16,25 +21,28 @@ class CustomJSONEncoder(json.JSONEncoder):
             return obj.isoformat()
         return super().default(obj)
 
-async def create_or_update_rating_service(db: Session, rating: RatingCreate, user_id: UUID) -> RatingResponse:
+async def create_or_update_rating_service(db: AsyncSession, rating: RatingCreate, user_id: UUID) -> RatingResponse:
     try:
-        logger.debug(f"Service call to create or update rating: {rating} for user_id: {user_id}")
-        db_rating = crud_create_or_update_rating(db, rating, user_id)
-        logger.info(f"Created or updated rating with ID: {db_rating.id}")
+        logger.debug("Service call to create or update rating: %s for user_id: %s", rating, user_id)
+        db_rating = await crud_create_or_update_rating(db, rating, user_id)
+        # The write also moves the movie's average_rating, which orders the most_rated lists.
+        await response_cache.invalidate(f"ratings:{rating.movie_id}", "movies")
+        logger.info("Created or updated rating with ID: %s", db_rating.id)
         return RatingResponse.from_orm(db_rating)
     except NoResultFound as e:
-        logger.error(f"Error in create_or_update_rating_service: {str(e)}")
+        logger.error("Error in create_or_update_rating_service: %s", str(e))
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
 
-async def get_ratings_service(db: Session, movie_id: UUID, skip: int = 0, limit: int = 10, rating_score: RatingScore = None) -> RatingsWithAggregation:
+@single_flight(rating_list_flight)
+async def get_ratings_service(db: AsyncSession, movie_id: UUID, skip: int = 0, limit: int = 10, rating_score: RatingScore = None, cursor: str = None) -> tuple[RatingsWithAggregation, str]:
     try:
-        logger.debug(f"Service call to get ratings for movie_id: {movie_id}, skip: {skip}, limit: {limit}, rating_score: {rating_score}")
-        ratings, aggregated_rating = crud_get_ratings(db, movie_id, skip, limit, rating_score)
-        logger.info(f"Fetched {len(ratings)} ratings and aggregated rating for movie_id: {movie_id}")
+        logger.debug("Service call to get ratings for movie_id: %s, skip: %s, limit: %s, rating_score: %s", movie_id, skip, limit, rating_score)
+        ratings, aggregated_rating, next_cursor = await crud_get_ratings(db, movie_id, skip, limit, rating_score, cursor, use_core="ratings" in settings.CORE_READ_PATH)
+        logger.info("Fetched %s ratings and aggregated rating for movie_id: %s", len(ratings), movie_id)
         return RatingsWithAggregation(
             aggregated_rating=AggregatedRating(average_score=aggregated_rating),
-            ratings=[RatingResponse.from_orm(rating) for rating in ratings]
-        )
+            ratings=rating_list_adapter.validate_python(ratings, from_attributes=True)
+        ), next_cursor
     except NoResultFound as e:
-        logger.error(f"Error in get_ratings_service: {str(e)}")
+        logger.error("Error in get_ratings_service: %s", str(e))
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
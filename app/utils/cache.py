@@ -0,0 +1,217 @@
+"""
+Pluggable key/value caches used for read-through lookups.
+
+`MemoryCache` is an in-process LRU with per-entry TTL; `RedisCache` talks to
+anything that speaks the `redis.asyncio` client API (Redis itself, or a local
+fake in tests). Values are strings, so callers serialise before storing. Every
+backend counts hits and misses; `stats()` reports them for sizing the cache.
+"""
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+from app.core.config import settings
+from app.utils.logger import logger
+
+
+class CacheBackend:
+    def __init__(self, namespace: str, ttl: int):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: str) -> Optional[str]:
+        value = await self._get(self._key(key))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: str, ttl: Optional[int] = None) -> None:
+        await self._set(self._key(key), value, ttl or self.ttl)
+
+    async def delete(self, key: str) -> None:
+        await self._delete(self._key(key))
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    async def _get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    async def _set(self, key: str, value: str, ttl: int) -> None:
+        raise NotImplementedError
+
+    async def _delete(self, key: str) -> None:
+        raise NotImplementedError
+
+
+class NullCache(CacheBackend):
+    """Caching disabled: every lookup is a miss."""
+
+    async def _get(self, key: str) -> Optional[str]:
+        return None
+
+    async def _set(self, key: str, value: str, ttl: int) -> None:
+        pass
+
+    async def _delete(self, key: str) -> None:
+        pass
+
+
+class MemoryCache(CacheBackend):
+    """Least-recently-used cache bounded to `max_size` entries, each expiring after `ttl` seconds."""
+
+    def __init__(self, namespace: str, ttl: int, max_size: int, clock=time.monotonic):
+        super().__init__(namespace, ttl)
+        self.max_size = max_size
+        self.evictions = 0
+        self._clock = clock
+        self._entries: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+
+    async def _get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def _set(self, key: str, value: str, ttl: int) -> None:
+        self._entries[key] = (self._clock() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def _delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def discard(self, key: str) -> None:
+        """`delete` for callers without an event loop; the entries are plain process memory."""
+        self._entries.pop(self._key(key), None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {**super().stats(), "size": len(self._entries), "max_size": self.max_size, "evictions": self.evictions}
+
+
+class RedisCache(CacheBackend):
+    """
+    Cache stored in Redis, shared by every worker. Redis errors are logged and
+    treated as misses so an unavailable cache degrades to database reads.
+    """
+
+    def __init__(self, namespace: str, ttl: int, client):
+        super().__init__(namespace, ttl)
+        self.client = client
+        self.errors = 0
+
+    async def _get(self, key: str) -> Optional[str]:
+        try:
+            value = await self.client.get(key)
+        except Exception as e:
+            self._record_error("get", e)
+            return None
+        return value.decode() if isinstance(value, bytes) else value
+
+    async def _set(self, key: str, value: str, ttl: int) -> None:
+        try:
+            await self.client.set(key, value, ex=ttl)
+        except Exception as e:
+            self._record_error("set", e)
+
+    async def _delete(self, key: str) -> None:
+        try:
+            await self.client.delete(key)
+        except Exception as e:
+            self._record_error("delete", e)
+
+    def _record_error(self, operation: str, error: Exception) -> None:
+        self.errors += 1
+        logger.warning("Cache %s failed for namespace %s: %s", operation, self.namespace, error)
+
+    def stats(self) -> dict:
+        return {**super().stats(), "errors": self.errors}
+
+
+def create_cache(namespace: str, ttl: int, max_size: int) -> CacheBackend:
+    backend = settings.CACHE_BACKEND.lower()
+    if backend == "memory":
+        return MemoryCache(namespace, ttl, max_size)
+    if backend == "redis":
+        if not settings.CACHE_REDIS_URL:
+            raise ValueError("CACHE_REDIS_URL must be set when CACHE_BACKEND is 'redis'")
+        from redis.asyncio import Redis
+
+        return RedisCache(namespace, ttl, Redis.from_url(settings.CACHE_REDIS_URL))
+    if backend == "none":
+        return NullCache(namespace, ttl)
+    raise ValueError(f"Unsupported CACHE_BACKEND: {settings.CACHE_BACKEND}")
+
+
+class VersionedCache:
+    """
+    Read-through entries that a write can invalidate while a read is loading.
+
+    Every key has a version token, kept in `versions`, and an entry is stored
+    under its key and the version. A reader takes the version before loading
+    from the database and stores its result only if that version is still
+    current; `invalidate()` gives the key a new token. A load that started
+    before a write can therefore never put the old value back.
+    """
+
+    def __init__(self, entries: CacheBackend, versions: CacheBackend):
+        self.entries = entries
+        self.versions = versions
+
+    async def version(self, key: str) -> str:
+        version = await self.versions.get(key)
+        if version is None:
+            # An expired or evicted version is replaced, never reused, so entries
+            # stored under an older version cannot become reachable again.
+            version = uuid.uuid4().hex
+            await self.versions.set(key, version)
+        return version
+
+    async def get(self, key: str, version: str) -> Optional[str]:
+        return await self.entries.get(f"{key}:{version}")
+
+    async def set(self, key: str, version: str, value: str) -> bool:
+        """Store `value` unless `key` was invalidated since `version` was read; returns whether it was stored."""
+        if await self.versions.get(key) != version:
+            return False
+        await self.entries.set(f"{key}:{version}", value)
+        return True
+
+    async def invalidate(self, key: str) -> None:
+        await self.versions.set(key, uuid.uuid4().hex)
+
+
+def create_versioned_cache(namespace: str, ttl: int, max_size: int) -> VersionedCache:
+    entries = create_cache(namespace, ttl, max_size)
+    if isinstance(entries, NullCache):
+        # Versions also key coalesced reads (see `single_flight`), so they are
+        # kept in process even when caching is off.
+        return VersionedCache(entries, MemoryCache(f"{namespace}-version", ttl, max_size))
+    return VersionedCache(entries, create_cache(f"{namespace}-version", ttl, max_size))
+
+
+movie_cache = create_versioned_cache("movie", settings.MOVIE_CACHE_TTL_SECONDS, settings.MOVIE_CACHE_MAX_SIZE)
@@ -1,36 +1,48 @@
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from app.core.config import settings
+"""
+Outbound email delivery through a persistent outbox.
 
-def send_verification_email(email: str, token: str):
-    sender_email = settings.SMTP_SENDER
-    receiver_email = email
-    password = settings.SMTP_PASSWORD
-    smtp_server = settings.SMTP_SERVER
-    smtp_port = settings.SMTP_PORT
+Callers add an `OutboxEmail` row in the same transaction as the change that
+triggers the email, so queued mail survives restarts and is never sent for a
+rolled-back change. `EmailOutboxWorker` runs on the event loop, claims due rows
+in batches, sends them over one long-lived authenticated SMTP connection and
+reschedules failures with exponential backoff.
+"""
+import time
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from string import Template
+from typing import Optional
 
-    message = MIMEMultipart("alternative")
-    message["Subject"] = "Email Verification For Movie Listing API"
-    message["From"] = sender_email
-    message["To"] = receiver_email
+import aiosmtplib
+from sqlalchemy import select
+from sqlalchemy.orm import Session
 
-    verification_link = f"{settings.BASE_URL}/auth/verify-email?token={token}"
+from app.core.config import settings
+from app.db.models.email_outbox import OutboxEmail
+from app.db.session import AsyncSessionLocal
+from app.utils.logger import logger
+from app.utils.worker import BackgroundWorker
 
+PENDING = "pending"
+SENT = "sent"
+FAILED = "failed"
 
-    html = f"""
+VERIFICATION_SUBJECT = "Email Verification For Movie Listing API"
+
+# Parsed once at import; rendering a message is a single substitution.
+VERIFICATION_TEMPLATE = Template("""
      <html>
        <body style="font-family: Arial, sans-serif; background-color: #f4f4f4; padding: 20px;">
          <div style="max-width: 600px; margin: auto; background-color: #ffffff; padding: 20px; border-radius: 10px; box-shadow: 0 0 10px rgba(0, 0, 0, 0.1);">
            <h2 style="color: #333;">Verify Your Email Address</h2>
             <p style="font-size: 16px; color: #555;">
-             Hi {receiver_email},
+             Hi $email,
             </p>
             <p style="font-size: 16px; color: #555;">
             Your registration is successful, please verify your email by clicking the button below:
             </p>
             <p style="text-align: center;">
-            <a href="{verification_link}" style="display: inline-block; background-color: #4CAF50; color: white; padding: 10px 20px; font-size: 16px; font-weight: bold; border-radius: 5px; text-decoration: none;">Verify Email</a>
+            <a href="$verification_link" style="display: inline-block; background-color: #4CAF50; color: white; padding: 10px 20px; font-size: 16px; font-weight: bold; border-radius: 5px; text-decoration: none;">Verify Email</a>
             </p>
             <p style="font-size: 14px; color: #777;">
             This link will expire after 1 hour.
@@ -39,18 +51,127 @@ def send_verification_email(email: str, token: str):
          </div>
        </body>
      </html>
-      """
+      """)
+
+
+def render_verification_email(email: str, token: str) -> str:
+    verification_link = f"{settings.BASE_URL}/auth/verify-email?token={token}"
+    return VERIFICATION_TEMPLATE.substitute(email=email, verification_link=verification_link)
+
+
+def queue_verification_email(db: Session, email: str, token: str) -> OutboxEmail:
+    """Add the verification email to the outbox; it is sent once the caller commits."""
+    outbox_email = OutboxEmail(recipient=email, subject=VERIFICATION_SUBJECT, html=render_verification_email(email, token))
+    db.add(outbox_email)
+    logger.info("Verification email queued for %s", email)
+    return outbox_email
+
+
+def build_message(outbox_email: OutboxEmail) -> EmailMessage:
+    message = EmailMessage()
+    message["Subject"] = outbox_email.subject
+    message["From"] = settings.SMTP_SENDER
+    message["To"] = outbox_email.recipient
+    message.set_content(outbox_email.html, subtype="html")
+    return message
+
+
+def retry_delay(attempts: int) -> timedelta:
+    seconds = settings.EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+    return timedelta(seconds=min(seconds, settings.EMAIL_RETRY_MAX_SECONDS))
+
+
+class EmailOutboxWorker(BackgroundWorker):
+    name = "Email outbox worker"
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        super().__init__()
+        self._session_factory = session_factory
+        self._smtp: Optional[aiosmtplib.SMTP] = None
+        self._last_used = 0.0
+
+    @property
+    def batch_size(self) -> int:
+        return settings.EMAIL_BATCH_SIZE
+
+    @property
+    def poll_interval(self) -> float:
+        return settings.EMAIL_POLL_INTERVAL_SECONDS
+
+    async def on_idle(self):
+        if self._smtp and time.monotonic() - self._last_used > settings.SMTP_IDLE_TIMEOUT_SECONDS:
+            await self._disconnect()
+
+    async def close(self):
+        await self._disconnect()
+
+    async def process_due(self) -> int:
+        """Send one batch of due mail. Returns the number of outbox rows claimed."""
+        async with self._session_factory() as db:
+            result = await db.execute(
+                select(OutboxEmail)
+                .filter(OutboxEmail.status == PENDING, OutboxEmail.next_attempt_at <= datetime.utcnow())
+                .order_by(OutboxEmail.next_attempt_at)
+                .limit(settings.EMAIL_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            )
+            outbox_emails = result.scalars().all()
+            if outbox_emails:
+                await self._send_batch(outbox_emails)
+                await db.commit()
+            return len(outbox_emails)
+
+    async def _send_batch(self, outbox_emails: list):
+        for index, outbox_email in enumerate(outbox_emails):
+            try:
+                smtp = await self._connection()
+            except (aiosmtplib.SMTPException, OSError) as e:
+                logger.error("Could not connect to SMTP server: %s", e)
+                for pending in outbox_emails[index:]:
+                    self._record_failure(pending, e)
+                return
+            try:
+                await smtp.send_message(build_message(outbox_email))
+            except (aiosmtplib.SMTPException, OSError) as e:
+                self._record_failure(outbox_email, e)
+                await self._disconnect()
+            else:
+                outbox_email.attempts += 1
+                outbox_email.status = SENT
+                outbox_email.sent_at = datetime.utcnow()
+                outbox_email.last_error = None
+                logger.info("Email sent to %s", outbox_email.recipient)
+        self._last_used = time.monotonic()
+
+    def _record_failure(self, outbox_email: OutboxEmail, error: Exception):
+        outbox_email.attempts += 1
+        outbox_email.last_error = str(error)[:500]
+        if outbox_email.attempts >= settings.EMAIL_MAX_ATTEMPTS:
+            outbox_email.status = FAILED
+            logger.error("Giving up on email to %s after %s attempts: %s", outbox_email.recipient, outbox_email.attempts, error)
+        else:
+            outbox_email.next_attempt_at = datetime.utcnow() + retry_delay(outbox_email.attempts)
+            logger.warning("Email to %s failed (attempt %s), retrying later: %s", outbox_email.recipient, outbox_email.attempts, error)
 
+    async def _connection(self) -> aiosmtplib.SMTP:
+        if self._smtp is not None and self._smtp.is_connected:
+            return self._smtp
+        smtp = aiosmtplib.SMTP(hostname=settings.SMTP_SERVER, port=settings.SMTP_PORT, use_tls=settings.SMTP_USE_TLS)
+        await smtp.connect()
+        if settings.SMTP_PASSWORD:
+            await smtp.login(settings.SMTP_SENDER, settings.SMTP_PASSWORD)
+        self._smtp = smtp
+        return smtp
 
-    part = MIMEText(html, "html")
-    message.attach(part)
+    async def _disconnect(self):
+        if self._smtp is None:
+            return
+        smtp, self._smtp = self._smtp, None
+        try:
+            if smtp.is_connected:
+                await smtp.quit()
+        except (aiosmtplib.SMTPException, OSError):
+            smtp.close()
 
-    try:
-        with smtplib.SMTP_SSL(smtp_server, smtp_port) as server:
-            server.login(sender_email, password)
-            server.sendmail(sender_email, receiver_email, message.as_string())
-            print("Email sent successfully.")
-        return f"Email sent to {receiver_email}"
-    except Exception as e:
-        return f"Failed to send email to {receiver_email}: {e}"
 
+email_worker = EmailOutboxWorker()
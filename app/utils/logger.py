@@ -1,20 +1,116 @@
+import atexit
+import copy
+import json
 import logging
+import queue
+import random
 import sys
-from logging.handlers import SysLogHandler
+from logging.handlers import QueueHandler, QueueListener, SysLogHandler
 from app.core.config import settings
 
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(filename)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log collectors that parse structured output."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": self.formatTime(record, DATE_FORMAT),
+            "level": record.levelname,
+            "logger": record.name,
+            "file": record.filename,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a `rate` fraction of DEBUG and INFO records; warnings and errors always pass."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or self.rate >= 1 or random.random() < self.rate
+
+
+class LazySysLogHandler(logging.Handler):
+    """
+    SysLogHandler that resolves and opens its socket on the first record rather
+    than at construction, so importing the app never contacts the syslog host.
+    """
+
+    def __init__(self, address: tuple):
+        super().__init__()
+        self.address = address
+        self._handler = None
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            if self._handler is None:
+                self._handler = SysLogHandler(address=self.address)
+                self._handler.setFormatter(self.formatter)
+            self._handler.emit(record)
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        if self._handler is not None:
+            self._handler.close()
+        super().close()
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Merges the message arguments (they may be objects the request goes on to
+    change) and renders any traceback, but leaves the output formatting to the
+    listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def build_formatter() -> logging.Formatter:
+    if settings.LOG_FORMAT.lower() == "json":
+        return JsonFormatter()
+    return logging.Formatter(fmt=TEXT_FORMAT, datefmt=DATE_FORMAT)
+
+
 # Initialize logger
 logger = logging.getLogger("movie_listing_app")
-formatter = logging.Formatter(fmt='%(asctime)s - %(levelname)s - %(filename)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+formatter = build_formatter()
 
 # Stream handler (logs to terminal)
 stream_handler = logging.StreamHandler(sys.stdout)
 stream_handler.setFormatter(formatter)
+output_handlers = [stream_handler]
 
 # SysLog handler (logs to Papertrail)
-syslog_handler = SysLogHandler(address=(settings.PAPERTRAIL_URL, settings.PAPERTRAIL_PORT))
-syslog_handler.setFormatter(formatter)
+if settings.PAPERTRAIL_URL:
+    syslog_handler = LazySysLogHandler(address=(settings.PAPERTRAIL_URL, settings.PAPERTRAIL_PORT))
+    syslog_handler.setFormatter(formatter)
+    output_handlers.append(syslog_handler)
+
+# Request code only enqueues records; the listener thread does the formatting and I/O.
+log_queue = queue.SimpleQueue()
+queue_handler = DeferredQueueHandler(log_queue)
+queue_handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_RATE))
+log_listener = QueueListener(log_queue, *output_handlers, respect_handler_level=True)
+log_listener.start()
+atexit.register(log_listener.stop)
 
-# Add handlers to logger
-logger.handlers = [stream_handler, syslog_handler]
-logger.setLevel(logging.DEBUG)
+logger.handlers = [queue_handler]
+logger.setLevel(settings.LOG_LEVEL.upper())
@@ -0,0 +1,439 @@
+"""
+Prometheus metrics, exposed in the text format at `GET /metrics`.
+
+Metric values live in plain dicts keyed by label values. They are only updated
+from the event loop thread, so recording a request is a few dict operations and
+takes no lock. Gauges that describe shared resources (connection pools, the
+AnyIO thread pool, caches) are read by collectors when a snapshot is taken
+rather than tracked on every change.
+
+With several worker processes, set `METRICS_MULTIPROC_DIR` to a directory
+shared by the workers. Each worker writes its snapshot there every
+`METRICS_FLUSH_INTERVAL_SECONDS` and on shutdown, and a scrape of any worker
+merges all of them: counters and histograms are summed over every file, so
+totals survive worker restarts, and gauges are summed over live workers only.
+Files are named by pid and process start time, so a reused pid never
+overwrites an exited worker's file. A scrape folds the counters and
+histograms of exited workers into one archive file and deletes their files,
+so the directory holds one file per live worker plus the archive.
+"""
+import bisect
+import fcntl
+import json
+import math
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+import anyio.to_thread
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db.pool import pool_telemetry
+from app.db.session import async_engine, engine
+from app.utils.cache import CacheBackend
+from app.utils.logger import logger
+from app.utils.single_flight import SingleFlight
+from app.utils.worker import BackgroundWorker
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.values: dict = {}
+
+    def samples(self) -> list:
+        # Histogram series are copied: the snapshot is rendered off the event loop while requests keep recording.
+        return [[list(labels), list(value) if isinstance(value, list) else value] for labels, value in self.values.items()]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        values = self.values
+        values[labels] = values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, labels: tuple = ()):
+        self.values[labels] = value
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        values = self.values
+        values[labels] = values.get(labels, 0) + amount
+
+    def dec(self, labels: tuple = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+
+class Histogram(Metric):
+    """Bucket counts are stored per bucket, not cumulatively, so an observation touches a single slot."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: list = ()):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = sorted(buckets)
+
+    def observe(self, value: float, labels: tuple = ()):
+        series = self.values.get(labels)
+        if series is None:
+            # One slot per bucket plus +Inf, then the sum of observed values.
+            series = self.values[labels] = [0] * (len(self.buckets) + 2)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: dict = {}
+        self._collectors: list = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]):
+        """`collector` is called before every snapshot to refresh gauges read from elsewhere."""
+        self._collectors.append(collector)
+
+    def snapshot(self) -> dict:
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.warning("Metrics collector %s failed: %s", getattr(collector, "__name__", collector), e)
+        return {
+            "pid": os.getpid(),
+            "started": process_identity(),
+            "metrics": {
+                metric.name: {
+                    "type": metric.kind,
+                    "help": metric.documentation,
+                    "labelnames": list(metric.labelnames),
+                    "buckets": getattr(metric, "buckets", None),
+                    "samples": metric.samples(),
+                }
+                for metric in self.metrics.values()
+            },
+        }
+
+
+_fallback_start_times: dict = {}
+
+
+def process_start_time(pid: int) -> Optional[int]:
+    """The process's start time in clock ticks since boot, from /proc; None where that is unavailable."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # Field 22 (starttime); the fields after the parenthesised command name start at field 3.
+    return int(stat.rsplit(")", 1)[1].split()[19])
+
+
+def process_identity() -> int:
+    """Tells this process apart from earlier processes that had the same pid."""
+    pid = os.getpid()
+    started = process_start_time(pid)
+    if started is None:
+        started = _fallback_start_times.setdefault(pid, time.time_ns())
+    return started
+
+
+def pid_is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def snapshot_is_live(snapshot: dict) -> bool:
+    """Whether the process that wrote the snapshot is still running, and is not a later process with the same pid."""
+    if snapshot.get("archived"):
+        return False
+    pid = snapshot["pid"]
+    if pid == os.getpid():
+        return snapshot.get("started") == process_identity()
+    if not pid_is_alive(pid):
+        return False
+    started = process_start_time(pid)
+    return started is None or snapshot.get("started") == started
+
+
+def merge_snapshots(snapshots: list) -> dict:
+    """Combine worker snapshots: counters and histograms from every worker, gauges from live workers only."""
+    merged: dict = {}
+    for snapshot in snapshots:
+        live = snapshot_is_live(snapshot)
+        for name, metric in snapshot["metrics"].items():
+            target = merged.setdefault(name, {**metric, "samples": {}})
+            if metric["type"] == "gauge" and not live:
+                continue
+            for labels, value in metric["samples"]:
+                key = tuple(labels)
+                current = target["samples"].get(key)
+                if current is None:
+                    target["samples"][key] = value
+                elif metric["type"] == "histogram":
+                    target["samples"][key] = [a + b for a, b in zip(current, value)]
+                else:
+                    target["samples"][key] = current + value
+    return merged
+
+
+def add_cache_hit_ratios(merged: dict):
+    """Hit ratios are derived after merging so that they weigh every worker's lookups."""
+    hits = merged.get("cache_hits_total", {}).get("samples", {})
+    misses = merged.get("cache_misses_total", {}).get("samples", {})
+    samples = {}
+    for labels in hits.keys() | misses.keys():
+        lookups = hits.get(labels, 0) + misses.get(labels, 0)
+        samples[labels] = hits.get(labels, 0) / lookups if lookups else 0.0
+    merged["cache_hit_ratio"] = {
+        "type": "gauge",
+        "help": "Fraction of cache lookups that were hits.",
+        "labelnames": ["cache"],
+        "buckets": None,
+        "samples": samples,
+    }
+
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(labelnames: list, labels: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{escape_label_value(value)}"' for name, value in zip(labelnames, labels)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def render(merged: dict) -> str:
+    lines = []
+    for name in sorted(merged):
+        metric = merged[name]
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        labelnames = metric["labelnames"]
+        for labels, value in sorted(metric["samples"].items()):
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{format_labels(labelnames, labels)} {format_value(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(metric["buckets"] + [math.inf], value[:-1]):
+                cumulative += count
+                bucket_label = 'le="%s"' % format_value(float(bound))
+                lines.append(f"{name}_bucket{format_labels(labelnames, labels, bucket_label)} {cumulative}")
+            lines.append(f"{name}_sum{format_labels(labelnames, labels)} {format_value(value[-1])}")
+            lines.append(f"{name}_count{format_labels(labelnames, labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+ARCHIVE_FILENAME = "archive.json"
+
+
+def snapshot_path(directory: str, snapshot: dict) -> str:
+    if snapshot.get("archived"):
+        return os.path.join(directory, ARCHIVE_FILENAME)
+    return os.path.join(directory, f"{snapshot['pid']}-{snapshot['started']}.json")
+
+
+def write_snapshot(directory: str, snapshot: dict):
+    path = snapshot_path(directory, snapshot)
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "w") as f:
+        json.dump(snapshot, f)
+    os.replace(temporary_path, path)
+
+
+def read_snapshots(directory: str) -> dict:
+    snapshots = {}
+    for filename in os.listdir(directory):
+        if not filename.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, filename)) as f:
+                snapshots[filename] = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Skipping unreadable metrics snapshot %s: %s", filename, e)
+    return snapshots
+
+
+@contextmanager
+def directory_lock(directory: str):
+    with open(os.path.join(directory, ".lock"), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def archive_snapshot(snapshots: list) -> dict:
+    """One snapshot holding the summed counters and histograms of `snapshots`; gauges are dropped."""
+    merged = merge_snapshots(snapshots)
+    return {
+        "pid": None,
+        "archived": True,
+        "metrics": {
+            name: {**metric, "samples": [[list(labels), value] for labels, value in metric["samples"].items()]}
+            for name, metric in merged.items()
+            if metric["type"] != "gauge"
+        },
+    }
+
+
+def collect_snapshots(directory: str) -> list:
+    """
+    The snapshots of live workers plus the archive, after folding the files of
+    exited workers into the archive. The lock keeps two workers scraping at
+    once from folding the same file twice.
+    """
+    with directory_lock(directory):
+        snapshots = read_snapshots(directory)
+        archive = snapshots.pop(ARCHIVE_FILENAME, None)
+        dead = [filename for filename, snapshot in snapshots.items() if not snapshot_is_live(snapshot)]
+        if dead:
+            archive = archive_snapshot(([archive] if archive else []) + [snapshots.pop(filename) for filename in dead])
+            write_snapshot(directory, archive)
+            for filename in dead:
+                os.remove(os.path.join(directory, filename))
+    return list(snapshots.values()) + ([archive] if archive else [])
+
+
+def exposition(snapshot: dict, directory: Optional[str]) -> str:
+    if directory:
+        write_snapshot(directory, snapshot)
+        snapshots = collect_snapshots(directory)
+    else:
+        snapshots = [snapshot]
+    merged = merge_snapshots(snapshots)
+    add_cache_hit_ratios(merged)
+    return render(merged)
+
+
+registry = MetricsRegistry()
+
+request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "Time from receiving a request to sending the end of its response.",
+    ("method", "route"), settings.METRICS_LATENCY_BUCKETS,
+))
+requests_in_flight = registry.register(Gauge("http_requests_in_flight", "Requests currently being handled.", ("method",)))
+responses_total = registry.register(Counter("http_responses_total", "Responses sent, by status code.", ("method", "route", "status")))
+pool_checked_out = registry.register(Gauge("db_pool_checked_out_connections", "Connections checked out of the pool.", ("engine",)))
+pool_overflow = registry.register(Gauge("db_pool_overflow_connections", "Connections open beyond the pool size.", ("engine",)))
+pool_size = registry.register(Gauge("db_pool_size", "Configured number of pooled connections.", ("engine",)))
+pool_checkouts = registry.register(Counter("db_pool_checkouts_total", "Connections checked out of the pool.", ("engine",)))
+pool_exhausted = registry.register(Counter("db_pool_exhausted_total", "Checkouts that found every allowed connection in use.", ("engine",)))
+pool_timeouts = registry.register(Counter("db_pool_timeouts_total", "Checkouts that gave up after DB_POOL_TIMEOUT_SECONDS.", ("engine",)))
+pool_wait = registry.register(Counter("db_pool_wait_seconds_total", "Time spent waiting for a connection on an exhausted pool.", ("engine",)))
+threadpool_busy = registry.register(Gauge("anyio_threadpool_busy_threads", "AnyIO worker threads running a task."))
+threadpool_limit = registry.register(Gauge("anyio_threadpool_max_threads", "Maximum number of AnyIO worker threads."))
+cache_hits = registry.register(Counter("cache_hits_total", "Cache lookups that found an entry.", ("cache",)))
+cache_misses = registry.register(Counter("cache_misses_total", "Cache lookups that found nothing.", ("cache",)))
+coalesced_calls = registry.register(Counter("single_flight_calls_total", "Reads that ran their own query.", ("flight",)))
+coalesced_shared = registry.register(Counter("single_flight_shared_total", "Reads that waited for an identical read already in flight.", ("flight",)))
+
+
+def collect_pool_stats():
+    for label, pool in (("sync", engine.pool), ("async", async_engine.pool)):
+        # Only queue pools track checkouts; NullPool and StaticPool have nothing to report.
+        if not hasattr(pool, "checkedout"):
+            continue
+        pool_checked_out.set(pool.checkedout(), (label,))
+        pool_overflow.set(max(pool.overflow(), 0), (label,))
+        pool_size.set(pool.size(), (label,))
+    for label, telemetry in pool_telemetry.items():
+        pool_checkouts.values[(label,)] = telemetry.checkouts
+        pool_exhausted.values[(label,)] = telemetry.exhausted
+        pool_timeouts.values[(label,)] = telemetry.timeouts
+        pool_wait.values[(label,)] = telemetry.wait_seconds
+
+
+def collect_threadpool_stats():
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    threadpool_busy.set(limiter.borrowed_tokens)
+    threadpool_limit.set(limiter.total_tokens)
+
+
+def register_cache(name: str, cache: CacheBackend):
+    def collect_cache_stats():
+        cache_hits.values[(name,)] = cache.hits
+        cache_misses.values[(name,)] = cache.misses
+
+    registry.add_collector(collect_cache_stats)
+
+
+def register_single_flight(name: str, flight: SingleFlight):
+    def collect_single_flight_stats():
+        coalesced_calls.values[(name,)] = flight.calls
+        coalesced_shared.values[(name,)] = flight.shared
+
+    registry.add_collector(collect_single_flight_stats)
+
+
+registry.add_collector(collect_pool_stats)
+registry.add_collector(collect_threadpool_stats)
+
+
+class MetricsFlushWorker(BackgroundWorker):
+    """Writes this worker's snapshot to `METRICS_MULTIPROC_DIR` so that other workers can serve it."""
+
+    name = "Metrics flush worker"
+
+    @property
+    def batch_size(self) -> int:
+        return 1
+
+    @property
+    def poll_interval(self) -> float:
+        return settings.METRICS_FLUSH_INTERVAL_SECONDS
+
+    async def process_due(self) -> int:
+        snapshot = registry.snapshot()
+        await run_in_threadpool(write_snapshot, settings.METRICS_MULTIPROC_DIR, snapshot)
+        return 0
+
+    async def close(self):
+        # A final snapshot keeps this worker's counters in the totals after it exits.
+        if settings.METRICS_MULTIPROC_DIR:
+            await self.process_due()
+
+
+metrics_flush_worker = MetricsFlushWorker()
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    # Collectors read event-loop state, so the snapshot is taken here; file I/O goes to a thread.
+    snapshot = registry.snapshot()
+    body = await run_in_threadpool(exposition, snapshot, settings.METRICS_MULTIPROC_DIR)
+    return PlainTextResponse(body, media_type=CONTENT_TYPE)
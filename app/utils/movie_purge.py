@@ -0,0 +1,37 @@
+"""
+Background removal of soft-deleted movies.
+
+With MOVIE_SOFT_DELETE enabled, deleting a movie only sets its `deleted_at`.
+`MoviePurgeWorker` then removes the movie's ratings and comment threads in
+batches of MOVIE_PURGE_BATCH_SIZE, each in its own short transaction, and
+finally the movie row, so deleting a popular movie never holds locks on
+thousands of rows at once.
+"""
+from app.core.config import settings
+from app.crud.crud_movie import purge_deleted_movies
+from app.db.session import AsyncSessionLocal
+from app.utils.worker import BackgroundWorker
+
+
+class MoviePurgeWorker(BackgroundWorker):
+    name = "Movie purge worker"
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        super().__init__()
+        self._session_factory = session_factory
+
+    @property
+    def batch_size(self) -> int:
+        # Any rows purged means there may be more; keep going until a pass finds nothing.
+        return 1
+
+    @property
+    def poll_interval(self) -> float:
+        return settings.MOVIE_PURGE_POLL_INTERVAL_SECONDS
+
+    async def process_due(self) -> int:
+        async with self._session_factory() as db:
+            return await purge_deleted_movies(db, settings.MOVIE_PURGE_BATCH_SIZE)
+
+
+movie_purge_worker = MoviePurgeWorker()
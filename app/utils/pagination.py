@@ -0,0 +1,76 @@
+"""
+Opaque cursor tokens for keyset pagination.
+
+A cursor records the sort mode it was issued for and the sort-key values of the
+last row on the page. Values are tagged with their type so they decode back to
+exactly what the database returned.
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import literal, tuple_
+
+_ENCODERS = [
+    (UUID, "u", str),
+    (datetime, "t", datetime.isoformat),
+    (date, "d", date.isoformat),
+    (Decimal, "n", str),
+    (float, "f", float),
+    (int, "i", int),
+    (str, "s", str),
+]
+
+_DECODERS = {
+    "u": UUID,
+    "t": datetime.fromisoformat,
+    "d": date.fromisoformat,
+    "n": Decimal,
+    "f": float,
+    "i": int,
+    "s": str,
+}
+
+
+def _encode_value(value):
+    for value_type, tag, encode in _ENCODERS:
+        if isinstance(value, value_type):
+            return [tag, encode(value)]
+    raise TypeError(f"Cannot encode cursor value of type {type(value).__name__}")
+
+
+def encode_cursor(sort_mode: str, values) -> str:
+    payload = json.dumps({"k": sort_mode, "v": [_encode_value(value) for value in values]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_mode: str, key_count: int) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload["k"] != sort_mode or len(payload["v"]) != key_count:
+            raise ValueError("Cursor does not match the requested sort order")
+        return [_DECODERS[tag](value) for tag, value in payload["v"]]
+    except (binascii.Error, ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor") from e
+
+
+def keyset_condition(keys: list, values: list, descending: bool = True):
+    """Row-value comparison selecting the rows that come after `values` in `keys` order."""
+    boundary = tuple_(*[literal(value, key.type) for key, value in zip(keys, values)])
+    return tuple_(*keys) < boundary if descending else tuple_(*keys) > boundary
+
+
+def paginate_rows(rows: list, limit: int, sort_mode: str, key_values):
+    """
+    Trim a `limit + 1` row fetch to the page and build the cursor for the next one.
+    `key_values` maps the last row on the page to its sort-key values.
+    """
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(sort_mode, key_values(page[-1]))
@@ -0,0 +1,146 @@
+"""
+Profilers for single requests and the on-disk store for their results.
+
+`SamplingProfiler` records the stack of one thread every `interval` seconds
+from a background thread. It writes folded stacks (`frame;frame;frame count`
+per line), which flamegraph.pl, speedscope and inferno read directly.
+`CProfileProfiler` wraps cProfile and writes a pstats file, which snakeviz,
+tuna or `python -m pstats` read.
+
+Both profile a thread, not a request. In an async route that is the event loop
+thread, so the profile also covers anything else the loop ran in the meantime.
+"""
+import cProfile
+import json
+import os
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
+PROFILE_MODES = ("sampling", "cprofile")
+
+
+def _short_path(filename: str) -> str:
+    for prefix in sorted(sys.path, key=len, reverse=True):
+        if prefix and filename.startswith(prefix + os.sep):
+            return filename[len(prefix) + 1:]
+    return filename
+
+
+class SamplingProfiler:
+    extension = "folded"
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._labels: dict = {}
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self._record(frame)
+
+    def _record(self, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                # ';' separates frames in the folded format.
+                label = self._labels[code] = f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+            stack.append(label)
+            frame = frame.f_back
+        stack.reverse()
+        self.stacks[";".join(stack)] += 1
+        self.samples += 1
+
+    def dump(self, path: str):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def summary(self) -> dict:
+        return {"samples": self.samples, "interval_ms": self.interval * 1000}
+
+
+class CProfileProfiler:
+    extension = "prof"
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def dump(self, path: str):
+        self.profile.dump_stats(path)
+
+    def summary(self) -> dict:
+        return {}
+
+
+def create_profiler(mode: str, interval: float):
+    """A profiler for the calling thread."""
+    if mode == "sampling":
+        return SamplingProfiler(threading.get_ident(), interval)
+    if mode == "cprofile":
+        return CProfileProfiler()
+    raise ValueError(f"Unknown profiling mode {mode!r}; expected one of {', '.join(PROFILE_MODES)}")
+
+
+def sql_timeline(timeline: list, request_started: float) -> list:
+    return [
+        {"start_ms": round((started - request_started) * 1000, 3), "duration_ms": round(elapsed * 1000, 3), "statement": " ".join(statement.split())}
+        for started, elapsed, statement in timeline
+    ]
+
+
+def store_profile(directory: str, name: str, profiler, metadata: dict, keep: int) -> list:
+    """
+    Write the profile and its metadata as `<name>.<ext>` and `<name>.json`,
+    then delete the oldest profiles beyond the newest `keep`. Names start with
+    a timestamp, so they sort oldest first. Returns the files written.
+    """
+    os.makedirs(directory, exist_ok=True)
+    profile_file = f"{name}.{profiler.extension}"
+    profiler.dump(os.path.join(directory, profile_file))
+    with open(os.path.join(directory, f"{name}.json"), "w") as f:
+        json.dump({**metadata, "profile": profile_file}, f, indent=2)
+    rotate_profiles(directory, keep)
+    return [profile_file, f"{name}.json"]
+
+
+def rotate_profiles(directory: str, keep: int):
+    entries = os.listdir(directory)
+    names = sorted(entry[:-len(".json")] for entry in entries if entry.endswith(".json"))
+    expired = {name + "." for name in names[:max(0, len(names) - keep)]}
+    for entry in entries:
+        if any(entry.startswith(prefix) for prefix in expired):
+            try:
+                os.remove(os.path.join(directory, entry))
+            except FileNotFoundError:
+                # Another worker rotated it first.
+                pass
+
+
+def profile_name(method: str, route: str) -> str:
+    slug = "".join(c if c.isalnum() else "_" for c in route).strip("_") or "root"
+    return f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}-{os.getpid()}-{method.lower()}-{slug}"
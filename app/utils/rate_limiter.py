@@ -1,4 +1,233 @@
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+"""
+Per-route rate limits, shared between workers when backed by Redis.
 
-limiter = Limiter(key_func=get_remote_address)
\ No newline at end of file
+Routes declare their limit with `@limiter.limit("10/minute")` and take a
+`request: Request` parameter. Limits use the generic cell rate algorithm
+(GCRA): each key stores a single timestamp, its theoretical arrival time, and a
+request is one atomic read-modify-write of it. On Redis that is one Lua script
+call; in memory it is one dict update. A limit of N per period allows a burst
+of N requests and then one every period / N.
+
+Requests are keyed by the authenticated user when the route resolved one, and
+by client address otherwise. Addresses are taken from `X-Forwarded-For` only
+when the request comes from one of `RATE_LIMIT_TRUSTED_PROXIES`.
+"""
+import functools
+import hashlib
+import inspect
+import re
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from redis.exceptions import NoScriptError
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.utils.logger import logger
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+RATE_PATTERN = re.compile(r"^\s*(\d+)\s*(?:/|per)\s*(\d*)\s*(second|minute|hour|day)s?\s*$")
+
+# Times are in milliseconds. Redis supplies the clock, so workers on different hosts agree on it.
+GCRA_SCRIPT = """
+local emission = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + tonumber(clock[2]) / 1000
+local tat = tonumber(redis.call('GET', KEYS[1])) or now
+if tat < now then
+    tat = now
+end
+if tat - tolerance > now then
+    return math.ceil(tat - tolerance - now)
+end
+local new_tat = tat + emission
+redis.call('SET', KEYS[1], string.format('%.3f', new_tat), 'PX', math.ceil(new_tat - now))
+return 0
+"""
+GCRA_SCRIPT_SHA = hashlib.sha1(GCRA_SCRIPT.encode()).hexdigest()
+
+
+@dataclass(frozen=True)
+class Rate:
+    amount: int
+    multiplier: int
+    unit: str
+
+    @property
+    def period(self) -> int:
+        return self.multiplier * PERIODS[self.unit]
+
+    @property
+    def emission_interval_ms(self) -> float:
+        return self.period * 1000 / self.amount
+
+    @property
+    def tolerance_ms(self) -> float:
+        return self.period * 1000 - self.emission_interval_ms
+
+    def __str__(self) -> str:
+        return f"{self.amount} per {self.multiplier} {self.unit}"
+
+
+def parse_rate(spec: str) -> Rate:
+    match = RATE_PATTERN.match(spec)
+    if not match:
+        raise ValueError(f"Invalid rate limit: {spec!r}")
+    amount, multiplier, unit = match.groups()
+    return Rate(int(amount), int(multiplier or 1), unit)
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, rate: Rate, retry_after: float):
+        super().__init__(f"Rate limit exceeded: {rate}")
+        self.rate = rate
+        self.retry_after = retry_after
+
+
+def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded) -> JSONResponse:
+    return JSONResponse({"error": str(exc)}, status_code=429, headers={"Retry-After": str(max(1, round(exc.retry_after)))})
+
+
+class RateLimitStore:
+    async def acquire(self, key: str, rate: Rate) -> float:
+        """Count one request against `key`. Returns 0 if it is allowed, otherwise the seconds until it would be."""
+        raise NotImplementedError
+
+    def reset(self) -> None:
+        """Forget every key. Only the in-process store supports this; Redis keys expire by themselves."""
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """Per-process store; each worker enforces its own copy of every limit."""
+
+    SWEEP_EVERY = 1000
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._arrivals: dict = {}
+        self._updates = 0
+
+    async def acquire(self, key: str, rate: Rate) -> float:
+        now = self._clock() * 1000
+        tat = max(self._arrivals.get(key, now), now)
+        if tat - rate.tolerance_ms > now:
+            return (tat - rate.tolerance_ms - now) / 1000
+        self._arrivals[key] = tat + rate.emission_interval_ms
+        self._updates += 1
+        if self._updates % self.SWEEP_EVERY == 0:
+            self._sweep(now)
+        return 0.0
+
+    def _sweep(self, now: float):
+        expired = [key for key, tat in self._arrivals.items() if tat <= now]
+        for key in expired:
+            del self._arrivals[key]
+
+    def reset(self) -> None:
+        self._arrivals.clear()
+
+
+class RedisRateLimitStore(RateLimitStore):
+    """
+    Store shared by every worker and node using the same Redis. If Redis is
+    unavailable, requests are allowed and the error is logged, so that an outage
+    of the limiter does not take the API down with it.
+    """
+
+    def __init__(self, client, prefix: str = "ratelimit"):
+        self.client = client
+        self.prefix = prefix
+        self.errors = 0
+
+    async def acquire(self, key: str, rate: Rate) -> float:
+        args = (1, f"{self.prefix}:{key}", rate.emission_interval_ms, rate.tolerance_ms)
+        try:
+            try:
+                retry_after_ms = await self.client.evalsha(GCRA_SCRIPT_SHA, *args)
+            except NoScriptError:
+                # First call since Redis started; EVAL also caches the script for the next EVALSHA.
+                retry_after_ms = await self.client.eval(GCRA_SCRIPT, *args)
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Rate limit check failed for %s, allowing the request: %s", key, e)
+            return 0.0
+        return int(retry_after_ms) / 1000
+
+
+def client_address(request: Request) -> str:
+    peer = request.client.host if request.client else "unknown"
+    trusted = settings.RATE_LIMIT_TRUSTED_PROXIES
+    if peer not in trusted:
+        return peer
+    forwarded = request.headers.get("X-Forwarded-For")
+    if not forwarded:
+        return peer
+    # The rightmost address not added by one of our own proxies is the client.
+    for address in reversed([part.strip() for part in forwarded.split(",")]):
+        if address not in trusted:
+            return address
+    return peer
+
+
+def rate_limit_key(request: Request) -> str:
+    user = getattr(request.state, "user", None)
+    if user is not None:
+        return f"user:{user.id}"
+    return f"ip:{client_address(request)}"
+
+
+class RateLimiter:
+    def __init__(self, store: RateLimitStore, key_func: Callable[[Request], str] = rate_limit_key):
+        self.store = store
+        self.key_func = key_func
+        self.enabled = settings.RATE_LIMIT_ENABLED
+
+    def limit(self, spec: str):
+        rate = parse_rate(spec)
+
+        def decorator(func):
+            if "request" not in inspect.signature(func).parameters:
+                raise TypeError(f"Rate-limited route {func.__name__} needs a `request: Request` parameter")
+            scope = f"{func.__module__}.{func.__name__}"
+            is_async = inspect.iscoroutinefunction(func)
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                if self.enabled:
+                    await self.check(kwargs["request"], scope, rate)
+                if is_async:
+                    return await func(*args, **kwargs)
+                return await run_in_threadpool(func, *args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    async def check(self, request: Request, scope: str, rate: Rate):
+        retry_after = await self.store.acquire(f"{scope}:{self.key_func(request)}", rate)
+        if retry_after:
+            raise RateLimitExceeded(rate, retry_after)
+
+    def reset(self) -> None:
+        self.store.reset()
+
+
+def create_rate_limit_store() -> RateLimitStore:
+    backend = settings.RATE_LIMIT_BACKEND.lower()
+    if backend == "memory":
+        return MemoryRateLimitStore()
+    if backend == "redis":
+        redis_url = settings.RATE_LIMIT_REDIS_URL or settings.CACHE_REDIS_URL
+        if not redis_url:
+            raise ValueError("RATE_LIMIT_REDIS_URL or CACHE_REDIS_URL must be set when RATE_LIMIT_BACKEND is 'redis'")
+        from redis.asyncio import Redis
+
+        return RedisRateLimitStore(Redis.from_url(redis_url))
+    raise ValueError(f"Unsupported RATE_LIMIT_BACKEND: {settings.RATE_LIMIT_BACKEND}")
+
+
+limiter = RateLimiter(create_rate_limit_store())
@@ -0,0 +1,97 @@
+"""
+Per-request SQL and serialisation timings.
+
+`QueryStatsMiddleware` puts a `RequestStats` into `current_request_stats` for
+the duration of a request. The engine listeners installed by
+`install_query_listeners` add every statement to it, and JSON rendering adds
+its own time. `ProfilingMiddleware` also sets a collector for each profiled
+request, reusing the query stats one if there is one, and turns on its
+`timeline` to keep every statement with its start time. When no collector is
+set, which is the case when neither query stats nor a profile is active, each
+listener returns after one context variable lookup.
+"""
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Expanded IN lists render one placeholder per value; collapse them so the
+# same query over a different number of ids still has one shape.
+IN_LIST = re.compile(r"IN \((?:\s*(?:\?|%s|\$\d+|:\w+)\s*,?)+\)", re.IGNORECASE)
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_time", "serialization_time", "statement_counts", "timeline")
+
+    def __init__(self, timeline: bool = False):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialization_time = 0.0
+        self.statement_counts: Counter = Counter()
+        # (perf_counter start, elapsed, statement) of every statement, in order.
+        self.timeline: Optional[list] = [] if timeline else None
+
+    def record_query(self, statement: str, elapsed: float, started: Optional[float] = None):
+        self.queries += 1
+        self.db_time += elapsed
+        self.statement_counts[statement] += 1
+        if self.timeline is not None:
+            self.timeline.append((started, elapsed, statement))
+
+    def repeated_statements(self, threshold: int) -> list:
+        """Statement shapes run more than `threshold` times, most frequent first."""
+        shapes = Counter()
+        for statement, count in self.statement_counts.items():
+            shapes[statement_shape(statement)] += count
+        return [(shape, count) for shape, count in shapes.most_common() if count > threshold]
+
+    def server_timing(self, total: float) -> str:
+        return (
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.queries} queries", '
+            f"ser;dur={self.serialization_time * 1000:.2f}, "
+            f"total;dur={total * 1000:.2f}"
+        )
+
+
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+
+def statement_shape(statement: str) -> str:
+    return IN_LIST.sub("IN (...)", " ".join(statement.split()))
+
+
+@contextmanager
+def serialization_timer():
+    stats = current_request_stats.get()
+    if stats is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.serialization_time += time.perf_counter() - started
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_request_stats.get() is not None:
+        context._query_stats_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_request_stats.get()
+    if stats is None:
+        return
+    started = getattr(context, "_query_stats_started", None)
+    if started is not None:
+        stats.record_query(statement, time.perf_counter() - started, started)
+
+
+def install_query_listeners(engine: Engine):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
@@ -0,0 +1,132 @@
+"""
+HTTP response cache for public GET routes, enabled by `RESPONSE_CACHE_ENABLED`.
+
+A route opts in with `@response_cache.cached("movie", tags=["movie:{movie_id}"])`.
+The cache key is built from the route's validated parameters, not the raw URL.
+So `/movies/?limit=10&skip=0` and `/movies/?skip=0&limit=10` share an entry,
+and defaults need not be spelled out. Only requests without an
+`Authorization` header are served from or stored in the cache.
+
+Every 200 response carries a strong `ETag`, a hash of its body, and a
+`Cache-Control: public, max-age=<ttl>` header for downstream caches. A matching
+`If-None-Match` gets `304 Not Modified`.
+
+Tags name the data an entry was built from. Each tag has a version token, and
+the token is part of the key of every entry built under it. `invalidate()`
+gives the tag a new token. Existing entries are then unreachable and expire on
+their own, so the scheme needs only get and set and works on every
+`CacheBackend`.
+"""
+import functools
+import hashlib
+import uuid
+from enum import Enum
+from typing import Optional
+from uuid import UUID
+
+from fastapi import Request, Response
+
+from app.core.config import settings
+from app.utils.cache import CacheBackend, create_cache
+from app.utils.logger import logger
+
+KEY_TYPES = (str, int, float, bool, UUID, Enum)
+
+
+def cache_key_params(kwargs: dict) -> str:
+    params = sorted(
+        (name, value.value if isinstance(value, Enum) else value)
+        for name, value in kwargs.items()
+        if value is not None and isinstance(value, KEY_TYPES)
+    )
+    return "&".join(f"{name}={value}" for name, value in params)
+
+
+def strong_etag(body: bytes) -> str:
+    return '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+class ResponseCache:
+    def __init__(self, entries: CacheBackend, tag_versions: CacheBackend):
+        self.entries = entries
+        self.tag_versions = tag_versions
+
+    def ttl(self, name: str) -> int:
+        return settings.RESPONSE_CACHE_TTL_SECONDS.get(name, settings.RESPONSE_CACHE_DEFAULT_TTL_SECONDS)
+
+    def cached(self, name: str, tags: list):
+        """Cache the route's 200 responses under `tags`, templates formatted with the route's parameters."""
+
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                request: Request = kwargs["request"]
+                if not settings.RESPONSE_CACHE_ENABLED or "authorization" in request.headers:
+                    return await func(*args, **kwargs)
+
+                ttl = self.ttl(name)
+                entry_tags = [tag.format(**kwargs) for tag in tags]
+                key = await self._key(name, cache_key_params(kwargs), entry_tags)
+                cached = await self.entries.get(key)
+                if cached is not None:
+                    etag, body = cached.split("\n", 1)
+                    return self._respond(request, body.encode(), etag, ttl)
+
+                response = await func(*args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                etag = strong_etag(response.body)
+                await self.entries.set(key, f"{etag}\n{response.body.decode()}", ttl)
+                return self._respond(request, response.body, etag, ttl, response)
+
+            return wrapper
+
+        return decorator
+
+    async def invalidate(self, *tags: str):
+        """Make every entry built under any of `tags` unreachable. Called by the write paths after they commit."""
+        if not settings.RESPONSE_CACHE_ENABLED:
+            return
+        for tag in tags:
+            await self.tag_versions.set(tag, uuid.uuid4().hex)
+        logger.debug("Invalidated cached responses tagged %s", tags)
+
+    async def _key(self, name: str, params: str, tags: list) -> str:
+        versions = []
+        for tag in tags:
+            version = await self.tag_versions.get(tag)
+            if version is None:
+                # An expired or evicted version is replaced, never reused, so entries
+                # built under an older version cannot become reachable again.
+                version = uuid.uuid4().hex
+                await self.tag_versions.set(tag, version)
+            versions.append(version)
+        return f"{name}:{params}:{'.'.join(versions)}"
+
+    @staticmethod
+    def _respond(request: Request, body: bytes, etag: str, ttl: int, response: Optional[Response] = None) -> Response:
+        headers = {"ETag": etag, "Cache-Control": f"public, max-age={ttl}"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        if response is None:
+            return Response(content=body, media_type="application/json", headers=headers)
+        response.headers.update(headers)
+        return response
+
+
+def create_response_cache() -> ResponseCache:
+    max_ttl = max([settings.RESPONSE_CACHE_DEFAULT_TTL_SECONDS, *settings.RESPONSE_CACHE_TTL_SECONDS.values()])
+    return ResponseCache(
+        create_cache("response", settings.RESPONSE_CACHE_DEFAULT_TTL_SECONDS, settings.RESPONSE_CACHE_MAX_SIZE),
+        create_cache("response-tag", max_ttl, settings.RESPONSE_CACHE_MAX_SIZE),
+    )
+
+
+response_cache = create_response_cache()
@@ -0,0 +1,41 @@
+"""
+Single-pass JSON responses for the `BaseResponse` envelope.
+
+The payload is serialised once by a precompiled pydantic serializer and
+embedded into the envelope by orjson without being parsed again. Returning a
+`Response` also stops FastAPI from validating and serialising the route's
+`response_model` a second time; the `response_model` stays on the route for
+the OpenAPI schema.
+"""
+from typing import Any, Optional
+
+import orjson
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
+
+from app.utils.request_stats import serialization_timer
+
+
+class TimedORJSONResponse(ORJSONResponse):
+    """`ORJSONResponse` whose rendering time is counted as serialisation in the request stats."""
+
+    def render(self, content: Any) -> bytes:
+        with serialization_timer():
+            return super().render(content)
+
+
+def envelope_response(status_code: int, message: str, data: Any, adapter: Optional[TypeAdapter] = None, **extra) -> ORJSONResponse:
+    """
+    Build a successful `BaseResponse`-shaped response around `data`, a pydantic
+    model, or any value `adapter` can serialise.
+    """
+    with serialization_timer():
+        data_json = adapter.dump_json(data) if adapter is not None else data.model_dump_json()
+    content = {
+        "success": True,
+        "status_code": status_code,
+        "message": message,
+        "data": orjson.Fragment(data_json),
+        **extra,
+    }
+    return TimedORJSONResponse(content, status_code=status_code)
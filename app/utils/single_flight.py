@@ -0,0 +1,95 @@
+"""
+Request coalescing for hot reads.
+
+While a call for a key is in flight, identical calls wait for its result
+instead of repeating the work. The waiters receive the same return value or
+exception as the call they joined. A flight is joined only until
+`SINGLE_FLIGHT_TIMEOUT_SECONDS` after it started. A waiter that is still
+waiting by then runs the call itself, and so does a waiter whose flight was
+cancelled, for example because its client disconnected. A stuck query
+therefore never holds up more than one timeout's worth of callers.
+
+Coalescing is per process and only shares work between requests that are in
+progress at the same moment; it is not a cache.
+"""
+import asyncio
+import functools
+import time
+from typing import Awaitable, Callable, Hashable, Optional
+
+from app.core.config import settings
+from app.utils.logger import logger
+
+
+class SingleFlight:
+    def __init__(self, name: str, timeout: Optional[float] = None):
+        self.name = name
+        self._timeout = timeout
+        self._flights: dict = {}
+        self.calls = 0
+        self.shared = 0
+
+    @property
+    def timeout(self) -> float:
+        return self._timeout if self._timeout is not None else settings.SINGLE_FLIGHT_TIMEOUT_SECONDS
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable]):
+        flight = self._flights.get(key)
+        now = time.monotonic()
+        if flight is not None and flight[1] > now:
+            future, deadline = flight
+            self.shared += 1
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), deadline - now)
+            except asyncio.TimeoutError:
+                logger.warning("%s: in-flight call for %s exceeded %ss, running it again", self.name, key, self.timeout)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The call we joined was cancelled, not us; do the work ourselves.
+            self.shared -= 1
+        return await self._lead(key, call, now)
+
+    async def _lead(self, key: Hashable, call: Callable[[], Awaitable], now: float):
+        self.calls += 1
+        future = asyncio.get_running_loop().create_future()
+        flight = self._flights[key] = (future, now + self.timeout)
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Waiters re-raise the exception; mark it retrieved so that a flight nobody joined is not reported.
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "shared": self.shared, "in_flight": len(self._flights)}
+
+
+def single_flight(flight: SingleFlight):
+    """
+    Coalesce concurrent calls of a service function that takes the database
+    session first. Calls are identical when all other arguments are equal; the
+    joined call runs on the session of whichever request started it.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(db, *args, **kwargs):
+            if not settings.SINGLE_FLIGHT_ENABLED:
+                return await func(db, *args, **kwargs)
+            key = (args, tuple(sorted(kwargs.items())))
+            return await flight.do(key, lambda: func(db, *args, **kwargs))
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,82 @@
+"""
+Base class for the app's background workers.
+
+A worker runs on the application's event loop. It calls `process_due()` again
+straight away while that reports a full batch, and otherwise sleeps until
+`notify()` is called or the poll interval passes.
+"""
+import asyncio
+from typing import Optional
+
+from app.utils.logger import logger
+
+
+class BackgroundWorker:
+    name = "Background worker"
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def batch_size(self) -> int:
+        raise NotImplementedError
+
+    @property
+    def poll_interval(self) -> float:
+        raise NotImplementedError
+
+    async def process_due(self) -> int:
+        """Handle one batch of work. Returns how many items it took on."""
+        raise NotImplementedError
+
+    async def on_idle(self):
+        """Called before the worker goes to sleep."""
+
+    async def close(self):
+        """Release held resources when the worker stops."""
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logger.info("%s started", self.name)
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.close()
+        self._loop = None
+        logger.info("%s stopped", self.name)
+
+    def notify(self):
+        """Wake the worker so new work is picked up without waiting for the next poll. Thread-safe."""
+        if self._loop is None or self._wakeup is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        except RuntimeError:
+            # The loop has already been closed during shutdown.
+            pass
+
+    async def _run(self):
+        while True:
+            try:
+                claimed = await self.process_due()
+            except Exception:
+                logger.exception("%s failed to process a batch", self.name)
+                claimed = 0
+            if claimed >= self.batch_size:
+                continue
+            await self.on_idle()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
@@ -0,0 +1,37 @@
+"""
+Shared setup for the benchmark scripts. Importing this module points the
+application at a throwaway SQLite database (unless DATABASE_URL is already set)
+so that benchmarks never touch a real database, mail server or log sink. The
+email queue worker is off and no syslog handler is installed, and only
+warnings are logged, so neither competes with the code being measured.
+"""
+import os
+import tempfile
+
+BENCH_DIR = tempfile.mkdtemp(prefix="movie_listing_bench_")
+BENCH_DATABASE_URL = os.environ.get("BENCH_DATABASE_URL", f"sqlite:///{os.path.join(BENCH_DIR, 'bench.db')}")
+
+_DEFAULTS = {
+    "DATABASE_URL": BENCH_DATABASE_URL,
+    "TEST_DATABASE_URL": BENCH_DATABASE_URL,
+    "TESTING": "true",
+    "SECRET_KEY": "benchmark-secret",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+    "POSTGRES_USER": "bench",
+    "POSTGRES_PASSWORD": "bench",
+    "POSTGRES_DB": "bench",
+    "SMTP_SERVER": "localhost",
+    "SMTP_PORT": "1025",
+    "SMTP_SENDER": "bench@example.com",
+    "SMTP_PASSWORD": "",
+    "BASE_URL": "http://localhost:8000",
+    "VERIFICATION_TOKEN_EXPIRE_HOURS": "1",
+    "PAPERTRAIL_URL": "",
+    "PAPERTRAIL_PORT": "514",
+    "EMAIL_QUEUE_ENABLED": "false",
+    "LOG_LEVEL": "WARNING",
+}
+
+for key, value in _DEFAULTS.items():
+    os.environ.setdefault(key, value)
@@ -0,0 +1,125 @@
+"""
+Concurrent-request throughput of the movie listing endpoint with the blocking
+Session running inside an `async def` handler (the previous implementation)
+versus the AsyncSession path.
+
+Usage:
+    python -m benchmarks.bench_async_db --movies 50000 --requests 200 --concurrency 1 10 50
+"""
+import argparse
+import asyncio
+import contextlib
+import time
+from datetime import date, timedelta
+
+from benchmarks import _env  # noqa: F401  (must run before importing the app)
+
+import httpx
+from fastapi import APIRouter, Query
+from sqlalchemy import or_
+
+from app.db.models.movie import Movie
+from app.db.models.user import User
+from app.db.schemas.movie import BaseResponse, MovieResponse
+from app.db.session import Base, SessionLocal, engine
+from app.main import app
+from app.utils.rate_limiter import limiter
+
+SEARCH_TERM = "needle"
+
+blocking_router = APIRouter()
+
+
+@blocking_router.get("/bench/blocking-movies", response_model=BaseResponse)
+async def list_movies_blocking(search: str = Query(None), skip: int = 0, limit: int = 10):
+    # Mirrors the old code path: a synchronous Session queried directly on the event loop.
+    db = SessionLocal()
+    try:
+        query = db.query(Movie)
+        if search:
+            query = query.filter(or_(Movie.title.contains(search), Movie.description.contains(search)))
+        movies = query.offset(skip).limit(limit).all()
+        return BaseResponse(success=True, status_code=200, message="Movies retrieved successfully",
+                            data=[MovieResponse.from_orm(movie) for movie in movies])
+    finally:
+        db.close()
+
+
+def seed(count: int):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if db.query(Movie).count() >= count:
+            return
+        owner = User(email="bench-owner@example.com", first_name="Bench", last_name="Owner", hashed_password="x")
+        db.add(owner)
+        db.flush()
+        db.bulk_insert_mappings(Movie, [
+            {
+                "title": f"Movie {i}",
+                "description": f"Synthetic description number {i}",
+                "duration": 90 + i % 60,
+                "release_date": date(2000, 1, 1) + timedelta(days=i % 8000),
+                "poster_url": f"https://example.com/{i}.jpg",
+                "owner_id": owner.id,
+            }
+            for i in range(count)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+async def watch_event_loop(lags: list, interval: float = 0.001):
+    # Records how late the loop wakes us up; a blocked loop shows up as a large lag.
+    while True:
+        started = time.perf_counter()
+        try:
+            await asyncio.sleep(interval)
+        except asyncio.CancelledError:
+            # A loop blocked until the run ends never wakes the watcher; the
+            # wait that cancellation cuts short is the stall to report.
+            lags.append(time.perf_counter() - started - interval)
+            raise
+        lags.append(time.perf_counter() - started - interval)
+
+
+async def run(client: httpx.AsyncClient, path: str, total: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    lags = []
+
+    async def one():
+        async with semaphore:
+            response = await client.get(path, params={"search": SEARCH_TERM})
+            response.raise_for_status()
+
+    watcher = asyncio.create_task(watch_event_loop(lags))
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+    watcher.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await watcher
+    return total / elapsed, max(lags, default=0.0) * 1000
+
+
+async def main(args):
+    seed(args.movies)
+    limiter.enabled = False
+    app.include_router(blocking_router)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get("/movies/", params={"search": SEARCH_TERM})
+        print(f"{'concurrency':>12} {'blocking req/s':>16} {'max loop lag ms':>16} {'async req/s':>14} {'max loop lag ms':>16}")
+        for concurrency in args.concurrency:
+            before, before_lag = await run(client, "/bench/blocking-movies", args.requests, concurrency)
+            after, after_lag = await run(client, "/movies/", args.requests, concurrency)
+            print(f"{concurrency:>12} {before:>16.1f} {before_lag:>16.1f} {after:>14.1f} {after_lag:>16.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--movies", type=int, default=50000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,120 @@
+"""
+Per-request overhead of the ErrorHandling/Logging/Auth middleware chain, for
+the previous BaseHTTPMiddleware implementations versus the pure ASGI ones.
+Requests are driven straight through the ASGI interface against a trivial
+endpoint so that only the middleware cost is measured.
+
+Usage:
+    python -m benchmarks.bench_middleware --requests 20000
+"""
+import argparse
+import asyncio
+import logging
+import time
+from datetime import datetime
+
+from benchmarks import _env  # noqa: F401  (must run before importing the app)
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.middlewares.auth_middleware import AuthMiddleware
+from app.middlewares.error_handling_middleware import ErrorHandlingMiddleware
+from app.middlewares.logging_middleware import LoggingMiddleware
+from app.utils.logger import logger
+
+EXCLUDED_PATHS = ["/docs", "/openapi.json", "/auth/login", "/auth/register/"]
+
+
+class LegacyErrorHandlingMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        try:
+            return await call_next(request)
+        except Exception:
+            return JSONResponse(status_code=500, content={"status": False, "status_code": 500, "message": "error"})
+
+
+class LegacyLoggingMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        start_time = datetime.now()
+        logger.info(f"{start_time} - Starting request: {request.method} {request.url}")
+        response = await call_next(request)
+        logger.info(f"{start_time} - Request processed successfully in {(datetime.now() - start_time).total_seconds()} seconds")
+        return response
+
+
+class LegacyAuthMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app, excluded_paths: list = None):
+        super().__init__(app)
+        self.excluded_paths = excluded_paths or []
+
+    async def dispatch(self, request: Request, call_next):
+        if any(request.url.path.startswith(path) for path in self.excluded_paths):
+            return await call_next(request)
+        if not request.headers.get("Authorization"):
+            raise HTTPException(status_code=401, detail="Authorization required")
+        return await call_next(request)
+
+
+def build_app(error_handling, logging_middleware, auth) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    if error_handling:
+        app.add_middleware(error_handling)
+        app.add_middleware(logging_middleware)
+        app.add_middleware(auth, excluded_paths=EXCLUDED_PATHS)
+    return app
+
+
+async def measure(app, total: int) -> float:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/ping", "raw_path": b"/ping", "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"bench"), (b"authorization", b"Bearer token")],
+        "client": ("127.0.0.1", 1234), "server": ("bench", 80),
+    }
+
+    async def send(message):
+        pass
+
+    async def one():
+        received = False
+
+        async def receive():
+            nonlocal received
+            if received:
+                # Like a real server: nothing more arrives until the client disconnects.
+                await asyncio.Event().wait()
+            received = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        await app(dict(scope), receive, send)
+
+    for _ in range(200):
+        await one()
+    started = time.perf_counter()
+    for _ in range(total):
+        await one()
+    return (time.perf_counter() - started) / total * 1_000_000
+
+
+async def main(args):
+    logger.setLevel(logging.WARNING)
+    baseline = await measure(build_app(None, None, None), args.requests)
+    legacy = await measure(build_app(LegacyErrorHandlingMiddleware, LegacyLoggingMiddleware, LegacyAuthMiddleware), args.requests)
+    pure = await measure(build_app(ErrorHandlingMiddleware, LoggingMiddleware, AuthMiddleware), args.requests)
+    print(f"{'stack':<22} {'us/request':>11} {'overhead us':>12}")
+    print(f"{'no middleware':<22} {baseline:>11.1f} {0.0:>12.1f}")
+    print(f"{'BaseHTTPMiddleware':<22} {legacy:>11.1f} {legacy - baseline:>12.1f}")
+    print(f"{'pure ASGI':<22} {pure:>11.1f} {pure - baseline:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,81 @@
+"""
+Login throughput of `/auth/login` for different password-hashing pool sizes.
+Every login performs exactly one bcrypt verification on the pool; the event
+loop lag column shows that the loop stays responsive while the pool is busy.
+
+The bcrypt cost is taken from BCRYPT_ROUNDS (12 unless set):
+
+    BCRYPT_ROUNDS=12 python -m benchmarks.bench_password_pool --requests 200 --concurrency 50 --workers 1 2 4 8
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks import _env  # noqa: F401  (must run before importing the app)
+
+import httpx
+
+from app.core.config import settings
+from app.core.security import get_password_hash, shutdown_password_executor
+from app.db.models.user import User
+from app.db.session import Base, SessionLocal, engine
+from app.main import app
+from app.utils.rate_limiter import limiter
+from benchmarks.bench_async_db import watch_event_loop
+
+PASSWORD = "benchmark123"
+USER_COUNT = 20
+
+
+def seed():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        hashed_password = get_password_hash(PASSWORD)
+        for i in range(USER_COUNT):
+            email = f"bench-login-{i}@example.com"
+            if not db.query(User).filter(User.email == email).first():
+                db.add(User(email=email, first_name="Bench", last_name="Login", hashed_password=hashed_password, is_verified=True))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def run(client: httpx.AsyncClient, total: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    lags = []
+
+    async def one(i: int):
+        async with semaphore:
+            response = await client.post("/auth/login", json={"email": f"bench-login-{i % USER_COUNT}@example.com", "password": PASSWORD})
+            response.raise_for_status()
+
+    watcher = asyncio.create_task(watch_event_loop(lags))
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - started
+    watcher.cancel()
+    return total / elapsed, max(lags, default=0.0) * 1000
+
+
+async def main(args):
+    seed()
+    limiter.enabled = False
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"bcrypt rounds: {settings.BCRYPT_ROUNDS}, executor: {settings.PASSWORD_HASH_EXECUTOR}, concurrency: {args.concurrency}")
+        print(f"{'workers':>8} {'logins/s':>10} {'max loop lag ms':>16}")
+        for workers in args.workers:
+            shutdown_password_executor()
+            settings.PASSWORD_HASH_WORKERS = workers
+            throughput, lag = await run(client, args.requests, args.concurrency)
+            print(f"{workers:>8} {throughput:>10.1f} {lag:>16.1f}")
+    shutdown_password_executor()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    asyncio.run(main(parser.parse_args()))
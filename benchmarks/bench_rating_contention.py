@@ -0,0 +1,136 @@
+"""
+Many users rating the same movie at once. Each rater submits several scores
+concurrently, so submissions from one user race each other as well as
+everyone else's. Compares the previous read-then-write implementation (select
+the user's rating, then insert or update it) with the single-statement upsert,
+and checks afterwards that there is one row per rater and that the movie's
+aggregates match the ratings table.
+
+Usage:
+    python -m benchmarks.bench_rating_contention --raters 200 --submissions 5 --concurrency 50
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import date
+
+from benchmarks import _env  # noqa: F401  (must run before importing the app)
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app.crud.crud_rating import create_or_update_rating, rating_aggregates_update
+from app.db.models.comment import Comment  # noqa: F401  (needed to configure the Movie mapper)
+from app.db.models.movie import Movie
+from app.db.models.rating import Rating
+from app.db.models.user import User
+from app.db.schemas.rating import RatingCreate, RatingScore
+from app.db.session import AsyncSessionLocal, Base, SessionLocal, engine
+
+
+async def read_then_write_rating(db, rating: RatingCreate, user_id):
+    # Mirrors the old code path: existence check, select, then insert or update.
+    if not await db.get(Movie, rating.movie_id):
+        raise LookupError(rating.movie_id)
+    result = await db.execute(select(Rating).filter(Rating.user_id == user_id, Rating.movie_id == rating.movie_id))
+    db_rating = result.scalars().first()
+    if db_rating:
+        score_delta = rating.score - db_rating.score
+        db_rating.score = rating.score
+        db_rating.review = rating.review
+        await db.execute(rating_aggregates_update(rating.movie_id, score_delta, 0))
+    else:
+        db_rating = Rating(**rating.dict(), user_id=user_id)
+        db.add(db_rating)
+        await db.execute(rating_aggregates_update(rating.movie_id, rating.score, 1))
+    await db.commit()
+    await db.refresh(db_rating)
+    return db_rating
+
+
+def seed(raters: int):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        movie = db.query(Movie).filter(Movie.title == "Contended movie").first()
+        if not movie:
+            movie = Movie(title="Contended movie", description="Everyone rates this one", duration=100, release_date=date(2024, 1, 1))
+            db.add(movie)
+        user_ids = []
+        for i in range(raters):
+            email = f"bench-rater-{i}@example.com"
+            user = db.query(User).filter(User.email == email).first()
+            if not user:
+                user = User(email=email, first_name="Bench", last_name="Rater", hashed_password="x", is_verified=True)
+                db.add(user)
+                db.flush()
+            user_ids.append(user.id)
+        db.commit()
+        return movie.id, user_ids
+    finally:
+        db.close()
+
+
+def reset(movie_id):
+    db = SessionLocal()
+    try:
+        db.execute(delete(Rating).where(Rating.movie_id == movie_id))
+        movie = db.get(Movie, movie_id)
+        movie.rating_count, movie.rating_sum, movie.average_rating = 0, 0, 0.0
+        db.commit()
+    finally:
+        db.close()
+
+
+def check(movie_id):
+    db = SessionLocal()
+    try:
+        rows, raters, total = db.execute(
+            select(func.count(Rating.id), func.count(func.distinct(Rating.user_id)), func.coalesce(func.sum(Rating.score), 0))
+            .where(Rating.movie_id == movie_id)
+        ).one()
+        movie = db.get(Movie, movie_id)
+        consistent = (movie.rating_count, movie.rating_sum) == (rows, total)
+        return rows - raters, consistent
+    finally:
+        db.close()
+
+
+async def run(upsert, movie_id, user_ids, submissions: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    errors = 0
+    jobs = [user_id for user_id in user_ids for _ in range(submissions)]
+    random.Random(0).shuffle(jobs)
+
+    async def one(user_id):
+        nonlocal errors
+        async with semaphore:
+            async with AsyncSessionLocal() as db:
+                try:
+                    await upsert(db, RatingCreate(movie_id=movie_id, score=random.choice(list(RatingScore))), user_id)
+                except (IntegrityError, OperationalError):
+                    errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(user_id) for user_id in jobs))
+    return len(jobs) / (time.perf_counter() - started), errors
+
+
+async def main(args):
+    movie_id, user_ids = seed(args.raters)
+    print(f"{args.raters} raters x {args.submissions} submissions, concurrency {args.concurrency}")
+    print(f"{'implementation':>16} {'ratings/s':>10} {'errors':>7} {'duplicate rows':>15} {'aggregates ok':>14}")
+    for name, upsert in (("read-then-write", read_then_write_rating), ("upsert", create_or_update_rating)):
+        reset(movie_id)
+        throughput, errors = await run(upsert, movie_id, user_ids, args.submissions, args.concurrency)
+        duplicates, consistent = check(movie_id)
+        print(f"{name:>16} {throughput:>10.1f} {errors:>7} {duplicates:>15} {str(consistent):>14}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--raters", type=int, default=200)
+    parser.add_argument("--submissions", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,196 @@
+"""
+Repeatable load scenarios for every router, run against the synthetic dataset
+from `benchmarks.generate_dataset`. Each scenario sends a seeded sequence of
+requests at a fixed concurrency and reports requests per second and the
+p50/p95/p99 latency, so runs before and after a change can be compared.
+
+The dataset is generated first if the database has no users. Set
+BENCH_DATABASE_URL to a file or a local PostgreSQL database to keep it between
+runs. By default the requests go to the app in-process; `--base-url` sends
+them to a running server instead (start it with RATE_LIMIT_ENABLED=false and
+the same SECRET_KEY and database).
+
+Usage:
+    BENCH_DATABASE_URL=sqlite:///bench.db python -m benchmarks.bench_scenarios --requests 1000 --concurrency 20
+    python -m benchmarks.bench_scenarios --scenarios movies_search rating_write --output before.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from typing import Callable, Dict, List
+
+from benchmarks import _env  # noqa: F401  (must run before importing the app)
+
+import httpx
+from sqlalchemy import func, select
+
+from app.core.security import create_access_token
+from app.db.models.comment import Comment
+from app.db.models.movie import Movie
+from app.db.models.user import User
+from app.db.schemas.movie import SortByEnum
+from app.db.session import Base, engine
+from app.main import app
+from app.utils.rate_limiter import limiter
+from benchmarks.generate_dataset import MOVIE, WORDS, add_size_arguments, generate, row_id, size_from_args, user_email
+
+PAGE_SIZE = 20
+
+
+class Targets:
+    """Ids and tokens the scenarios draw their requests from."""
+
+    def __init__(self, users: int, movies: int, comment_roots: list, tokens: list):
+        self.users = users
+        self.movies = movies
+        self.comment_roots = comment_roots
+        self.tokens = tokens
+
+    def movie(self, rng: random.Random) -> str:
+        return str(row_id(MOVIE, rng.randrange(self.movies)))
+
+    def auth(self, rng: random.Random) -> dict:
+        return {"Authorization": f"Bearer {rng.choice(self.tokens)}"}
+
+
+def count_rows(model) -> int:
+    with engine.connect() as connection:
+        return connection.execute(select(func.count()).select_from(model.__table__)).scalar_one()
+
+
+def load_targets(args) -> Targets:
+    Base.metadata.create_all(bind=engine)
+    if not count_rows(User):
+        print("Generating the dataset...")
+        generate(engine, size_from_args(args), args.seed)
+    users, movies = count_rows(User), count_rows(Movie)
+    with engine.connect() as connection:
+        # Thread roots with replies, busiest first.
+        roots = connection.execute(
+            select(Comment.parent_comment_id)
+            .where(Comment.parent_comment_id != None)
+            .group_by(Comment.parent_comment_id)
+            .order_by(func.count().desc())
+            .limit(1000)
+        ).scalars().all()
+    rng = random.Random(args.seed)
+    tokens = [create_access_token({"sub": user_email(rng.randrange(users))}) for _ in range(min(users, 200))]
+    return Targets(users, movies, [str(root) for root in roots], tokens)
+
+
+def movies_list(rng: random.Random, targets: Targets) -> dict:
+    return {"method": "GET", "url": "/movies/", "params": {"skip": rng.randrange(0, 500), "limit": PAGE_SIZE}}
+
+
+def movies_search(rng: random.Random, targets: Targets) -> dict:
+    return {"method": "GET", "url": "/movies/", "params": {"search": rng.choice(WORDS), "limit": PAGE_SIZE}}
+
+
+def movies_sorted(rng: random.Random, targets: Targets) -> dict:
+    return {"method": "GET", "url": "/movies/", "params": {"sort_by": rng.choice(list(SortByEnum)).value, "limit": PAGE_SIZE}}
+
+
+def movie_detail(rng: random.Random, targets: Targets) -> dict:
+    return {"method": "GET", "url": f"/movies/{targets.movie(rng)}"}
+
+
+def ratings_list(rng: random.Random, targets: Targets) -> dict:
+    return {"method": "GET", "url": f"/ratings/{targets.movie(rng)}", "params": {"limit": PAGE_SIZE}}
+
+
+def rating_write(rng: random.Random, targets: Targets) -> dict:
+    return {"method": "POST", "url": "/ratings/", "json": {"movie_id": targets.movie(rng), "score": rng.randint(1, 5)}, "headers": targets.auth(rng)}
+
+
+def comments_list(rng: random.Random, targets: Targets) -> dict:
+    return {"method": "GET", "url": f"/comments/{targets.movie(rng)}", "params": {"limit": PAGE_SIZE}}
+
+
+def comment_thread(rng: random.Random, targets: Targets) -> dict:
+    return {"method": "GET", "url": f"/comments/{rng.choice(targets.comment_roots)}/thread"}
+
+
+def comment_write(rng: random.Random, targets: Targets) -> dict:
+    parent = rng.choice(targets.comment_roots)
+    return {"method": "POST", "url": "/comments/nested", "json": {"content": "Benchmark reply", "parent_comment_id": parent}, "headers": targets.auth(rng)}
+
+
+SCENARIOS: Dict[str, Callable[[random.Random, Targets], dict]] = {
+    scenario.__name__: scenario
+    for scenario in (movies_list, movies_search, movies_sorted, movie_detail, ratings_list, rating_write, comments_list, comment_thread, comment_write)
+}
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    # Nearest-rank percentile of an already sorted list.
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+async def run(client: httpx.AsyncClient, requests: List[dict], concurrency: int):
+    latencies, errors = [], 0
+    pending = iter(requests)
+
+    async def worker():
+        nonlocal errors
+        for request in pending:
+            started = time.perf_counter()
+            response = await client.request(**request)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+async def main(args):
+    targets = load_targets(args)
+    if not targets.comment_roots:
+        args.scenarios = [name for name in args.scenarios if name not in ("comment_thread", "comment_write")]
+    limiter.enabled = False
+
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+    else:
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+
+    results = {}
+    async with client:
+        print(f"{targets.users} users, {targets.movies} movies; {args.requests} requests per scenario at concurrency {args.concurrency}")
+        print(f"{'scenario':>15} {'requests/s':>11} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7}")
+        for name in args.scenarios:
+            # Every scenario has its own seeded sequence, so it is the same whatever else runs.
+            rng = random.Random(f"{args.seed}:{name}")
+            requests = [SCENARIOS[name](rng, targets) for _ in range(args.warmup + args.requests)]
+            await run(client, requests[:args.warmup], args.concurrency)
+            latencies, errors, elapsed = await run(client, requests[args.warmup:], args.concurrency)
+            latencies.sort()
+            result = results[name] = {
+                "requests_per_second": len(latencies) / elapsed,
+                "p50_ms": percentile(latencies, 50) * 1000,
+                "p95_ms": percentile(latencies, 95) * 1000,
+                "p99_ms": percentile(latencies, 99) * 1000,
+                "max_ms": latencies[-1] * 1000,
+                "errors": errors,
+            }
+            print(f"{name:>15} {result['requests_per_second']:>11.1f} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} {result['p99_ms']:>8.1f} {result['max_ms']:>8.1f} {errors:>7}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"requests": args.requests, "concurrency": args.concurrency, "seed": args.seed, "scenarios": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--base-url", help="send the requests to a running server instead of the app in-process")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    add_size_arguments(parser)
+    asyncio.run(main(parser.parse_args()))
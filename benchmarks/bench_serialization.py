@@ -0,0 +1,78 @@
+"""
+Cost of turning a page of Movie rows into the JSON body of the movie listing
+response: the previous path (per-item `from_orm`, a `PaginatedResponse`
+envelope, FastAPI's response_model validation and serialisation, stdlib JSON)
+versus the single-pass path (precompiled TypeAdapter plus orjson envelope).
+
+Usage:
+    python -m benchmarks.bench_serialization --sizes 100 1000 10000 --repeat 20
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from datetime import date, datetime
+
+from benchmarks import _env  # noqa: F401  (must run before importing the app)
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.db.models.movie import Movie
+from app.db.schemas.movie import MovieResponse, PaginatedResponse, movie_list_adapter
+from app.main import app  # noqa: F401  (configures every mapper)
+from app.utils.responses import envelope_response
+
+RESPONSE_FIELD = create_response_field(name="Response_list_movies", type_=PaginatedResponse)
+
+
+def make_movies(count: int) -> list:
+    owner_id = uuid.uuid4()
+    now = datetime.utcnow()
+    return [
+        Movie(
+            id=uuid.uuid4(), title=f"Movie {i}", description=f"Synthetic description number {i}",
+            duration=90 + i % 60, release_date=date(2000, 1, 1), poster_url=f"https://example.com/{i}.jpg",
+            owner_id=owner_id, created_at=now, updated_at=now,
+        )
+        for i in range(count)
+    ]
+
+
+async def previous_path(movies: list) -> bytes:
+    data = [MovieResponse.from_orm(movie) for movie in movies]
+    envelope = PaginatedResponse(success=True, status_code=200, message="Movies retrieved successfully", data=data, next_cursor="cursor")
+    content = await serialize_response(field=RESPONSE_FIELD, response_content=envelope, is_coroutine=True)
+    return JSONResponse(content).body
+
+
+async def single_pass_path(movies: list) -> bytes:
+    data = movie_list_adapter.validate_python(movies, from_attributes=True)
+    return envelope_response(200, "Movies retrieved successfully", data, movie_list_adapter, next_cursor="cursor").body
+
+
+async def timed(path, movies: list, repeat: int) -> float:
+    await path(movies)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        await path(movies)
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+async def main(args):
+    print(f"{'movies':>8} {'previous ms':>12} {'single-pass ms':>15} {'speedup':>8}")
+    for size in args.sizes:
+        movies = make_movies(size)
+        assert json.loads(await previous_path(movies)) == json.loads(await single_pass_path(movies))
+        before = await timed(previous_path, movies, args.repeat)
+        after = await timed(single_pass_path, movies, args.repeat)
+        print(f"{size:>8} {before:>12.2f} {after:>15.2f} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,90 @@
+"""
+A trending movie: bursts of identical `GET /movies/{id}` and
+`GET /ratings/{movie_id}` requests that all miss the movie cache at once.
+Runs every burst with request coalescing off and on, and reports the SQL
+statements the burst cost along with its throughput.
+
+Usage:
+    python -m benchmarks.bench_thundering_herd --requests 500 --bursts 5 --ratings 50
+"""
+import argparse
+import asyncio
+import time
+from datetime import date
+
+from benchmarks import _env  # noqa: F401  (must run before importing the app)
+
+import httpx
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.db.models.comment import Comment  # noqa: F401  (needed to configure the Movie mapper)
+from app.db.models.movie import Movie
+from app.db.models.rating import Rating
+from app.db.models.user import User
+from app.db.session import Base, SessionLocal, async_engine, engine
+from app.main import app
+from app.utils.cache import movie_cache
+from app.utils.rate_limiter import limiter
+
+
+def seed(ratings: int):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        movie = db.query(Movie).filter(Movie.title == "Trending movie").first()
+        if movie:
+            return movie.id
+        owner = User(email="bench-herd-owner@example.com", first_name="Bench", last_name="Owner", hashed_password="x", is_verified=True)
+        db.add(owner)
+        db.flush()
+        movie = Movie(title="Trending movie", description="Everyone is looking at it", duration=110, release_date=date(2024, 1, 1), owner_id=owner.id)
+        db.add(movie)
+        db.flush()
+        for i in range(ratings):
+            rater = User(email=f"bench-herd-{i}@example.com", first_name="Bench", last_name="Rater", hashed_password="x", is_verified=True)
+            db.add(rater)
+            db.flush()
+            db.add(Rating(movie_id=movie.id, user_id=rater.id, score=i % 5 + 1))
+        db.commit()
+        return movie.id
+    finally:
+        db.close()
+
+
+async def burst(client: httpx.AsyncClient, movie_id, requests: int):
+    # Empty the movie cache so that every request of the burst misses it together.
+    movie_cache.entries.clear()
+    paths = [f"/movies/{movie_id}", f"/ratings/{movie_id}"]
+    responses = await asyncio.gather(*(client.get(paths[i % 2]) for i in range(requests)))
+    for response in responses:
+        response.raise_for_status()
+
+
+async def main(args):
+    movie_id = seed(args.ratings)
+    limiter.enabled = False
+    statements = []
+    event.listen(async_engine.sync_engine, "before_cursor_execute", lambda *a: statements.append(1))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"{args.bursts} bursts of {args.requests} concurrent requests")
+        print(f"{'coalescing':>10} {'requests/s':>11} {'statements':>11} {'per request':>12}")
+        for enabled in (False, True):
+            settings.SINGLE_FLIGHT_ENABLED = enabled
+            statements.clear()
+            started = time.perf_counter()
+            for _ in range(args.bursts):
+                await burst(client, movie_id, args.requests)
+            elapsed = time.perf_counter() - started
+            total = args.bursts * args.requests
+            print(f"{'on' if enabled else 'off':>10} {total / elapsed:>11.1f} {len(statements):>11} {len(statements) / total:>12.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--bursts", type=int, default=5)
+    parser.add_argument("--ratings", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,263 @@
+"""
+Seeded synthetic dataset for load tests: users, movies, ratings and nested
+comment threads, bulk-loaded with COPY on PostgreSQL (psycopg2) and
+executemany everywhere else.
+
+The same seed and sizes always produce the same rows. Ids are derived from
+each row's position, so scenarios can address users, movies and comments
+without reading them back. Ratings and comments per movie follow a long-tailed
+distribution around the requested mean, which leaves a few movies with very
+busy rating lists and comment threads. The movie rating aggregates
+(`rating_count`, `rating_sum`, `average_rating`) are filled in to match.
+
+Every generated user has the password `password123`.
+
+Usage:
+    BENCH_DATABASE_URL=sqlite:///bench.db python -m benchmarks.generate_dataset --users 1000000 --movies 200000 --ratings-per-movie 25 --comments-per-movie 8
+"""
+import argparse
+import csv
+import io
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+from benchmarks import _env  # noqa: F401  (must run before importing the app)
+
+from sqlalchemy import Table, func, select
+from sqlalchemy.engine import Connection, Engine
+
+from app.core.security import get_password_hash
+from app.db.models.comment import Comment
+from app.db.models.movie import Movie
+from app.db.models.rating import Rating
+from app.db.models.user import User
+from app.db.session import Base, engine
+
+PASSWORD = "password123"
+
+WORDS = [
+    "midnight", "river", "empire", "shadow", "garden", "stranger", "winter", "harbor", "machine", "silence",
+    "thunder", "orchard", "signal", "paper", "desert", "mirror", "glass", "lantern", "frontier", "echo",
+    "velvet", "comet", "island", "harvest", "circus", "canyon", "ember", "voyage", "cathedral", "falcon",
+    "tide", "marble", "whisper", "station", "crown", "summer", "labyrinth", "beacon", "horizon", "meadow",
+]
+
+# Row ids are UUIDs built from the row's kind and position; see `row_id`.
+USER, MOVIE, RATING, COMMENT = 1, 2, 3, 4
+# SQLite gives a UUID column numeric affinity, so an id whose hex is all digits
+# would be stored as a (lossy) number. The prefix keeps every id a string.
+ID_PREFIX = 0xbe7c << 112
+
+EPOCH = datetime(2015, 1, 1)
+
+
+def row_id(kind: int, index: int) -> uuid.UUID:
+    return uuid.UUID(int=ID_PREFIX | (kind << 96) | index, version=4)
+
+
+def user_email(index: int) -> str:
+    return f"user{index}@bench.example.com"
+
+
+@dataclass
+class DatasetSize:
+    users: int
+    movies: int
+    ratings_per_movie: float
+    comments_per_movie: float
+    max_depth: int
+
+
+def long_tail(rng: random.Random, mean: float) -> int:
+    # A Pareto(1.5) variate has mean 3; scale it to the requested mean.
+    return int(mean * rng.paretovariate(1.5) / 3)
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def copy_rows(connection: Connection, table: Table, rows: list):
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        # An unquoted empty field is NULL in COPY's CSV format.
+        writer.writerow("" if row[column] is None else row[column] for column in columns)
+    buffer.seek(0)
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+
+
+class BulkLoader:
+    """Buffers rows per table and writes them in batches, one transaction per batch."""
+
+    def __init__(self, engine: Engine, batch_size: int):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.use_copy = engine.dialect.driver == "psycopg2"
+        self.counts = {}
+
+    def write(self, table: Table, rows: list):
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start:start + self.batch_size]
+            with self.engine.begin() as connection:
+                if self.use_copy:
+                    copy_rows(connection, table, batch)
+                else:
+                    connection.execute(table.insert(), batch)
+            self.counts[table.name] = self.counts.get(table.name, 0) + len(batch)
+
+
+def user_rows(start: int, stop: int, hashed_password: str, rng: random.Random):
+    for index in range(start, stop):
+        created_at = EPOCH + timedelta(minutes=index)
+        yield {
+            "id": row_id(USER, index),
+            "email": user_email(index),
+            "first_name": rng.choice(WORDS).capitalize(),
+            "last_name": rng.choice(WORDS).capitalize(),
+            "hashed_password": hashed_password,
+            "is_verified": True,
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+
+
+def movie_rows(index: int, size: DatasetSize, rng: random.Random, counters: dict):
+    """The movie at `index` together with its ratings and comments."""
+    movie_id = row_id(MOVIE, index)
+    created_at = EPOCH + timedelta(minutes=index * 7)
+
+    ratings = []
+    raters = rng.sample(range(size.users), min(size.users, long_tail(rng, size.ratings_per_movie)))
+    for user_index in raters:
+        rated_at = created_at + timedelta(minutes=rng.randrange(1, 60 * 24 * 365))
+        ratings.append({
+            "id": row_id(RATING, counters["ratings"]),
+            "score": rng.choices((1, 2, 3, 4, 5), weights=(1, 2, 4, 6, 4))[0],
+            "previous_score": None,
+            "review": sentence(rng, 10) if rng.random() < 0.3 else None,
+            "movie_id": movie_id,
+            "user_id": row_id(USER, user_index),
+            "created_at": rated_at,
+            "updated_at": rated_at,
+        })
+        counters["ratings"] += 1
+
+    comments = []
+    # (id, path, depth, created_at) of the movie's comments, to pick reply parents from.
+    thread = []
+    for _ in range(long_tail(rng, size.comments_per_movie)):
+        comment_id = row_id(COMMENT, counters["comments"])
+        counters["comments"] += 1
+        parents = [entry for entry in thread if entry[2] < size.max_depth]
+        if parents and rng.random() < 0.6:
+            parent_id, parent_path, depth, parent_created_at = rng.choice(parents)
+            commented_at = parent_created_at + timedelta(minutes=rng.randrange(1, 60 * 24 * 7))
+            path, depth = parent_path + comment_id.hex, depth + 1
+            movie = None
+        else:
+            parent_id, path, depth = None, comment_id.hex, 0
+            commented_at = created_at + timedelta(minutes=rng.randrange(1, 60 * 24 * 365))
+            movie = movie_id
+        thread.append((comment_id, path, depth, commented_at))
+        comments.append({
+            "id": comment_id,
+            "content": sentence(rng, rng.randrange(4, 30)),
+            # Replies are attached to their parent only, as the API stores them.
+            "movie_id": movie,
+            "parent_comment_id": parent_id,
+            "path": path,
+            "user_id": row_id(USER, rng.randrange(size.users)),
+            "created_at": commented_at,
+            "updated_at": commented_at,
+        })
+
+    rating_sum = sum(rating["score"] for rating in ratings)
+    movie = {
+        "id": movie_id,
+        "title": f"{sentence(rng, rng.randrange(1, 4))} {index}",
+        "description": sentence(rng, rng.randrange(12, 40)),
+        "duration": rng.randrange(70, 200),
+        "release_date": date(1960, 1, 1) + timedelta(days=rng.randrange(365 * 65)),
+        "poster_url": f"https://example.com/posters/{index}.jpg",
+        "owner_id": row_id(USER, rng.randrange(size.users)),
+        "rating_count": len(ratings),
+        "rating_sum": rating_sum,
+        "average_rating": rating_sum / len(ratings) if ratings else 0,
+        "deleted_at": None,
+        "created_at": created_at,
+        "updated_at": created_at,
+    }
+    return movie, ratings, comments
+
+
+def generate(engine: Engine, size: DatasetSize, seed: int = 42, batch_size: int = 5000, reset: bool = False) -> dict:
+    """Load the dataset into an empty database (or an emptied one with `reset`); returns rows written per table."""
+    if reset:
+        Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as connection:
+        if connection.execute(select(func.count()).select_from(User.__table__)).scalar_one():
+            raise SystemExit("The database already has users; pass --reset to replace them.")
+
+    rng = random.Random(seed)
+    loader = BulkLoader(engine, batch_size)
+    hashed_password = get_password_hash(PASSWORD)
+    for start in range(0, size.users, batch_size):
+        loader.write(User.__table__, list(user_rows(start, min(start + batch_size, size.users), hashed_password, rng)))
+
+    counters = {"ratings": 0, "comments": 0}
+    for start in range(0, size.movies, batch_size):
+        movies, ratings, comments = [], [], []
+        for index in range(start, min(start + batch_size, size.movies)):
+            movie, movie_ratings, movie_comments = movie_rows(index, size, rng, counters)
+            movies.append(movie)
+            ratings.extend(movie_ratings)
+            comments.extend(movie_comments)
+        # Movies first, and parents before replies, to satisfy the foreign keys.
+        loader.write(Movie.__table__, movies)
+        if ratings:
+            loader.write(Rating.__table__, ratings)
+        if comments:
+            loader.write(Comment.__table__, comments)
+    return loader.counts
+
+
+def add_size_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--movies", type=int, default=5000)
+    parser.add_argument("--ratings-per-movie", type=float, default=20)
+    parser.add_argument("--comments-per-movie", type=float, default=10)
+    parser.add_argument("--max-depth", type=int, default=4, help="deepest reply level of a comment thread")
+    parser.add_argument("--seed", type=int, default=42)
+
+
+def size_from_args(args) -> DatasetSize:
+    return DatasetSize(args.users, args.movies, args.ratings_per_movie, args.comments_per_movie, args.max_depth)
+
+
+def main(args):
+    print(f"Loading into {engine.url.render_as_string(hide_password=True)} using {'COPY' if engine.dialect.driver == 'psycopg2' else 'executemany'}")
+    started = time.perf_counter()
+    counts = generate(engine, size_from_args(args), args.seed, args.batch_size, args.reset)
+    elapsed = time.perf_counter() - started
+    for table, count in counts.items():
+        print(f"{table:>10} {count:>12}")
+    total = sum(counts.values())
+    print(f"{total} rows in {elapsed:.1f}s ({total / elapsed:.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_size_arguments(parser)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--reset", action="store_true", help="drop and recreate the tables first")
+    main(parser.parse_args())
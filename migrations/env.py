@@ -0,0 +1,30 @@
+from alembic import context
+from sqlalchemy import create_engine, pool
+
+from app.db.session import SQLALCHEMY_DATABASE_URL, Base
+from app.db.models import comment, email_outbox, movie, rating, user  # noqa: F401  (register the tables on Base.metadata)
+
+config = context.config
+url = config.get_main_option("sqlalchemy.url") or SQLALCHEMY_DATABASE_URL
+target_metadata = Base.metadata
+
+
+def run_migrations_offline():
+    context.configure(url=url, target_metadata=target_metadata, literal_binds=True, render_as_batch=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    # A plain engine: on SQLite, foreign keys stay off while batch operations copy tables.
+    connectable = create_engine(url, poolclass=pool.NullPool)
+    with connectable.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,87 @@
+"""Baseline: the schema created by create_all before migrations were added
+
+A database created by an earlier version of the app already has these tables;
+mark it as being at this revision with `alembic stamp 0001` and then run
+`alembic upgrade head`.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 09:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def timestamps():
+    return [
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    ]
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", UUID(as_uuid=True), primary_key=True),
+        sa.Column("email", sa.String()),
+        sa.Column("first_name", sa.String(), nullable=False),
+        sa.Column("last_name", sa.String(), nullable=False),
+        sa.Column("hashed_password", sa.String()),
+        sa.Column("is_verified", sa.Boolean()),
+        sa.Column("verification_token", sa.String(), nullable=True),
+        sa.Column("verification_token_expiry", sa.DateTime(), nullable=True),
+        *timestamps(),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "movies",
+        sa.Column("id", UUID(as_uuid=True), primary_key=True),
+        sa.Column("title", sa.String()),
+        sa.Column("description", sa.String(), nullable=False),
+        sa.Column("duration", sa.Integer(), nullable=False),
+        sa.Column("release_date", sa.Date(), nullable=False),
+        sa.Column("poster_url", sa.String()),
+        sa.Column("owner_id", UUID(as_uuid=True), sa.ForeignKey("users.id")),
+        *timestamps(),
+        sa.UniqueConstraint("title", "release_date", name="_title_release_date_uc"),
+    )
+    op.create_index("ix_movies_id", "movies", ["id"])
+    op.create_index("ix_movies_title", "movies", ["title"])
+
+    op.create_table(
+        "ratings",
+        sa.Column("id", UUID(as_uuid=True), primary_key=True),
+        sa.Column("score", sa.Integer(), nullable=False),
+        sa.Column("review", sa.String(length=2000), nullable=True),
+        sa.Column("movie_id", UUID(as_uuid=True), sa.ForeignKey("movies.id"), nullable=False),
+        sa.Column("user_id", UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+        *timestamps(),
+    )
+    op.create_index("ix_ratings_id", "ratings", ["id"])
+
+    op.create_table(
+        "comments",
+        sa.Column("id", UUID(as_uuid=True), primary_key=True),
+        sa.Column("content", sa.String(length=1000)),
+        sa.Column("movie_id", UUID(as_uuid=True), sa.ForeignKey("movies.id"), nullable=True),
+        sa.Column("parent_comment_id", UUID(as_uuid=True), sa.ForeignKey("comments.id"), nullable=True),
+        sa.Column("user_id", UUID(as_uuid=True), sa.ForeignKey("users.id")),
+        *timestamps(),
+    )
+    op.create_index("ix_comments_id", "comments", ["id"])
+    op.create_index("ix_comments_content", "comments", ["content"])
+
+
+def downgrade():
+    op.drop_table("comments")
+    op.drop_table("ratings")
+    op.drop_table("movies")
+    op.drop_table("users")
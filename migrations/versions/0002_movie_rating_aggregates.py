@@ -0,0 +1,51 @@
+"""Add the rating aggregates to movies and fill them in from ratings
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:05:00
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+# The same average as the write path and `rebuild_rating_aggregates` compute.
+BACKFILL_AGGREGATES = """
+    UPDATE movies SET
+        rating_count = (SELECT count(*) FROM ratings WHERE ratings.movie_id = movies.id),
+        rating_sum = (SELECT coalesce(sum(score), 0) FROM ratings WHERE ratings.movie_id = movies.id),
+        average_rating = coalesce(
+            (SELECT CAST(sum(score) AS FLOAT) / nullif(count(*), 0) FROM ratings WHERE ratings.movie_id = movies.id), 0
+        )
+"""
+
+
+def keep_uuid_type(inspector, table, column_info):
+    # SQLite reflects a UUID column as NUMERIC; restored, the copied table keeps its declared type.
+    if column_info["name"] == "id" or column_info["name"].endswith("_id"):
+        column_info["type"] = UUID(as_uuid=True)
+
+
+COPY_REFLECT_KWARGS = {"listeners": [("column_reflect", keep_uuid_type)]}
+
+
+def upgrade():
+    op.add_column("movies", sa.Column("rating_count", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column("movies", sa.Column("rating_sum", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column("movies", sa.Column("average_rating", sa.Float(), nullable=False, server_default="0"))
+    op.execute(BACKFILL_AGGREGATES)
+    op.create_index("ix_movies_average_rating_id", "movies", ["average_rating", "id"])
+    op.create_index("ix_movies_average_rating_release_date_id", "movies", ["average_rating", "release_date", "id"])
+
+
+def downgrade():
+    op.drop_index("ix_movies_average_rating_release_date_id", table_name="movies")
+    op.drop_index("ix_movies_average_rating_id", table_name="movies")
+    with op.batch_alter_table("movies", reflect_kwargs=COPY_REFLECT_KWARGS) as batch:
+        batch.drop_column("average_rating")
+        batch.drop_column("rating_sum")
+        batch.drop_column("rating_count")
@@ -0,0 +1,47 @@
+"""Add materialized paths to comments and fill them in from parent_comment_id
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 09:10:00
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+# A comment's 32-character hex id; PostgreSQL renders a uuid with dashes, SQLite stores the bare hex.
+ID_HEX = "replace(CAST(id AS TEXT), '-', '')"
+
+
+def keep_uuid_type(inspector, table, column_info):
+    # SQLite reflects a UUID column as NUMERIC; restored, the copied table keeps its declared type.
+    if column_info["name"] == "id" or column_info["name"].endswith("_id"):
+        column_info["type"] = UUID(as_uuid=True)
+
+
+COPY_REFLECT_KWARGS = {"listeners": [("column_reflect", keep_uuid_type)]}
+
+
+def upgrade():
+    op.add_column("comments", sa.Column("path", sa.String(), nullable=True))
+    bind = op.get_bind()
+    bind.exec_driver_sql(f"UPDATE comments SET path = {ID_HEX} WHERE parent_comment_id IS NULL")
+    # One thread level per pass: replies whose parent already has its path.
+    while bind.exec_driver_sql(f"""
+        UPDATE comments SET path = (SELECT parent.path FROM comments AS parent WHERE parent.id = comments.parent_comment_id) || {ID_HEX}
+        WHERE path IS NULL AND parent_comment_id IN (SELECT id FROM comments WHERE path IS NOT NULL)
+    """).rowcount:
+        pass
+    with op.batch_alter_table("comments", reflect_kwargs=COPY_REFLECT_KWARGS) as batch:
+        batch.alter_column("path", existing_type=sa.String(), nullable=False)
+    op.create_index("ix_comments_path", "comments", ["path"])
+
+
+def downgrade():
+    op.drop_index("ix_comments_path", table_name="comments")
+    with op.batch_alter_table("comments", reflect_kwargs=COPY_REFLECT_KWARGS) as batch:
+        batch.drop_column("path")
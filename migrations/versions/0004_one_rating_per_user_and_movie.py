@@ -0,0 +1,60 @@
+"""Keep one rating per user and movie, then enforce it with a unique constraint
+
+Earlier versions inserted a new row for every submission, so an existing
+database can hold several ratings by one user for one movie. The newest of
+them is kept, as the rating upsert would have replaced the older ones, and the
+movie rating aggregates are recomputed from what remains.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 09:15:00
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+DELETE_SUPERSEDED_RATINGS = """
+    DELETE FROM ratings WHERE EXISTS (
+        SELECT 1 FROM ratings AS newer
+        WHERE newer.user_id = ratings.user_id AND newer.movie_id = ratings.movie_id
+        AND (newer.updated_at > ratings.updated_at OR (newer.updated_at = ratings.updated_at AND newer.id > ratings.id))
+    )
+"""
+
+# As in 0002.
+BACKFILL_AGGREGATES = """
+    UPDATE movies SET
+        rating_count = (SELECT count(*) FROM ratings WHERE ratings.movie_id = movies.id),
+        rating_sum = (SELECT coalesce(sum(score), 0) FROM ratings WHERE ratings.movie_id = movies.id),
+        average_rating = coalesce(
+            (SELECT CAST(sum(score) AS FLOAT) / nullif(count(*), 0) FROM ratings WHERE ratings.movie_id = movies.id), 0
+        )
+"""
+
+
+def keep_uuid_type(inspector, table, column_info):
+    # SQLite reflects a UUID column as NUMERIC; restored, the copied table keeps its declared type.
+    if column_info["name"] == "id" or column_info["name"].endswith("_id"):
+        column_info["type"] = UUID(as_uuid=True)
+
+
+COPY_REFLECT_KWARGS = {"listeners": [("column_reflect", keep_uuid_type)]}
+
+
+def upgrade():
+    op.execute(DELETE_SUPERSEDED_RATINGS)
+    op.execute(BACKFILL_AGGREGATES)
+    with op.batch_alter_table("ratings", reflect_kwargs=COPY_REFLECT_KWARGS) as batch:
+        batch.add_column(sa.Column("previous_score", sa.Integer(), nullable=True))
+        batch.create_unique_constraint("_user_movie_rating_uc", ["user_id", "movie_id"])
+
+
+def downgrade():
+    with op.batch_alter_table("ratings", reflect_kwargs=COPY_REFLECT_KWARGS) as batch:
+        batch.drop_constraint("_user_movie_rating_uc", type_="unique")
+        batch.drop_column("previous_score")
@@ -0,0 +1,58 @@
+"""Cascade movie deletes to ratings and comment threads, and add soft deletes
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 09:20:00
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+# Names the foreign keys SQLite reflects without one, so they can be dropped.
+NAMING_CONVENTION = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+
+# (table, column, referred table)
+CASCADED_FOREIGN_KEYS = [
+    ("ratings", "movie_id", "movies"),
+    ("comments", "movie_id", "movies"),
+    ("comments", "parent_comment_id", "comments"),
+]
+
+
+def keep_uuid_type(inspector, table, column_info):
+    # SQLite reflects a UUID column as NUMERIC; restored, the copied table keeps its declared type.
+    if column_info["name"] == "id" or column_info["name"].endswith("_id"):
+        column_info["type"] = UUID(as_uuid=True)
+
+
+def foreign_key_name(table: str, column: str, referred_table: str) -> str:
+    for foreign_key in sa.inspect(op.get_bind()).get_foreign_keys(table):
+        if foreign_key["constrained_columns"] == [column] and foreign_key["name"]:
+            return foreign_key["name"]
+    return NAMING_CONVENTION["fk"] % {"table_name": table, "column_0_name": column, "referred_table_name": referred_table}
+
+
+def replace_foreign_keys(ondelete):
+    for table in ("ratings", "comments"):
+        foreign_keys = [(column, referred) for name, column, referred in CASCADED_FOREIGN_KEYS if name == table]
+        names = [foreign_key_name(table, column, referred) for column, referred in foreign_keys]
+        with op.batch_alter_table(table, naming_convention=NAMING_CONVENTION, reflect_kwargs={"listeners": [("column_reflect", keep_uuid_type)]}) as batch:
+            for name, (column, referred) in zip(names, foreign_keys):
+                batch.drop_constraint(name, type_="foreignkey")
+                batch.create_foreign_key(name, referred, [column], ["id"], ondelete=ondelete)
+
+
+def upgrade():
+    op.add_column("movies", sa.Column("deleted_at", sa.DateTime(), nullable=True))
+    replace_foreign_keys("CASCADE")
+
+
+def downgrade():
+    replace_foreign_keys(None)
+    with op.batch_alter_table("movies") as batch:
+        batch.drop_column("deleted_at")
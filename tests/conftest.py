@@ -1,10 +1,12 @@
+from contextlib import contextmanager
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import text
+from sqlalchemy import event, text
 from sqlalchemy.orm import sessionmaker
 from app.main import app
+from app.utils.rate_limiter import limiter
 from app.db.models.user import Base
-from app.db.session import get_db, engine
+from app.db.session import async_engine, get_db, engine
 
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -27,13 +29,37 @@ def client():
 @pytest.fixture(scope="function", autouse=True)
 def reset_db():
     with engine.connect() as conn:
-        conn.execute(text("DELETE FROM users"))
-        conn.execute(text("DELETE FROM movies"))
-        conn.execute(text("DELETE FROM comments"))
         conn.execute(text("DELETE FROM ratings"))
+        conn.execute(text("DELETE FROM comments"))
+        conn.execute(text("DELETE FROM movies"))
+        conn.execute(text("DELETE FROM users"))
+        conn.execute(text("DELETE FROM email_outbox"))
         conn.commit()
+    # Rate limit counters would otherwise carry over from earlier tests.
+    limiter.reset()
     yield
 
 @pytest.fixture(scope="module")
 def db():
-    return TestingSessionLocal()
\ No newline at end of file
+    return TestingSessionLocal()
+
+@contextmanager
+def _count_queries():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        # The email worker shares the engine; its polling is not part of the request.
+        if "email_outbox" not in statement:
+            statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+
+@pytest.fixture
+def count_queries():
+    """Context manager collecting the SQL statements the app sends to the database inside its block."""
+    return _count_queries
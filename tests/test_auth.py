@@ -1,7 +1,12 @@
 import pytest
 from sqlalchemy.orm import Session
 from app.db.schemas.user import UserCreate
-from app.services.auth import register_user
+from passlib.context import CryptContext
+from app.core.config import settings
+from app.db.pool import get_pool_telemetry
+from app.services import auth as auth_service
+from app.services.auth import register_user, user_cache
+from app.utils.cache import RedisCache
 from fastapi import status
 from datetime import datetime
 
@@ -43,6 +48,35 @@ def test_login_user(client, db: Session):
     assert "created_at" in data["data"]["user"]
 
 
+def test_login_verifies_once_and_rehashes_on_cost_change(client, db: Session, monkeypatch):
+    user_data = {
+        "email": "rehash@example.com",
+        "password": "password123",
+        "first_name": "John",
+        "last_name": "Doe"
+    }
+    user = register_user(UserCreate(**user_data), db)
+    user.hashed_password = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash(user_data["password"])
+    db.commit()
+
+    calls = []
+    verify = auth_service.verify_password_async
+
+    async def counting_verify(plain_password, hashed_password):
+        calls.append(hashed_password)
+        return await verify(plain_password, hashed_password)
+
+    monkeypatch.setattr(auth_service, "verify_password_async", counting_verify)
+    response = client.post("/auth/login", json={"email": user_data["email"], "password": user_data["password"]})
+    assert response.status_code == 200
+    assert len(calls) == 1
+
+    db.refresh(user)
+    assert user.hashed_password.startswith(f"$2b${settings.BCRYPT_ROUNDS:02d}$")
+    response = client.post("/auth/login", json={"email": user_data["email"], "password": user_data["password"]})
+    assert response.status_code == 200
+
+
 def test_login_with_invalid_credentials(client, db: Session):
     user_data = {
         "email": "test@example.com",
@@ -95,6 +129,47 @@ def test_verify_user_email(client, db: Session):
     assert user.verification_token is None
 
 
+def test_cached_current_user_invalidated_on_verification(client, db: Session, monkeypatch):
+    monkeypatch.setattr(settings, "AUTH_USER_CACHE_ENABLED", True)
+    user_data = {
+        "email": "cached@example.com",
+        "password": "password123",
+        "first_name": "Jane",
+        "last_name": "Doe"
+    }
+    user = register_user(UserCreate(**user_data), db)
+    response = client.post("/auth/login/token", data={"username": user_data["email"], "password": user_data["password"]})
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    hits = user_cache.hits
+    assert client.get("/users/me", headers=headers).json()["data"]["is_verified"] is False
+    checkouts = get_pool_telemetry("async").checkouts
+    response = client.get("/users/me", headers=headers)
+    assert response.json()["data"]["email"] == user_data["email"]
+    assert user_cache.hits == hits + 1
+    # A request answered from the cache never takes a connection from the pool.
+    assert get_pool_telemetry("async").checkouts == checkouts
+
+    client.get(f"/auth/verify-email?token={user.verification_token}")
+    assert client.get("/users/me", headers=headers).json()["data"]["is_verified"] is True
+
+
+@pytest.mark.asyncio
+async def test_cached_user_invalidation_outside_a_worker_thread(monkeypatch):
+    monkeypatch.setattr(settings, "AUTH_USER_CACHE_ENABLED", True)
+    await user_cache.set("direct@example.com", "{}")
+    # Called on the event loop itself, where the worker-thread hand-off is unavailable.
+    auth_service.invalidate_cached_user("direct@example.com")
+    assert await user_cache.get("direct@example.com") is None
+
+    class LoopBoundClient:
+        async def delete(self, key):
+            raise AssertionError("the Redis client must not be used from another event loop")
+
+    monkeypatch.setattr(auth_service, "user_cache", RedisCache("user", 30, LoopBoundClient()))
+    auth_service.invalidate_cached_user("direct@example.com")
+
+
 def test_verify_user_email_with_invalid_token(client):
     response = client.get("/auth/verify-email?token=invalidtoken")
     assert response.status_code == status.HTTP_400_BAD_REQUEST
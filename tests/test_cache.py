@@ -0,0 +1,115 @@
+import pytest
+from app.utils.cache import MemoryCache, RedisCache, VersionedCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRedis:
+    """Stand-in for `redis.asyncio.Redis` covering the commands the cache uses."""
+
+    def __init__(self):
+        self.store = {}
+        self.expiries = {}
+
+    async def get(self, key):
+        value = self.store.get(key)
+        return value.encode() if value is not None else None
+
+    async def set(self, key, value, ex=None):
+        self.store[key] = value
+        self.expiries[key] = ex
+
+    async def delete(self, key):
+        self.store.pop(key, None)
+
+
+class BrokenRedis:
+    async def get(self, key):
+        raise ConnectionError("redis is down")
+
+    async def set(self, key, value, ex=None):
+        raise ConnectionError("redis is down")
+
+    async def delete(self, key):
+        raise ConnectionError("redis is down")
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_counts_hits_and_misses():
+    cache = MemoryCache("movie", ttl=60, max_size=10)
+    assert await cache.get("a") is None
+    await cache.set("a", "1")
+    assert await cache.get("a") == "1"
+    await cache.delete("a")
+    assert await cache.get("a") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 2, 0)
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache("movie", ttl=60, max_size=2)
+    await cache.set("a", "1")
+    await cache.set("b", "2")
+    await cache.get("a")
+    await cache.set("c", "3")
+    assert await cache.get("b") is None
+    assert await cache.get("a") == "1"
+    assert await cache.get("c") == "3"
+    assert cache.stats()["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_expires_entries():
+    clock = FakeClock()
+    cache = MemoryCache("movie", ttl=30, max_size=10, clock=clock)
+    await cache.set("a", "1")
+    clock.now = 29
+    assert await cache.get("a") == "1"
+    clock.now = 30
+    assert await cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+@pytest.mark.asyncio
+async def test_redis_cache_namespaces_keys_and_sets_ttl():
+    client = FakeRedis()
+    cache = RedisCache("movie", ttl=45, client=client)
+    await cache.set("a", "1")
+    assert client.store == {"movie:a": "1"}
+    assert client.expiries == {"movie:a": 45}
+    assert await cache.get("a") == "1"
+    await cache.delete("a")
+    assert await cache.get("a") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_redis_cache_treats_errors_as_misses():
+    cache = RedisCache("movie", ttl=45, client=BrokenRedis())
+    await cache.set("a", "1")
+    assert await cache.get("a") is None
+    await cache.delete("a")
+    assert cache.stats()["errors"] == 3
+    assert cache.misses == 1
+
+
+@pytest.mark.asyncio
+async def test_versioned_cache_drops_sets_from_before_an_invalidation():
+    cache = VersionedCache(MemoryCache("movie", ttl=60, max_size=10), MemoryCache("movie-version", ttl=60, max_size=10))
+    version = await cache.version("a")
+    await cache.invalidate("a")
+    assert not await cache.set("a", version, "old")
+    assert await cache.get("a", version) is None
+
+    version = await cache.version("a")
+    assert await cache.set("a", version, "new")
+    assert await cache.get("a", version) == "new"
+    await cache.invalidate("a")
+    assert await cache.get("a", await cache.version("a")) is None
@@ -1,8 +1,11 @@
-from datetime import date
+from datetime import date, datetime
 import pytest
 from sqlalchemy.orm import Session
+from app.db.models.comment import Comment
 from app.db.models.movie import Movie
+from app.db.models.user import User
 from app.db.schemas.user import UserCreate
+from app.core.config import settings
 from app.services.auth import register_user
 
 @pytest.fixture
@@ -96,17 +99,16 @@ def test_add_nested_comment(client, db: Session, auth_headers, test_movie):
         "parent_comment_id": str(data["data"][0]["id"])
     }
     response = client.post("/comments/nested", json=nested_reply_data, headers=auth_headers)
-    
-    assert response.status_code == 400
-    error_data = response.json()
-    assert "detail" in error_data
-    assert error_data["detail"] == "Replies to replies are not allowed."
+
+    assert response.status_code == 201
+    assert response.json()["data"][0]["parent_comment_id"] == nested_reply_data["parent_comment_id"]
 
     response = client.get(f"/comments/{test_movie.id}", headers=auth_headers)
     assert response.status_code == 200
     data = response.json()
     top_level_comment = data["data"][0]
     assert len(top_level_comment["replies"]) == 1  # Only one direct reply should exist
+    assert top_level_comment["replies"][0]["reply_count"] == 1
 
 
 
@@ -170,3 +172,137 @@ def test_add_comment_to_non_existent_movie(client, db: Session, auth_headers):
 
 
 
+def test_view_comments_with_cursor_pagination(client, db: Session, auth_headers, test_movie):
+    user = db.query(User).filter(User.email == "test@example.com").first()
+    db.add_all([
+        Comment(content=f"Paged comment {i}", movie_id=test_movie.id, user_id=user.id, created_at=datetime(2024, 1, 1, 12, i))
+        for i in range(5)
+    ])
+    db.commit()
+
+    response = client.get(f"/comments/{test_movie.id}", params={"limit": 3, "sort_order": "from_oldest"}, headers=auth_headers)
+    first_page = response.json()
+    assert [comment["content"] for comment in first_page["data"]] == [f"Paged comment {i}" for i in range(3)]
+    assert first_page["next_cursor"]
+
+    response = client.get(f"/comments/{test_movie.id}", params={"limit": 3, "sort_order": "from_oldest", "cursor": first_page["next_cursor"]}, headers=auth_headers)
+    second_page = response.json()
+    assert [comment["content"] for comment in second_page["data"]] == [f"Paged comment {i}" for i in range(3, 5)]
+    assert second_page["next_cursor"] is None
+
+
+def test_core_read_path_matches_orm_output(client, db: Session, auth_headers, test_movie, monkeypatch):
+    user = db.query(User).filter(User.email == "test@example.com").first()
+    parents = [Comment(content=f"Parent {i}", movie_id=test_movie.id, user_id=user.id, created_at=datetime(2024, 1, 1, 12, i)) for i in range(3)]
+    db.add_all(parents)
+    db.flush()
+    db.add_all([
+        Comment(content=f"Reply {i}", movie_id=test_movie.id, user_id=user.id, parent_comment_id=parents[i % 2].id, created_at=datetime(2024, 1, 2, 12, i))
+        for i in range(4)
+    ])
+    db.commit()
+
+    params = {"limit": 2, "sort_order": "from_oldest"}
+    monkeypatch.setattr(settings, "CORE_READ_PATH", [])
+    orm_output = client.get(f"/comments/{test_movie.id}", params=params).json()
+    monkeypatch.setattr(settings, "CORE_READ_PATH", ["comments"])
+    core_output = client.get(f"/comments/{test_movie.id}", params=params).json()
+
+    assert core_output == orm_output
+    assert [reply["content"] for reply in core_output["data"][0]["replies"]] == ["Reply 0", "Reply 2"]
+
+
+def test_replies_are_bounded_and_paginated(client, db: Session, auth_headers, test_movie, monkeypatch):
+    monkeypatch.setattr(settings, "COMMENT_REPLY_PREVIEW_SIZE", 2)
+    user = db.query(User).filter(User.email == "test@example.com").first()
+    parent = Comment(content="Parent", movie_id=test_movie.id, user_id=user.id, created_at=datetime(2024, 1, 1, 12, 0))
+    quiet_parent = Comment(content="Quiet parent", movie_id=test_movie.id, user_id=user.id, created_at=datetime(2024, 1, 1, 11, 0))
+    db.add_all([parent, quiet_parent])
+    db.flush()
+    db.add_all([
+        Comment(content=f"Reply {i}", user_id=user.id, parent_comment_id=parent.id, created_at=datetime(2024, 1, 2, 12, i))
+        for i in range(5)
+    ])
+    db.commit()
+
+    for core_read_path in ([], ["comments"]):
+        monkeypatch.setattr(settings, "CORE_READ_PATH", core_read_path)
+        response = client.get(f"/comments/{test_movie.id}")
+        assert response.status_code == 200
+        comments = response.json()["data"]
+        assert comments[0]["reply_count"] == 5
+        assert [reply["content"] for reply in comments[0]["replies"]] == ["Reply 3", "Reply 4"]
+        assert comments[1]["reply_count"] == 0
+        assert comments[1]["replies"] == []
+
+        response = client.get(f"/comments/{parent.id}/replies", params={"skip": 2, "limit": 2})
+        assert response.status_code == 200
+        first_page = response.json()
+        assert [reply["content"] for reply in first_page["data"]] == ["Reply 2", "Reply 1"]
+        response = client.get(f"/comments/{parent.id}/replies", params={"limit": 2, "cursor": first_page["next_cursor"]})
+        second_page = response.json()
+        assert [reply["content"] for reply in second_page["data"]] == ["Reply 0"]
+        assert second_page["next_cursor"] is None
+
+
+def test_view_replies_to_missing_comment(client):
+    response = client.get("/comments/123e4567-e89b-12d3-a456-426614174000/replies")
+    assert response.status_code == 404
+
+
+def test_view_comment_thread(client, db: Session, auth_headers, test_movie, monkeypatch):
+    user = db.query(User).filter(User.email == "test@example.com").first()
+    root = Comment(content="Root", movie_id=test_movie.id, user_id=user.id, created_at=datetime(2024, 1, 1))
+    db.add(root)
+    db.flush()
+    parent = root
+    for depth in range(1, 5):
+        children = [
+            Comment(content=f"Depth {depth} #{i}", user_id=user.id, parent_comment_id=parent.id, created_at=datetime(2024, 1, 1 + depth, i))
+            for i in range(2)
+        ]
+        db.add_all(children)
+        db.flush()
+        parent = children[0]
+    db.add(Comment(content="Other thread", movie_id=test_movie.id, user_id=user.id, created_at=datetime(2024, 1, 1)))
+    db.commit()
+
+    for core_read_path in ([], ["comments"]):
+        monkeypatch.setattr(settings, "CORE_READ_PATH", core_read_path)
+        response = client.get(f"/comments/{root.id}/thread")
+        assert response.status_code == 200
+        node = response.json()["data"][0]
+        assert node["content"] == "Root"
+        for depth in range(1, 5):
+            assert [reply["content"] for reply in node["replies"]] == [f"Depth {depth} #0", f"Depth {depth} #1"]
+            assert node["reply_count"] == 2
+            node = node["replies"][0]
+        assert node["replies"] == []
+
+        response = client.get(f"/comments/{root.id}/thread", params={"max_depth": 2})
+        node = response.json()["data"][0]["replies"][0]["replies"][0]
+        assert node["content"] == "Depth 2 #0"
+        assert node["replies"] == []
+        assert node["reply_count"] == 2
+
+    response = client.get("/comments/123e4567-e89b-12d3-a456-426614174000/thread")
+    assert response.status_code == 404
+
+
+def test_comment_write_paths_query_counts(client, db: Session, auth_headers, test_movie, count_queries):
+    # Each request also makes one SELECT for the authenticated user.
+    with count_queries() as statements:
+        response = client.post("/comments/", json={"content": "Counted", "movie_id": str(test_movie.id)}, headers=auth_headers)
+    assert response.status_code == 201
+    assert len(statements) == 2
+    parent_comment_id = response.json()["data"][0]["id"]
+
+    with count_queries() as statements:
+        response = client.post("/comments/nested", json={"content": "Counted reply", "parent_comment_id": parent_comment_id}, headers=auth_headers)
+    assert response.status_code == 201
+    assert len(statements) == 2
+
+    response = client.post("/comments/nested", json={"content": "Orphan", "parent_comment_id": "123e4567-e89b-12d3-a456-426614174000"}, headers=auth_headers)
+    assert response.status_code == 400
+    response = client.post("/comments/", json={"content": "Lost", "movie_id": "123e4567-e89b-12d3-a456-426614174000"}, headers=auth_headers)
+    assert response.status_code == 404
@@ -0,0 +1,109 @@
+import asyncio
+from email import message_from_string, policy
+import pytest
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.models.email_outbox import OutboxEmail
+from app.db.schemas.user import UserCreate
+from app.services.auth import register_user
+from app.utils.email import FAILED, PENDING, SENT, EmailOutboxWorker, queue_verification_email
+
+
+class SMTPSink:
+    """Minimal local SMTP server that records every message it accepts."""
+
+    def __init__(self):
+        self.messages = []
+        self.connections = 0
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        writer.write(b"220 sink ready\r\n")
+        recipients = []
+        while line := await reader.readline():
+            command = line.decode().strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                writer.write(b"250 sink\r\n")
+            elif command.startswith("RCPT TO:"):
+                recipients.append(line.decode().strip()[8:].strip("<>"))
+                writer.write(b"250 OK\r\n")
+            elif command == "DATA":
+                writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                await writer.drain()
+                data = []
+                while (body_line := await reader.readline()) != b".\r\n":
+                    data.append(body_line)
+                self.messages.append((recipients, b"".join(data).decode()))
+                recipients = []
+                writer.write(b"250 OK\r\n")
+            elif command == "QUIT":
+                writer.write(b"221 Bye\r\n")
+                await writer.drain()
+                break
+            else:
+                writer.write(b"250 OK\r\n")
+            await writer.drain()
+        writer.close()
+
+
+@pytest.fixture
+def smtp_settings(monkeypatch):
+    monkeypatch.setattr(settings, "SMTP_SERVER", "127.0.0.1")
+    monkeypatch.setattr(settings, "SMTP_USE_TLS", False)
+    monkeypatch.setattr(settings, "SMTP_PASSWORD", "")
+
+
+@pytest.mark.asyncio
+async def test_outbox_sends_batch_over_one_connection(db: Session, smtp_settings, monkeypatch):
+    sink = SMTPSink()
+    monkeypatch.setattr(settings, "SMTP_PORT", await sink.start())
+    user = register_user(UserCreate(email="queued@example.com", password="password123", first_name="Jane", last_name="Doe"), db)
+    for i in range(2):
+        queue_verification_email(db, f"other{i}@example.com", f"token-{i}")
+    db.commit()
+
+    worker = EmailOutboxWorker()
+    assert await worker.process_due() == 3
+    await worker.stop()
+    await sink.stop()
+
+    assert sink.connections == 1
+    recipients = [recipient for message_recipients, _ in sink.messages for recipient in message_recipients]
+    assert sorted(recipients) == ["other0@example.com", "other1@example.com", "queued@example.com"]
+    queued = next(body for message_recipients, body in sink.messages if message_recipients == ["queued@example.com"])
+    html = message_from_string(queued, policy=policy.default).get_content()
+    assert f"verify-email?token={user.verification_token}" in html
+    assert {email.status for email in db.query(OutboxEmail).all()} == {SENT}
+
+
+@pytest.mark.asyncio
+async def test_outbox_retries_with_backoff_then_gives_up(db: Session, smtp_settings, monkeypatch):
+    sink = SMTPSink()
+    monkeypatch.setattr(settings, "SMTP_PORT", await sink.start())
+    await sink.stop()
+    monkeypatch.setattr(settings, "EMAIL_MAX_ATTEMPTS", 2)
+    queue_verification_email(db, "unreachable@example.com", "token")
+    db.commit()
+
+    worker = EmailOutboxWorker()
+    assert await worker.process_due() == 1
+    outbox_email = db.query(OutboxEmail).one()
+    db.refresh(outbox_email)
+    assert (outbox_email.status, outbox_email.attempts) == (PENDING, 1)
+    assert outbox_email.last_error
+
+    assert await worker.process_due() == 0
+    outbox_email.next_attempt_at = outbox_email.created_at
+    db.commit()
+    assert await worker.process_due() == 1
+    db.refresh(outbox_email)
+    assert (outbox_email.status, outbox_email.attempts) == (FAILED, 2)
@@ -0,0 +1,42 @@
+import json
+import logging
+import queue
+import sys
+from app.utils.logger import DeferredQueueHandler, JsonFormatter, LazySysLogHandler, SamplingFilter
+
+
+def make_record(level=logging.INFO, msg="Fetched %s movies", args=(3,), exc_info=None):
+    return logging.LogRecord("movie_listing_app", level, __file__, 10, msg, args, exc_info)
+
+
+def test_sampling_filter_never_drops_warnings():
+    sampling = SamplingFilter(0.0)
+    assert sampling.filter(make_record(logging.INFO)) is False
+    assert sampling.filter(make_record(logging.DEBUG)) is False
+    assert sampling.filter(make_record(logging.WARNING)) is True
+    assert SamplingFilter(1.0).filter(make_record(logging.DEBUG)) is True
+
+
+def test_queue_handler_merges_arguments_and_json_formatter_keeps_traceback():
+    records = queue.SimpleQueue()
+    handler = DeferredQueueHandler(records)
+    try:
+        raise ValueError("bad value")
+    except ValueError:
+        handler.handle(make_record(logging.ERROR, exc_info=sys.exc_info()))
+    record = records.get_nowait()
+    assert (record.msg, record.args, record.exc_info) == ("Fetched 3 movies", None, None)
+
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "Fetched 3 movies"
+    assert entry["level"] == "ERROR"
+    assert "ValueError: bad value" in entry["exception"]
+
+
+def test_syslog_handler_does_not_connect_until_first_record(monkeypatch):
+    created = []
+    monkeypatch.setattr("app.utils.logger.SysLogHandler", lambda address: created.append(address) or logging.NullHandler())
+    handler = LazySysLogHandler(address=("logs.example.com", 514))
+    assert created == []
+    handler.handle(make_record())
+    assert created == [("logs.example.com", 514)]
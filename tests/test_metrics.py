@@ -0,0 +1,93 @@
+import json
+import os
+import re
+from app.core.config import settings
+from app.utils.metrics import Histogram, MetricsRegistry, merge_snapshots, process_identity, render
+
+
+def sample(body: str, line_prefix: str) -> float:
+    match = re.search(rf"^{re.escape(line_prefix)} (\S+)$", body, re.MULTILINE)
+    return float(match.group(1)) if match else 0.0
+
+
+def test_metrics_endpoint_reports_requests_pool_threads_and_caches(client):
+    before = client.get("/metrics").text
+    client.get("/movies/")
+    client.get("/movies/")
+    client.get("/no/such/path")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+
+    ok = 'http_responses_total{method="GET",route="/movies/",status="200"}'
+    assert sample(body, ok) - sample(before, ok) == 2
+    not_found = 'http_responses_total{method="GET",route="<unmatched>",status="404"}'
+    assert sample(body, not_found) - sample(before, not_found) == 1
+    count = 'http_request_duration_seconds_count{method="GET",route="/movies/"}'
+    assert sample(body, count) - sample(before, count) == 2
+    assert sample(body, 'http_request_duration_seconds_bucket{method="GET",route="/movies/",le="+Inf"}') == sample(body, count)
+    # The scrape itself is the one request in flight.
+    assert sample(body, 'http_requests_in_flight{method="GET"}') == 1
+    assert sample(body, "anyio_threadpool_max_threads") > 0
+    assert 'db_pool_checked_out_connections{engine="sync"}' in body
+    assert 'cache_hit_ratio{cache="movie"}' in body
+    assert 'cache_hits_total{cache="response"}' in body
+
+
+def test_snapshots_from_other_workers_are_merged(client, tmp_path, monkeypatch):
+    dead_pid = 2 ** 22 + 1
+    registry = MetricsRegistry()
+    latency = registry.register(Histogram("http_request_duration_seconds", "Latency.", ("method", "route"), settings.METRICS_LATENCY_BUCKETS))
+    latency.observe(0.003, ("GET", "/movies/"))
+    snapshot = registry.snapshot()
+    snapshot["pid"] = dead_pid
+    snapshot["metrics"]["http_requests_in_flight"] = {"type": "gauge", "help": "In flight.", "labelnames": ["method"], "buckets": None, "samples": [[["GET"], 7]]}
+    snapshot["metrics"]["cache_hits_total"] = {"type": "counter", "help": "Hits.", "labelnames": ["cache"], "buckets": None, "samples": [[["other"], 3]]}
+    (tmp_path / f"{dead_pid}.json").write_text(json.dumps(snapshot))
+
+    local = client.get("/metrics").text
+    monkeypatch.setattr(settings, "METRICS_MULTIPROC_DIR", str(tmp_path))
+    merged = client.get("/metrics").text
+
+    count = 'http_request_duration_seconds_count{method="GET",route="/movies/"}'
+    # The local count also includes the first scrape; the dead worker adds its one request.
+    assert sample(merged, count) == sample(local, count) + 1
+    # Gauges of exited workers are dropped, counters are kept.
+    assert sample(merged, 'http_requests_in_flight{method="GET"}') == 1
+    assert sample(merged, 'cache_hits_total{cache="other"}') == 3
+    assert sample(merged, 'cache_hit_ratio{cache="other"}') == 1
+    assert len(list(tmp_path.glob("*.json"))) == 2
+
+
+def test_exited_workers_are_folded_into_the_archive(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_MULTIPROC_DIR", str(tmp_path))
+
+    def exited_worker(pid, started, hits):
+        snapshot = {"pid": pid, "started": started, "metrics": {
+            "cache_hits_total": {"type": "counter", "help": "Hits.", "labelnames": ["cache"], "buckets": None, "samples": [[["other"], hits]]},
+        }}
+        (tmp_path / f"{pid}-{started}.json").write_text(json.dumps(snapshot))
+
+    # An exited worker, and an earlier process that had this worker's pid.
+    exited_worker(2 ** 22 + 1, 1, 3)
+    exited_worker(os.getpid(), -1, 4)
+    assert sample(client.get("/metrics").text, 'cache_hits_total{cache="other"}') == 7
+    assert sorted(path.name for path in tmp_path.glob("*.json")) == sorted(["archive.json", f"{os.getpid()}-{process_identity()}.json"])
+
+    exited_worker(2 ** 22 + 2, 1, 1)
+    assert sample(client.get("/metrics").text, 'cache_hits_total{cache="other"}') == 8
+    assert len(list(tmp_path.glob("*.json"))) == 2
+
+
+def test_histogram_buckets_are_cumulative_in_output():
+    registry = MetricsRegistry()
+    latency = registry.register(Histogram("latency_seconds", "Latency.", (), [0.1, 1]))
+    for value in (0.05, 0.5, 0.7, 3):
+        latency.observe(value)
+    body = render(merge_snapshots([registry.snapshot()]))
+    assert 'latency_seconds_bucket{le="0.1"} 1' in body
+    assert 'latency_seconds_bucket{le="1"} 3' in body
+    assert 'latency_seconds_bucket{le="+Inf"} 4' in body
+    assert "latency_seconds_count 4" in body
+    assert "latency_seconds_sum 4.25" in body
@@ -0,0 +1,97 @@
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import IntegrityError
+from app.middlewares.auth_middleware import AuthMiddleware
+from app.middlewares.error_handling_middleware import ErrorHandlingMiddleware
+from app.core.config import settings
+from app.middlewares.logging_middleware import LoggingMiddleware
+from app.middlewares.query_stats_middleware import QueryStatsMiddleware
+from app.utils.logger import logger
+from app.utils.request_stats import current_request_stats
+
+
+def build_app():
+    app = FastAPI()
+
+    @app.get("/public/ok")
+    async def ok():
+        return {"ok": True}
+
+    @app.get("/public/crash")
+    async def crash():
+        raise RuntimeError("boom")
+
+    @app.get("/public/integrity")
+    async def integrity():
+        raise IntegrityError("INSERT", {}, Exception("duplicate"))
+
+    @app.get("/private")
+    async def private():
+        return {"private": True}
+
+    app.add_middleware(ErrorHandlingMiddleware)
+    app.add_middleware(LoggingMiddleware)
+    app.add_middleware(AuthMiddleware, excluded_paths=["/public"])
+    return app
+
+
+def test_middleware_passes_responses_through():
+    client = TestClient(build_app())
+    response = client.get("/public/ok")
+    assert response.status_code == 200
+    assert response.json() == {"ok": True}
+
+
+def test_unhandled_errors_return_json_envelopes():
+    client = TestClient(build_app())
+    response = client.get("/public/crash")
+    assert response.status_code == 500
+    assert response.json() == {"status": False, "status_code": 500, "message": "An unexpected error occurred: Internal Server Error"}
+    response = client.get("/public/integrity")
+    assert response.status_code == 400
+    assert response.json() == {"status": False, "status_code": 400, "message": "An unexpected error occurred: Integrity Error"}
+
+
+def test_auth_middleware_requires_header_outside_excluded_paths():
+    client = TestClient(build_app())
+    with pytest.raises(HTTPException) as exc_info:
+        client.get("/private")
+    assert exc_info.value.status_code == 401
+    response = client.get("/private", headers={"Authorization": "Bearer token"})
+    assert response.json() == {"private": True}
+
+
+def test_query_stats_header_and_n_plus_one_warning(monkeypatch):
+    app = FastAPI()
+
+    @app.get("/public/n-plus-one")
+    async def n_plus_one():
+        stats = current_request_stats.get()
+        for _ in range(4):
+            stats.record_query("SELECT * FROM ratings WHERE movie_id = ?", 0.001)
+        stats.record_query("SELECT * FROM movies WHERE id IN (?, ?, ?)", 0.001)
+        stats.record_query("SELECT * FROM movies WHERE id IN (?)", 0.001)
+        return {"ok": True}
+
+    @app.get("/public/ok")
+    async def ok():
+        return {"ok": True}
+
+    app.add_middleware(QueryStatsMiddleware)
+    warnings = []
+    monkeypatch.setattr(settings, "QUERY_STATS_ENABLED", True)
+    monkeypatch.setattr(settings, "QUERY_STATS_N_PLUS_ONE_THRESHOLD", 3)
+    monkeypatch.setattr(logger, "warning", lambda message, *args: warnings.append(args))
+
+    response = TestClient(app).get("/public/n-plus-one")
+    assert response.headers["Server-Timing"].startswith('db;dur=6.00;desc="6 queries", ser;dur=')
+    assert warnings == [("GET", "/public/n-plus-one", 4, "SELECT * FROM ratings WHERE movie_id = ?")]
+
+    monkeypatch.setattr(settings, "QUERY_STATS_N_PLUS_ONE_THRESHOLD", 1)
+    warnings.clear()
+    TestClient(app).get("/public/n-plus-one")
+    assert ("GET", "/public/n-plus-one", 2, "SELECT * FROM movies WHERE id IN (...)") in warnings
+
+    monkeypatch.setattr(settings, "QUERY_STATS_ENABLED", False)
+    assert "Server-Timing" not in TestClient(app).get("/public/ok").headers
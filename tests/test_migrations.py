@@ -0,0 +1,115 @@
+import os
+import uuid
+from datetime import datetime
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import IntegrityError
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+
+@pytest.fixture
+def database(tmp_path):
+    """A database at the baseline schema, as created by create_all before migrations existed."""
+    url = f"sqlite:///{tmp_path / 'upgrade.db'}"
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("sqlalchemy.url", url)
+    command.upgrade(config, "0001")
+    engine = create_engine(url)
+    yield config, engine
+    engine.dispose()
+
+
+def insert(connection, table: str, **values) -> str:
+    values = {"id": uuid.uuid4().hex, "created_at": datetime(2024, 1, 1), "updated_at": datetime(2024, 1, 1), **values}
+    columns = ", ".join(values)
+    connection.execute(text(f"INSERT INTO {table} ({columns}) VALUES ({', '.join(':' + name for name in values)})"), values)
+    return values["id"]
+
+
+def insert_user(connection, email: str) -> str:
+    return insert(connection, "users", email=email, first_name="Old", last_name="User", hashed_password="x", is_verified=True)
+
+
+def insert_movie(connection, owner_id: str, title: str) -> str:
+    return insert(connection, "movies", title=title, description="d", duration=90, release_date="2024-01-01", poster_url="p", owner_id=owner_id)
+
+
+def id_column_types(connection, table: str) -> set:
+    return {row.type for row in connection.execute(text(f"PRAGMA table_info({table})")) if row.name.endswith("id")}
+
+
+def test_upgrade_fills_in_rating_aggregates(database):
+    config, engine = database
+    with engine.begin() as connection:
+        owner = insert_user(connection, "owner@example.com")
+        rated, unrated = insert_movie(connection, owner, "Rated"), insert_movie(connection, owner, "Unrated")
+        for index, score in enumerate((3, 4)):
+            insert(connection, "ratings", score=score, movie_id=rated, user_id=insert_user(connection, f"rater{index}@example.com"))
+
+    command.upgrade(config, "0002")
+    with engine.connect() as connection:
+        rows = connection.execute(text("SELECT title, rating_count, rating_sum, average_rating FROM movies ORDER BY title")).all()
+    assert [tuple(row) for row in rows] == [("Rated", 2, 7, 3.5), ("Unrated", 0, 0, 0.0)]
+
+
+def test_upgrade_fills_in_comment_paths(database):
+    config, engine = database
+    with engine.begin() as connection:
+        user = insert_user(connection, "commenter@example.com")
+        movie = insert_movie(connection, user, "Discussed")
+        root = insert(connection, "comments", content="Root", movie_id=movie, user_id=user)
+        reply = insert(connection, "comments", content="Reply", parent_comment_id=root, user_id=user)
+        nested = insert(connection, "comments", content="Nested", parent_comment_id=reply, user_id=user)
+
+    command.upgrade(config, "0003")
+    with engine.connect() as connection:
+        paths = dict(connection.execute(text("SELECT content, path FROM comments")).all())
+        indexes = connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'comments'")).scalars().all()
+    assert paths == {"Root": root, "Reply": root + reply, "Nested": root + reply + nested}
+    assert "ix_comments_path" in indexes
+    with engine.connect() as connection:
+        assert id_column_types(connection, "comments") == {"UUID"}
+    with pytest.raises(IntegrityError), engine.begin() as connection:
+        insert(connection, "comments", content="No path", movie_id=movie, user_id=user)
+
+
+def test_upgrade_keeps_the_newest_duplicate_rating(database):
+    config, engine = database
+    with engine.begin() as connection:
+        user = insert_user(connection, "rater@example.com")
+        movie = insert_movie(connection, user, "Rated twice")
+        insert(connection, "ratings", score=1, movie_id=movie, user_id=user, updated_at=datetime(2024, 1, 1))
+        insert(connection, "ratings", score=5, movie_id=movie, user_id=user, updated_at=datetime(2024, 2, 1))
+
+    command.upgrade(config, "0004")
+    with engine.connect() as connection:
+        scores = connection.execute(text("SELECT score, previous_score FROM ratings")).all()
+        aggregates = connection.execute(text("SELECT rating_count, rating_sum, average_rating FROM movies")).one()
+    assert [tuple(row) for row in scores] == [(5, None)]
+    assert tuple(aggregates) == (1, 5, 5.0)
+    with engine.connect() as connection:
+        assert id_column_types(connection, "ratings") == {"UUID"}
+    with pytest.raises(IntegrityError), engine.begin() as connection:
+        insert(connection, "ratings", score=3, movie_id=movie, user_id=user)
+
+
+def test_upgrade_cascades_movie_deletes(database):
+    config, engine = database
+    with engine.begin() as connection:
+        user = insert_user(connection, "owner@example.com")
+        movie = insert_movie(connection, user, "Doomed")
+        insert(connection, "ratings", score=4, movie_id=movie, user_id=user)
+        root = insert(connection, "comments", content="Root", movie_id=movie, user_id=user)
+        insert(connection, "comments", content="Reply", parent_comment_id=root, user_id=user)
+
+    command.upgrade(config, "0005")
+    with engine.begin() as connection:
+        connection.exec_driver_sql("PRAGMA foreign_keys=ON")
+        assert id_column_types(connection, "ratings") == id_column_types(connection, "comments") == {"UUID"}
+        assert connection.execute(text("SELECT deleted_at FROM movies")).scalar_one() is None
+        connection.execute(text("DELETE FROM movies WHERE id = :id"), {"id": movie})
+        assert connection.execute(text("SELECT count(*) FROM ratings")).scalar_one() == 0
+        assert connection.execute(text("SELECT count(*) FROM comments")).scalar_one() == 0
@@ -1,7 +1,24 @@
+import asyncio
+import uuid
+from datetime import date
 import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from app.db.models.comment import Comment
+from app.db.models.movie import Movie
+from app.db.models.rating import Rating
+from app.db.models.user import User
+from app.crud.crud_movie import create_movie, get_movie
+from app.db.schemas.movie import MovieCreate, MovieResponse, MovieUpdate, PaginatedResponse
 from app.db.schemas.user import UserCreate
+from app.core.config import settings
+from app.db.search import SQLITE_LEGACY_SEARCH_DROP_DDL, create_search_index
+from app.db.session import AsyncSessionLocal, Base, engine
+from app.services import movie_service
 from app.services.auth import register_user
+from app.utils.cache import movie_cache
+from app.utils.movie_purge import MoviePurgeWorker
 
 @pytest.fixture
 def auth_headers(client, db: Session):
@@ -63,6 +80,42 @@ def test_view_all_movies(client, db: Session, auth_headers):
     data = response.json()
     assert isinstance(data["data"], list)
 
+def test_list_movies_serializes_same_envelope_as_response_model(client, db: Session, auth_headers):
+    owner = db.query(User).filter(User.email == "test@example.com").one()
+    db.add_all([
+        Movie(title=f"Envelope {i}", description="Serialized once", duration=90 + i, release_date=date(2023, 1, i + 1),
+              poster_url=f"https://example.com/{i}.jpg", owner_id=owner.id)
+        for i in range(3)
+    ])
+    db.commit()
+
+    response = client.get("/movies/", params={"limit": 2})
+    assert response.headers["content-type"] == "application/json"
+    movies = [MovieResponse.from_orm(movie) for movie in db.query(Movie).order_by(Movie.created_at.desc(), Movie.id.desc()).limit(2)]
+    expected = PaginatedResponse(success=True, status_code=200, message="Movies retrieved successfully", data=movies,
+                                 next_cursor=response.json()["next_cursor"])
+    assert response.json() == expected.model_dump(mode="json")
+    assert response.json()["next_cursor"]
+
+
+@pytest.mark.parametrize("params", [{}, {"sort_by": "most_rated_and_recent"}, {"search": "envelope", "sort_by": "most_recent"}])
+def test_core_read_path_matches_orm_output(client, db: Session, auth_headers, monkeypatch, params):
+    owner = db.query(User).filter(User.email == "test@example.com").one()
+    db.add_all([
+        Movie(title=f"Envelope {i}", description="Core rows", duration=90 + i, release_date=date(2023, 1, i + 1),
+              poster_url=f"https://example.com/{i}.jpg", owner_id=owner.id, rating_count=1, rating_sum=i % 3, average_rating=i % 3)
+        for i in range(4)
+    ])
+    db.commit()
+
+    monkeypatch.setattr(settings, "CORE_READ_PATH", [])
+    orm_output = client.get("/movies/", params={**params, "limit": 3}).json()
+    monkeypatch.setattr(settings, "CORE_READ_PATH", ["movies"])
+    core_output = client.get("/movies/", params={**params, "limit": 3}).json()
+    assert core_output == orm_output
+    assert len(core_output["data"]) == 3
+
+
 def test_edit_movie(client, db: Session, auth_headers):
     movie_data = {
         "title": "Test Movie",
@@ -109,6 +162,58 @@ def test_delete_movie(client, db: Session, auth_headers):
     assert response.status_code == 404
 
 
+def test_view_movie_served_from_cache_and_invalidated_on_write(client, db: Session, auth_headers):
+    movie_data = {
+        "title": "Cached Movie",
+        "description": "Original description.",
+        "duration": 100,
+        "release_date": "2024-01-01",
+        "poster_url": "https://example.com/poster.jpg"
+    }
+    movie_id = client.post("/movies/", json=movie_data, headers=auth_headers).json()["data"]["id"]
+
+    hits = movie_cache.entries.hits
+    client.get(f"/movies/{movie_id}")
+    response = client.get(f"/movies/{movie_id}")
+    assert response.json()["data"]["description"] == "Original description."
+    assert movie_cache.entries.hits == hits + 1
+
+    client.put(f"/movies/{movie_id}", json={"description": "Updated description."}, headers=auth_headers)
+    response = client.get(f"/movies/{movie_id}")
+    assert response.json()["data"]["description"] == "Updated description."
+
+    client.delete(f"/movies/{movie_id}", headers=auth_headers)
+    assert client.get(f"/movies/{movie_id}").status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_lookup_overlapping_an_update_does_not_cache_the_old_movie(client, db: Session, monkeypatch):
+    owner = register_user(UserCreate(email="race@example.com", password="password123", first_name="Race", last_name="Owner"), db)
+    movie = Movie(title="Racy", description="Old description.", duration=90, release_date=date(2024, 1, 1), poster_url="https://example.com/p.jpg", owner_id=owner.id)
+    db.add(movie)
+    db.commit()
+    loaded, release = asyncio.Event(), asyncio.Event()
+
+    async def slow_get_movie(session, movie_id):
+        found = await get_movie(session, movie_id)
+        loaded.set()
+        await release.wait()
+        return found
+
+    monkeypatch.setattr(movie_service, "get_movie", slow_get_movie)
+    async with AsyncSessionLocal() as session:
+        reader = asyncio.create_task(movie_service.get_movie_service(session, movie.id))
+        await loaded.wait()
+        async with AsyncSessionLocal() as writer:
+            await movie_service.update_movie_service(writer, movie.id, MovieUpdate(description="New description."), owner.id)
+        release.set()
+        # The lookup returns what it read, but must not store it over the update.
+        assert (await reader).description == "Old description."
+    monkeypatch.undo()
+
+    assert client.get(f"/movies/{movie.id}").json()["data"]["description"] == "New description."
+
+
 def test_create_duplicate_movie(client, db: Session, auth_headers):
     movie_data = {
         "title": "Test Movie",
@@ -126,3 +231,187 @@ def test_create_duplicate_movie(client, db: Session, auth_headers):
 
 
 
+@pytest.mark.asyncio
+async def test_create_movie_reraises_other_integrity_errors(client):
+    movie = MovieCreate(title="Orphan", description="No owner.", duration=90, release_date=date(2024, 1, 1), poster_url="https://example.com/p.jpg")
+    async with AsyncSessionLocal() as session:
+        # The owner_id foreign key fails, not the title and release date constraint.
+        with pytest.raises(IntegrityError):
+            await create_movie(session, movie, uuid.uuid4())
+
+
+def test_search_movies_ranked_by_relevance(client, db: Session, auth_headers):
+    owner = db.query(User).filter(User.email == "test@example.com").first()
+    movies = [
+        Movie(title="Space Odyssey", description="A journey beyond the stars.", duration=140, release_date=date(1968, 4, 2), owner_id=owner.id),
+        Movie(title="Quiet Drama", description="A family story with a brief space subplot.", duration=100, release_date=date(2001, 5, 5), owner_id=owner.id),
+        Movie(title="Unrelated", description="Nothing to see here.", duration=90, release_date=date(2010, 1, 1), owner_id=owner.id),
+    ]
+    db.add_all(movies)
+    db.commit()
+
+    response = client.get("/movies/", params={"search": "spac"}, headers=auth_headers)
+    assert response.status_code == 200
+    titles = [movie["title"] for movie in response.json()["data"]]
+    assert titles == ["Space Odyssey", "Quiet Drama"]
+
+    movies[2].description = "Now with a space battle."
+    db.delete(movies[0])
+    db.commit()
+
+    response = client.get("/movies/", params={"search": "space"}, headers=auth_headers)
+    titles = [movie["title"] for movie in response.json()["data"]]
+    assert sorted(titles) == ["Quiet Drama", "Unrelated"]
+
+
+def test_search_does_not_depend_on_movie_rowids(client, db: Session, auth_headers):
+    owner = db.query(User).filter(User.email == "test@example.com").first()
+    db.add_all([
+        Movie(title="Space Odyssey", description="A journey beyond the stars.", duration=140, release_date=date(1968, 4, 2), owner_id=owner.id),
+        Movie(title="Quiet Drama", description="A family story.", duration=100, release_date=date(2001, 5, 5), owner_id=owner.id),
+    ])
+    db.commit()
+    # What a VACUUM may do to a table without an INTEGER PRIMARY KEY.
+    db.execute(text("UPDATE movies SET rowid = rowid + 1000"))
+    db.commit()
+
+    titles = [movie["title"] for movie in client.get("/movies/", params={"search": "space"}).json()["data"]]
+    assert titles == ["Space Odyssey"]
+
+
+def test_search_index_from_movie_rowids_is_rebuilt(client, db: Session, auth_headers):
+    owner = db.query(User).filter(User.email == "test@example.com").first()
+    db.add(Movie(title="Space Odyssey", description="A journey beyond the stars.", duration=140, release_date=date(1968, 4, 2), owner_id=owner.id))
+    db.commit()
+    with engine.begin() as connection:
+        for statement in SQLITE_LEGACY_SEARCH_DROP_DDL + ["DROP TABLE movies_fts_rowids"]:
+            connection.exec_driver_sql(statement)
+        connection.exec_driver_sql("CREATE VIRTUAL TABLE movies_fts USING fts5(title, description, content='movies', content_rowid='rowid')")
+        create_search_index(Base.metadata, connection)
+
+    titles = [movie["title"] for movie in client.get("/movies/", params={"search": "journey"}).json()["data"]]
+    assert titles == ["Space Odyssey"]
+
+
+def test_list_movies_with_cursor_pagination(client, db: Session, auth_headers):
+    owner = db.query(User).filter(User.email == "test@example.com").first()
+    db.add_all([
+        Movie(title=f"Paged Movie {i}", description="Paged", duration=90, release_date=date(2000 + i, 1, 1), owner_id=owner.id)
+        for i in range(5)
+    ])
+    db.commit()
+
+    titles, cursor = [], None
+    while True:
+        params = {"limit": 2, "sort_by": "most_recent"}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/movies/", params=params, headers=auth_headers)
+        assert response.status_code == 200
+        body = response.json()
+        titles += [movie["title"] for movie in body["data"]]
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+    assert titles == [f"Paged Movie {i}" for i in reversed(range(5))]
+
+    response = client.get("/movies/", params={"cursor": "not-a-cursor"}, headers=auth_headers)
+    assert response.status_code == 400
+
+    response = client.get("/movies/", params={"limit": 1000}, headers=auth_headers)
+    assert response.status_code == 422
+
+
+def test_movie_write_paths_query_counts(client, db: Session, auth_headers, count_queries):
+    movie_data = {
+        "title": "Counted Movie",
+        "description": "Round trips",
+        "duration": 100,
+        "release_date": "2024-01-01",
+        "poster_url": "https://example.com/poster.jpg"
+    }
+    # Each request also makes one SELECT for the authenticated user.
+    with count_queries() as statements:
+        response = client.post("/movies/", json=movie_data, headers=auth_headers)
+    assert response.status_code == 201
+    assert len(statements) == 2
+    movie_id = response.json()["data"]["id"]
+
+    with count_queries() as statements:
+        response = client.post("/movies/", json=movie_data, headers=auth_headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "A movie with this title and release date already exists."
+    assert len(statements) == 2
+
+    with count_queries() as statements:
+        response = client.put(f"/movies/{movie_id}", json={"description": "Fewer round trips"}, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["data"]["description"] == "Fewer round trips"
+    assert len(statements) == 2
+
+    comment_id = client.post("/comments/", json={"content": "Top", "movie_id": movie_id}, headers=auth_headers).json()["data"][0]["id"]
+    client.post("/comments/nested", json={"content": "Reply", "parent_comment_id": comment_id}, headers=auth_headers)
+    client.post("/ratings/", json={"movie_id": movie_id, "score": 4}, headers=auth_headers)
+
+    with count_queries() as statements:
+        response = client.delete(f"/movies/{movie_id}", headers=auth_headers)
+    assert response.status_code == 204
+    assert len(statements) == 2
+    assert db.query(Comment).count() == 0
+    assert db.query(Rating).count() == 0
+
+
+def test_update_and_delete_filter_on_owner(client, db: Session, auth_headers):
+    other_user = User(email="someone-else@example.com", first_name="Other", last_name="User", hashed_password="x")
+    db.add(other_user)
+    db.flush()
+    movie = Movie(title="Not Yours", description="d", duration=90, release_date=date(2024, 1, 1), owner_id=other_user.id)
+    db.add(movie)
+    db.commit()
+
+    response = client.put(f"/movies/{movie.id}", json={"description": "Taken"}, headers=auth_headers)
+    assert response.status_code == 404
+    response = client.delete(f"/movies/{movie.id}", headers=auth_headers)
+    assert response.status_code == 404
+    db.refresh(movie)
+    assert movie.description == "d"
+
+
+@pytest.mark.asyncio
+async def test_soft_delete_hides_movie_and_purges_children_in_batches(client, db: Session, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "MOVIE_SOFT_DELETE", True)
+    monkeypatch.setattr(settings, "MOVIE_PURGE_BATCH_SIZE", 2)
+    movie_data = {"title": "Soon Gone", "description": "d", "duration": 90, "release_date": "2024-01-01", "poster_url": "https://example.com/p.jpg"}
+    movie_id = client.post("/movies/", json=movie_data, headers=auth_headers).json()["data"]["id"]
+    for i in range(3):
+        comment_id = client.post("/comments/", json={"content": f"Comment {i}", "movie_id": movie_id}, headers=auth_headers).json()["data"][0]["id"]
+        client.post("/comments/nested", json={"content": f"Reply {i}", "parent_comment_id": comment_id}, headers=auth_headers)
+    client.post("/ratings/", json={"movie_id": movie_id, "score": 4}, headers=auth_headers)
+
+    response = client.delete(f"/movies/{movie_id}", headers=auth_headers)
+    assert response.status_code == 204
+    assert client.get(f"/movies/{movie_id}").status_code == 404
+    assert movie_id not in [movie["id"] for movie in client.get("/movies/").json()["data"]]
+    assert client.get(f"/comments/{movie_id}").status_code == 404
+    assert client.post("/ratings/", json={"movie_id": movie_id, "score": 2}, headers=auth_headers).status_code == 404
+    assert client.post("/comments/", json={"content": "Late", "movie_id": movie_id}, headers=auth_headers).status_code == 404
+    assert db.query(Comment).count() == 6
+
+    worker = MoviePurgeWorker()
+    purged = []
+    while (removed := await worker.process_due()):
+        purged.append(removed)
+    # One rating, two batches of top-level comments (replies cascade), then the movie.
+    assert purged == [1, 2, 1, 1]
+    assert db.query(Comment).count() == 0
+    assert db.query(Rating).count() == 0
+    db.expire_all()
+    assert db.query(Movie).filter(Movie.title == "Soon Gone").count() == 0
+
+def test_server_timing_counts_real_queries(client, db: Session, auth_headers, monkeypatch, count_queries):
+    monkeypatch.setattr(settings, "QUERY_STATS_ENABLED", True)
+    with count_queries() as statements:
+        response = client.get("/movies/", headers=auth_headers)
+    assert response.status_code == 200
+    assert f'desc="{len(statements)} queries"' in response.headers["Server-Timing"]
+    assert "total;dur=" in response.headers["Server-Timing"]
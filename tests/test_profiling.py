@@ -0,0 +1,80 @@
+import json
+import os
+import pstats
+import threading
+import time
+import pytest
+from app.core.config import settings
+from app.utils.profiling import SamplingProfiler, rotate_profiles
+
+
+@pytest.fixture
+def profiling(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(settings, "PROFILING_TOKEN", "let-me-profile")
+    monkeypatch.setattr(settings, "PROFILING_DIR", str(tmp_path))
+    return tmp_path
+
+
+def busy_wait(seconds: float):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_sampling_profiler_records_folded_stacks(tmp_path):
+    profiler = SamplingProfiler(threading.get_ident(), 0.001)
+    profiler.start()
+    busy_wait(0.05)
+    profiler.stop()
+    assert profiler.samples > 0
+    profiler.dump(str(tmp_path / "out.folded"))
+    lines = (tmp_path / "out.folded").read_text().splitlines()
+    stack, count = lines[0].rsplit(" ", 1)
+    assert "busy_wait (" in stack and int(count) > 0
+
+
+def test_requested_profile_is_stored_with_sql_timeline(client, profiling):
+    response = client.get("/movies/", headers={"X-Profile-Token": "let-me-profile"})
+    assert response.status_code == 200
+    name = response.headers["X-Profile"]
+
+    metadata = json.loads((profiling / f"{name}.json").read_text())
+    assert metadata["route"] == "/movies/"
+    assert (metadata["reason"], metadata["status"], metadata["mode"]) == ("requested", 200, "sampling")
+    assert metadata["queries"] == len(metadata["sql"]) > 0
+    assert metadata["sql"][0]["statement"].startswith("SELECT")
+    assert 0 <= metadata["sql"][0]["start_ms"] <= metadata["duration_ms"]
+    assert (profiling / metadata["profile"]).exists()
+
+
+def test_wrong_or_missing_token_is_not_profiled(client, profiling):
+    for headers in ({}, {"X-Profile-Token": "guess"}):
+        response = client.get("/movies/", headers=headers)
+        assert response.status_code == 200
+        assert "X-Profile" not in response.headers
+    assert os.listdir(profiling) == []
+
+
+def test_sampled_profiles_use_cprofile_and_rotate(client, profiling, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_SAMPLE_EVERY_N", 1)
+    monkeypatch.setattr(settings, "PROFILING_MODE", "cprofile")
+    monkeypatch.setattr(settings, "PROFILING_MAX_FILES", 2)
+    for _ in range(3):
+        response = client.get("/movies/")
+        assert "X-Profile" not in response.headers
+
+    assert len(os.listdir(profiling)) == 4
+    stored = sorted(entry for entry in os.listdir(profiling) if entry.endswith(".json"))
+    assert len(stored) == 2
+    metadata = json.loads((profiling / stored[0]).read_text())
+    assert metadata["reason"] == "sampled"
+    assert pstats.Stats(str(profiling / metadata["profile"])).total_calls > 0
+
+
+def test_rotation_keeps_newest_profiles(tmp_path):
+    for name in ("20240101T000000000000-1-get-a", "20240102T000000000000-1-get-b", "20240103T000000000000-1-get-c"):
+        (tmp_path / f"{name}.json").write_text("{}")
+        (tmp_path / f"{name}.folded").write_text("")
+    rotate_profiles(str(tmp_path), 1)
+    assert sorted(os.listdir(tmp_path)) == ["20240103T000000000000-1-get-c.folded", "20240103T000000000000-1-get-c.json"]
@@ -0,0 +1,121 @@
+import pytest
+from redis.exceptions import NoScriptError
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+from app.core.config import settings
+from app.db.schemas.user import UserCreate
+from app.services.auth import register_user
+from app.utils.rate_limiter import GCRA_SCRIPT, GCRA_SCRIPT_SHA, MemoryRateLimitStore, RedisRateLimitStore, client_address, parse_rate
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRedis:
+    """
+    Stand-in for `redis.asyncio.Redis` that answers the GCRA script with a
+    Python port of it, on a clock the test controls.
+    """
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.store = {}
+        self.scripts = set()
+        self.calls = []
+
+    async def evalsha(self, sha, numkeys, key, emission, tolerance):
+        self.calls.append("evalsha")
+        if sha not in self.scripts:
+            raise NoScriptError("NOSCRIPT No matching script.")
+        return self._run(key, emission, tolerance)
+
+    async def eval(self, script, numkeys, key, emission, tolerance):
+        self.calls.append("eval")
+        self.scripts.add(GCRA_SCRIPT_SHA if script == GCRA_SCRIPT else None)
+        return self._run(key, emission, tolerance)
+
+    def _run(self, key, emission, tolerance):
+        now = self.clock() * 1000
+        tat = max(self.store.get(key, now), now)
+        if tat - tolerance > now:
+            return int(tat - tolerance - now + 0.999)
+        self.store[key] = tat + emission
+        return 0
+
+
+class BrokenRedis:
+    async def evalsha(self, *args):
+        raise ConnectionError("redis is down")
+
+
+def test_parse_rate():
+    rate = parse_rate("10/minute")
+    assert (rate.amount, rate.period, str(rate)) == (10, 60, "10 per 1 minute")
+    assert parse_rate("5 per 2 hours").period == 7200
+    with pytest.raises(ValueError):
+        parse_rate("ten a minute")
+
+
+@pytest.mark.asyncio
+async def test_memory_store_allows_a_burst_then_one_request_per_interval():
+    clock = FakeClock()
+    store = MemoryRateLimitStore(clock=clock)
+    rate = parse_rate("3/minute")
+    assert [await store.acquire("k", rate) for _ in range(3)] == [0, 0, 0]
+    assert await store.acquire("k", rate) == pytest.approx(20)
+    assert await store.acquire("other", rate) == 0
+    clock.now += 20
+    assert await store.acquire("k", rate) == 0
+    assert await store.acquire("k", rate) == pytest.approx(20)
+
+
+@pytest.mark.asyncio
+async def test_redis_store_uses_one_script_call_per_request():
+    clock = FakeClock()
+    client = FakeRedis(clock)
+    store = RedisRateLimitStore(client)
+    rate = parse_rate("2/second")
+    assert await store.acquire("k", rate) == 0
+    assert client.calls == ["evalsha", "eval"]
+    assert await store.acquire("k", rate) == 0
+    assert await store.acquire("k", rate) == 0.5
+    assert client.calls == ["evalsha", "eval", "evalsha", "evalsha"]
+    assert list(client.store) == ["ratelimit:k"]
+
+
+@pytest.mark.asyncio
+async def test_redis_store_allows_requests_when_redis_is_down():
+    store = RedisRateLimitStore(BrokenRedis())
+    assert await store.acquire("k", parse_rate("1/minute")) == 0
+    assert store.errors == 1
+
+
+def test_client_address_trusts_forwarded_for_only_from_proxies(monkeypatch):
+    def request(peer, forwarded):
+        return Request({"type": "http", "client": (peer, 1234), "headers": [(b"x-forwarded-for", forwarded.encode())]})
+
+    monkeypatch.setattr(settings, "RATE_LIMIT_TRUSTED_PROXIES", ["10.0.0.1", "10.0.0.2"])
+    assert client_address(request("10.0.0.1", "203.0.113.9, 10.0.0.2")) == "203.0.113.9"
+    assert client_address(request("198.51.100.7", "203.0.113.9")) == "198.51.100.7"
+
+
+def test_authenticated_requests_are_limited_per_user(client, db: Session):
+    headers = []
+    for email in ("first@example.com", "second@example.com"):
+        register_user(UserCreate(email=email, password="password123", first_name="Rate", last_name="Limited"), db)
+        response = client.post("/auth/login/token", data={"username": email, "password": "password123"})
+        headers.append({"Authorization": f"Bearer {response.json()['access_token']}"})
+
+    for _ in range(10):
+        assert client.get("/users/me", headers=headers[0]).status_code == 200
+    response = client.get("/users/me", headers=headers[0])
+    assert response.status_code == 429
+    assert response.json() == {"error": "Rate limit exceeded: 10 per 1 minute"}
+    assert int(response.headers["Retry-After"]) >= 1
+    # Same address, different user: a separate limit.
+    assert client.get("/users/me", headers=headers[1]).status_code == 200
@@ -1,10 +1,17 @@
 from datetime import date
+import asyncio
 import pytest
 from sqlalchemy.orm import Session
+from app.crud.crud_rating import create_or_update_rating
 from app.db.models.movie import Movie
+from app.db.models.rating import Rating
+from app.db.models.user import User
+from app.db.session import AsyncSessionLocal
+from app.db.rebuild_rating_aggregates import rebuild_rating_aggregates
 from app.db.schemas.user import UserCreate
+from app.core.config import settings
 from app.services.auth import register_user
-from app.db.schemas.rating import RatingScore
+from app.db.schemas.rating import RatingCreate, RatingScore
 
 
 @pytest.fixture
@@ -165,3 +172,62 @@ def test_missing_required_fields(client, auth_headers):
     assert response.status_code == 422 
   
 
+
+
+def test_rating_aggregates_maintained_and_rebuilt(client, db: Session, auth_headers, test_movie):
+    rating_data = {"movie_id": str(test_movie.id), "score": RatingScore.four_stars}
+    client.post("/ratings/", json=rating_data, headers=auth_headers)
+    client.post("/ratings/", json={**rating_data, "score": RatingScore.two_stars}, headers=auth_headers)
+
+    db.refresh(test_movie)
+    assert (test_movie.rating_count, test_movie.rating_sum, test_movie.average_rating) == (1, 2, 2.0)
+
+    test_movie.rating_count, test_movie.rating_sum, test_movie.average_rating = 7, 30, 30 / 7
+    db.commit()
+    assert rebuild_rating_aggregates(db) == 1
+    db.refresh(test_movie)
+    assert (test_movie.rating_count, test_movie.rating_sum, test_movie.average_rating) == (1, 2, 2.0)
+
+    test_movie.average_rating = 5.0
+    db.commit()
+    assert rebuild_rating_aggregates(db) == 1
+    db.refresh(test_movie)
+    assert test_movie.average_rating == 2.0
+    assert rebuild_rating_aggregates(db) == 0
+
+
+def test_core_read_path_matches_orm_output(client, db: Session, auth_headers, test_movie, monkeypatch):
+    client.post("/ratings/", json={"movie_id": str(test_movie.id), "score": RatingScore.three_stars, "review": "Fine."}, headers=auth_headers)
+
+    monkeypatch.setattr(settings, "CORE_READ_PATH", [])
+    orm_output = client.get(f"/ratings/{test_movie.id}").json()
+    monkeypatch.setattr(settings, "CORE_READ_PATH", ["ratings"])
+    core_output = client.get(f"/ratings/{test_movie.id}").json()
+    assert core_output == orm_output
+    assert core_output["data"]["ratings"][0]["review"] == "Fine."
+
+
+@pytest.mark.asyncio
+async def test_concurrent_ratings_from_one_user_upsert_a_single_row(client, db: Session, auth_headers, test_movie):
+    user = db.query(User).filter(User.email == "test@example.com").first()
+    scores = [RatingScore.one_star, RatingScore.two_stars, RatingScore.three_stars, RatingScore.four_stars, RatingScore.five_stars] * 2
+
+    async def rate(score):
+        async with AsyncSessionLocal() as session:
+            return await create_or_update_rating(session, RatingCreate(movie_id=test_movie.id, score=score), user.id)
+
+    results = await asyncio.gather(*(rate(score) for score in scores))
+
+    assert len({rating.id for rating in results}) == 1
+    assert db.query(Rating).filter(Rating.movie_id == test_movie.id).count() == 1
+    final_score = db.query(Rating.score).filter(Rating.movie_id == test_movie.id).scalar()
+    db.refresh(test_movie)
+    assert (test_movie.rating_count, test_movie.rating_sum) == (1, final_score)
+
+
+def test_rating_write_path_query_count(client, db: Session, auth_headers, test_movie, count_queries):
+    # The authenticated user lookup, the upsert and the aggregate update.
+    with count_queries() as statements:
+        response = client.post("/ratings/", json={"movie_id": str(test_movie.id), "score": RatingScore.three_stars}, headers=auth_headers)
+    assert response.status_code == 201
+    assert len(statements) == 3
@@ -0,0 +1,113 @@
+import pytest
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.schemas.user import UserCreate
+from app.services.auth import register_user
+from app.utils.response_cache import cache_key_params, etag_matches, response_cache
+
+
+@pytest.fixture
+def auth_headers(client, db: Session):
+    register_user(UserCreate(email="cache@example.com", password="password123", first_name="Cache", last_name="Owner"), db)
+    response = client.post("/auth/login/token", data={"username": "cache@example.com", "password": "password123"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def cache_enabled(monkeypatch):
+    monkeypatch.setattr(settings, "RESPONSE_CACHE_ENABLED", True)
+    response_cache.entries.clear()
+    response_cache.tag_versions.clear()
+
+
+def create_movie(client, auth_headers) -> str:
+    movie_data = {"title": "Cached Movie", "description": "First cut", "duration": 100, "release_date": "2024-01-01", "poster_url": "https://example.com/poster.jpg"}
+    return client.post("/movies/", json=movie_data, headers=auth_headers).json()["data"]["id"]
+
+
+def test_key_params_ignore_order_and_missing_values():
+    assert cache_key_params({"skip": 0, "limit": 10, "search": None}) == cache_key_params({"limit": 10, "skip": 0})
+    assert etag_matches('"a", "b"', '"b"')
+    assert etag_matches("*", '"b"')
+    assert not etag_matches(None, '"b"')
+
+
+def test_movie_detail_served_from_cache_with_etag(client, auth_headers, cache_enabled, count_queries):
+    movie_id = create_movie(client, auth_headers)
+    first = client.get(f"/movies/{movie_id}")
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "public, max-age=60"
+    etag = first.headers["ETag"]
+
+    with count_queries() as statements:
+        second = client.get(f"/movies/{movie_id}")
+        not_modified = client.get(f"/movies/{movie_id}", headers={"If-None-Match": etag})
+    assert statements == []
+    assert second.content == first.content
+    assert second.headers["ETag"] == etag
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["ETag"] == etag
+
+    client.put(f"/movies/{movie_id}", json={"description": "Director's cut"}, headers=auth_headers)
+    updated = client.get(f"/movies/{movie_id}", headers={"If-None-Match": etag})
+    assert updated.status_code == 200
+    assert updated.json()["data"]["description"] == "Director's cut"
+    assert updated.headers["ETag"] != etag
+
+
+def test_list_cache_normalises_query_and_is_invalidated_by_writes(client, auth_headers, cache_enabled, count_queries):
+    movie_id = create_movie(client, auth_headers)
+    assert len(client.get("/movies/?skip=0&limit=10").json()["data"]) == 1
+    with count_queries() as statements:
+        client.get("/movies/?limit=10")
+        client.get("/movies/")
+    assert statements == []
+
+    comments = client.get(f"/comments/{movie_id}")
+    assert comments.json()["data"] == []
+    client.post("/comments/", json={"content": "Fresh", "movie_id": movie_id}, headers=auth_headers)
+    assert [comment["content"] for comment in client.get(f"/comments/{movie_id}").json()["data"]] == ["Fresh"]
+
+    assert client.get(f"/ratings/{movie_id}").json()["data"]["aggregated_rating"]["average_score"] is None
+    client.post("/ratings/", json={"movie_id": movie_id, "score": 5}, headers=auth_headers)
+    assert client.get(f"/ratings/{movie_id}").json()["data"]["aggregated_rating"]["average_score"] == 5
+
+    client.delete(f"/movies/{movie_id}", headers=auth_headers)
+    assert client.get(f"/movies/{movie_id}").status_code == 404
+    assert client.get("/movies/").json()["data"] == []
+
+
+def test_authenticated_requests_bypass_the_cache(client, auth_headers, cache_enabled):
+    movie_id = create_movie(client, auth_headers)
+    response = client.get(f"/movies/{movie_id}", headers=auth_headers)
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+
+
+def test_reply_invalidates_the_movie_comment_list(client, auth_headers, cache_enabled):
+    movie_id = create_movie(client, auth_headers)
+    root = client.post("/comments/", json={"content": "Root", "movie_id": movie_id}, headers=auth_headers).json()["data"][0]
+    reply = client.post("/comments/nested", json={"content": "Reply", "parent_comment_id": root["id"]}, headers=auth_headers).json()["data"][0]
+    assert client.get(f"/comments/{movie_id}").json()["data"][0]["reply_count"] == 1
+
+    # A reply to a reply has no movie_id of its own; the thread root's movie is invalidated.
+    client.post("/comments/nested", json={"content": "Deeper", "parent_comment_id": reply["id"]}, headers=auth_headers)
+    client.post("/comments/nested", json={"content": "Second", "parent_comment_id": root["id"]}, headers=auth_headers)
+    listed = client.get(f"/comments/{movie_id}").json()["data"][0]
+    assert listed["reply_count"] == 2
+    assert {preview["content"] for preview in listed["replies"]} == {"Reply", "Second"}
+
+
+def test_rating_write_invalidates_most_rated_list(client, auth_headers, cache_enabled):
+    movie_data = {"description": "Ranked", "duration": 100, "release_date": "2024-01-01", "poster_url": "https://example.com/poster.jpg"}
+    first = client.post("/movies/", json={**movie_data, "title": "M0"}, headers=auth_headers).json()["data"]["id"]
+    second = client.post("/movies/", json={**movie_data, "title": "M1"}, headers=auth_headers).json()["data"]["id"]
+    client.post("/ratings/", json={"movie_id": first, "score": 2}, headers=auth_headers)
+
+    def most_rated():
+        return [movie["title"] for movie in client.get("/movies/?sort_by=most_rated").json()["data"]]
+
+    assert most_rated() == ["M0", "M1"]
+    client.post("/ratings/", json={"movie_id": second, "score": 5}, headers=auth_headers)
+    assert most_rated() == ["M1", "M0"]
@@ -0,0 +1,152 @@
+import asyncio
+from datetime import date
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.models.movie import Movie
+from app.db.schemas.user import UserCreate
+from app.db.session import AsyncSessionLocal
+from app.services.auth import register_user
+from app.crud.crud_movie import get_movie
+from app.db.schemas.movie import MovieUpdate
+from app.services import movie_service
+from app.services.movie_service import get_movie_service, movie_flight, update_movie_service
+from app.services.rating_service import get_ratings_service
+from app.utils.cache import movie_cache
+from app.utils.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_result():
+    flight = SingleFlight("test")
+    runs = []
+
+    async def load():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return {"value": 42}
+
+    results = await asyncio.gather(*(flight.do("key", load) for _ in range(10)))
+    assert len(runs) == 1
+    assert all(result is results[0] for result in results)
+    assert flight.stats() == {"calls": 1, "shared": 9, "in_flight": 0}
+    # Finished flights are not reused.
+    await flight.do("key", load)
+    assert len(runs) == 2
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_waiter():
+    flight = SingleFlight("test")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise HTTPException(status_code=404, detail="Movie not found")
+
+    results = await asyncio.gather(*(flight.do("key", fail) for _ in range(3)), return_exceptions=True)
+    assert [result.status_code for result in results] == [404, 404, 404]
+    assert flight.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_waiters_run_the_call_themselves_after_the_timeout():
+    flight = SingleFlight("test", timeout=0.02)
+    release = asyncio.Event()
+
+    async def stuck():
+        await release.wait()
+        return "slow"
+
+    async def fast():
+        return "fast"
+
+    leader = asyncio.create_task(flight.do("key", stuck))
+    await asyncio.sleep(0)
+    assert await flight.do("key", fast) == "fast"
+    release.set()
+    assert await leader == "slow"
+    assert flight.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_does_not_fail_waiters():
+    flight = SingleFlight("test")
+
+    async def slow():
+        await asyncio.sleep(1)
+
+    async def fast():
+        return "ok"
+
+    leader = asyncio.create_task(flight.do("key", slow))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(flight.do("key", fast))
+    await asyncio.sleep(0)
+    leader.cancel()
+    assert await waiter == "ok"
+
+
+@pytest.mark.asyncio
+async def test_thundering_herd_on_one_movie_runs_one_query(client, db: Session, count_queries, monkeypatch):
+    owner = register_user(UserCreate(email="herd@example.com", password="password123", first_name="Herd", last_name="Owner"), db)
+    movie = Movie(title="Trending", description="Everyone wants it", duration=90, release_date=date(2024, 1, 1), poster_url="https://example.com/p.jpg", owner_id=owner.id)
+    db.add(movie)
+    db.commit()
+    movie_cache.entries.clear()
+    calls = movie_flight.calls
+
+    async def read_movie():
+        async with AsyncSessionLocal() as session:
+            return await get_movie_service(session, movie.id)
+
+    async def read_ratings():
+        async with AsyncSessionLocal() as session:
+            return await get_ratings_service(session, movie.id, skip=0, limit=10)
+
+    with count_queries() as statements:
+        movies = await asyncio.gather(*(read_movie() for _ in range(20)))
+        ratings = await asyncio.gather(*(read_ratings() for _ in range(20)))
+    assert {m.id for m in movies} == {movie.id}
+    assert len({id(r) for r in ratings}) == 1
+    assert movie_flight.calls == calls + 1
+    # One movie lookup; the ratings page and its aggregate.
+    assert len(statements) == 1 + 2
+
+    monkeypatch.setattr(settings, "SINGLE_FLIGHT_ENABLED", False)
+    movie_cache.entries.clear()
+    with count_queries() as statements:
+        await asyncio.gather(*(read_movie() for _ in range(5)))
+    assert len(statements) > 1
+
+
+@pytest.mark.asyncio
+async def test_lookup_after_a_write_does_not_join_an_older_flight(client, db: Session, monkeypatch):
+    owner = register_user(UserCreate(email="flight@example.com", password="password123", first_name="Flight", last_name="Owner"), db)
+    movie = Movie(title="In flight", description="Before the write.", duration=90, release_date=date(2024, 1, 1), poster_url="https://example.com/p.jpg", owner_id=owner.id)
+    db.add(movie)
+    db.commit()
+    movie_cache.entries.clear()
+    calls = movie_flight.calls
+    loaded, release = asyncio.Event(), asyncio.Event()
+
+    async def first_lookup_stalls(session, movie_id):
+        found = await get_movie(session, movie_id)
+        if not loaded.is_set():
+            loaded.set()
+            await release.wait()
+        return found
+
+    monkeypatch.setattr(movie_service, "get_movie", first_lookup_stalls)
+    async with AsyncSessionLocal() as leader_session, AsyncSessionLocal() as session:
+        leader = asyncio.create_task(get_movie_service(leader_session, movie.id))
+        await loaded.wait()
+        async with AsyncSessionLocal() as writer:
+            await update_movie_service(writer, movie.id, MovieUpdate(description="After the write."), owner.id)
+        later = asyncio.create_task(get_movie_service(session, movie.id))
+        # Far short of the flight timeout; a request that joined the old flight gets its result.
+        await asyncio.sleep(0)
+        release.set()
+        assert (await leader).description == "Before the write."
+        assert (await later).description == "After the write."
+    assert movie_flight.calls == calls + 2